@@ -0,0 +1,3 @@
+import redis
+
+redis_client = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
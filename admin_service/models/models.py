@@ -5,10 +5,12 @@ from sqlalchemy import (
     Column,
     Date,
     DateTime,
+    Float,
     Integer,
     String,
     Text,
     Time,
+    UniqueConstraint,
     func,
 )
 
@@ -395,4 +397,21 @@ class UserAdvancedSettings(Base):
     updated_by = Column(String(50), nullable=True)
 
 
+# Per-intent, per-hour counters pushed by Chat Service;
+# mean confidence of a bucket is confidence_sum / hits
+class IntentUsageHourly(Base):
+
+    __tablename__ = "intent_usage_hourly"
+    __table_args__ = (UniqueConstraint("intent_name", "bucket_start"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    intent_name = Column(String(100), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    fallbacks = Column(Integer, nullable=False, default=0)
+    escalations = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 Base.metadata.create_all(bind=engine)
@@ -1,13 +1,24 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from models import get_db
-from models.models import Intent, IntentCategory, QuickReply, Response, TrainingPhrase
-from resources.utils import verify_authentication
+from models.models import (
+    Intent,
+    IntentCategory,
+    IntentUsageHourly,
+    QuickReply,
+    Response,
+    TrainingPhrase,
+)
+from resources.utils import publish_cache_invalidation, verify_authentication
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
+# Longest window GET /intents/usage reads, in hours
+USAGE_MAX_HOURS = 24 * 90
+
 
 # -------------------------------------------------
 # INTENTS
@@ -22,6 +33,13 @@ def list_intents(request: Request, db: Session = Depends(get_db)):
 
         intents = db.query(Intent).filter(Intent.status != "DELETED").all()
 
+        # Lifetime hits per intent, from the hourly rollups
+        usage = dict(
+            db.query(IntentUsageHourly.intent_name, func.sum(IntentUsageHourly.hits))
+            .group_by(IntentUsageHourly.intent_name)
+            .all()
+        )
+
         result = []
 
         for intent in intents:
@@ -63,7 +81,7 @@ def list_intents(request: Request, db: Session = Depends(get_db)):
                     "status": intent.status,
                     "phrases": phrases,
                     "responses": responses,
-                    "usage": 0,
+                    "usage": int(usage.get(intent.intent_name) or 0),
                     "last_modified": (
                         intent.updated_at if intent.updated_at else intent.created_at
                     ),
@@ -80,6 +98,86 @@ def list_intents(request: Request, db: Session = Depends(get_db)):
         ) from e
 
 
+@router.get("/intents/usage")
+def intent_usage(
+    request: Request,
+    hours: int = 24,
+    intent_name: str = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Hourly hits / fallbacks / escalations / mean confidence per intent
+    for the last `hours` hours, read from the intent_usage_hourly rollups.
+    """
+
+    verify_authentication(request)
+
+    if not 1 <= hours <= USAGE_MAX_HOURS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"hours must be between 1 and {USAGE_MAX_HOURS}",
+        )
+
+    try:
+        current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        since = current_hour - timedelta(hours=hours - 1)
+
+        query = db.query(IntentUsageHourly).filter(
+            IntentUsageHourly.bucket_start >= since
+        )
+        if intent_name:
+            query = query.filter(IntentUsageHourly.intent_name == intent_name)
+
+        rows = query.order_by(
+            IntentUsageHourly.intent_name, IntentUsageHourly.bucket_start
+        ).all()
+
+        intents = {}
+
+        for row in rows:
+            summary = intents.setdefault(
+                row.intent_name,
+                {
+                    "intent_name": row.intent_name,
+                    "hits": 0,
+                    "fallbacks": 0,
+                    "escalations": 0,
+                    "confidence_sum": 0.0,
+                    "buckets": [],
+                },
+            )
+            summary["hits"] += row.hits
+            summary["fallbacks"] += row.fallbacks
+            summary["escalations"] += row.escalations
+            summary["confidence_sum"] += row.confidence_sum
+            summary["buckets"].append(
+                {
+                    "bucket_start": row.bucket_start,
+                    "hits": row.hits,
+                    "fallbacks": row.fallbacks,
+                    "escalations": row.escalations,
+                    "mean_confidence": (
+                        row.confidence_sum / row.hits if row.hits else None
+                    ),
+                }
+            )
+
+        for summary in intents.values():
+            confidence_sum = summary.pop("confidence_sum")
+            summary["mean_confidence"] = (
+                confidence_sum / summary["hits"] if summary["hits"] else None
+            )
+
+        return {"since": since, "intents": list(intents.values())}
+
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal Server Error",
+        ) from e
+
+
 @router.post("/intents")
 def create_intent(request: Request, payload: dict, db: Session = Depends(get_db)):
 
@@ -189,6 +287,7 @@ def create_intent(request: Request, payload: dict, db: Session = Depends(get_db)
                     db.add(quick_reply)
 
         db.commit()
+        publish_cache_invalidation("intent_phrases")
 
         return {
             "status": "Success",
@@ -331,6 +430,7 @@ def update_intent(
                 )
 
         db.commit()
+        publish_cache_invalidation("intent_phrases")
 
         return {"status": "Success", "message": "Intent Updated Successfully"}
 
@@ -376,6 +476,7 @@ def delete_intent(request: Request, intent_id: int, db: Session = Depends(get_db
                 reply.status = "DELETED"
 
         db.commit()
+        publish_cache_invalidation("intent_phrases")
         return {"status": "Success", "message": "Intent Deleted Successfully"}
 
     except Exception as e:
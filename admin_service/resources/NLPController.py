@@ -1,7 +1,17 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.encoders import jsonable_encoder
 from models import get_db
-from models.models import Intent, TrainingPhrase
+from models.models import (
+    Intent,
+    IntentUsageHourly,
+    TrainingPhrase,
+    UserAdvancedSettings,
+)
+from resources.utils import verify_service_authentication
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, sqlite
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -46,3 +56,82 @@ def export_nlp_training_data(db: Session = Depends(get_db)):
         print(export_data)
 
     return export_data
+
+
+@router.get("/retention-policies")
+def export_retention_policies(db: Session = Depends(get_db)):
+    """
+    Export data_retention_days per user
+    for Chat Service (retention purger)
+    """
+
+    rows = (
+        db.query(UserAdvancedSettings.user_id, UserAdvancedSettings.data_retention_days)
+        .filter(UserAdvancedSettings.status == "ACTIVE")
+        .all()
+    )
+
+    return {
+        "policies": [
+            {"user_id": user_id, "data_retention_days": days}
+            for user_id, days in rows
+        ]
+    }
+
+
+USAGE_COUNTERS = ("hits", "fallbacks", "escalations", "confidence_sum")
+
+
+def _upsert_intent_usage(db: Session, rows: list):
+    """
+    One INSERT for the whole batch; existing (intent, hour) rows get the
+    deltas added to their counters. Upserts skip Column.onupdate, so
+    updated_at is set explicitly.
+    """
+    table = IntentUsageHourly.__table__
+
+    if db.bind.dialect.name == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        updates = {name: table.c[name] + stmt.inserted[name] for name in USAGE_COUNTERS}
+        stmt = stmt.on_duplicate_key_update({**updates, "updated_at": func.now()})
+    else:
+        stmt = sqlite.insert(table).values(rows)
+        updates = {name: table.c[name] + stmt.excluded[name] for name in USAGE_COUNTERS}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["intent_name", "bucket_start"],
+            set_={**updates, "updated_at": func.now()},
+        )
+
+    db.execute(stmt)
+    db.commit()
+
+
+@router.post("/intent-usage")
+def import_intent_usage(
+    request: Request, payload: dict, db: Session = Depends(get_db)
+):
+    """
+    Hourly intent usage deltas
+    from Chat Service (intent_usage_hourly rollups)
+    """
+
+    verify_service_authentication(request)
+
+    try:
+        rows = [
+            {
+                "intent_name": row["intent_name"],
+                "bucket_start": datetime.fromisoformat(row["bucket_start"]),
+                **{name: row.get(name, 0) for name in USAGE_COUNTERS},
+            }
+            for row in payload.get("rows", [])
+        ]
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid usage rows"
+        ) from e
+
+    if rows:
+        _upsert_intent_usage(db, rows)
+
+    return {"count": len(rows)}
@@ -10,7 +10,7 @@ from models.models import (
     UserGeneralSettings,
     UserNotificationSettings,
 )
-from resources.utils import verify_authentication
+from resources.utils import publish_cache_invalidation, verify_authentication
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -428,6 +428,7 @@ def post_conversation_settings(
             db.add(escalation)
 
         db.commit()
+        publish_cache_invalidation(f"ai_settings:{user_id}")
 
         return {
             "status": "Success",
@@ -489,6 +490,7 @@ def post_escalation_keywords(
                 )
 
         db.commit()
+        publish_cache_invalidation(f"escalation_keywords:{user_id}")
 
         return {
             "status": "Success",
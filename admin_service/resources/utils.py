@@ -6,11 +6,15 @@ from typing import Optional
 
 import bcrypt
 from configs.base_config import BaseConfig
+from configs.redis import redis_client
 from fastapi import HTTPException, Request, status
 from jose import JWTError, jwt
 
 UPLOAD_DIR = "./templates/static/uploaded_image"
 
+# Chat service workers drop their local cache copies on this channel
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
 
 def verify_authentication(request: Request):
     """
@@ -61,6 +65,55 @@ def verify_authentication(request: Request):
     return user_id, user_role, token
 
 
+def verify_service_authentication(request: Request, service: str = "chat_service"):
+    """
+    Verifies a service-to-service JWT (Authorization: Bearer) whose
+    "service" claim names the calling service.
+    """
+
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+        )
+
+    try:
+        payload = jwt.decode(
+            auth_header.split(" ", 1)[1],
+            BaseConfig.SECRET_KEY,
+            algorithms=[BaseConfig.ALGORITHM],
+        )
+    except JWTError as exc:
+        print(exc)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        ) from exc
+
+    if payload.get("service") != service:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Service not allowed",
+        )
+
+    return payload
+
+
+def publish_cache_invalidation(*keys):
+    """
+    Deletes chat service cache keys in Redis and broadcasts them so every
+    chat worker drops its in-process copy. Best effort: a Redis outage must
+    not fail the admin request, the chat cache TTLs still apply.
+    """
+    try:
+        redis_client.delete(*keys)
+        for key in keys:
+            redis_client.publish(CACHE_INVALIDATION_CHANNEL, key)
+    except Exception as e:
+        print("Cache invalidation failed", e)
+
+
 def hash_text(plain_text: str) -> str:
     """
     Hash a given plain text using bcrypt.
@@ -0,0 +1,207 @@
+"""
+Throughput of POST /chat/messages/bulk against the same messages sent one
+by one through POST /chat/message.
+
+Runs chat_service in-process (uvicorn) against SQLite, fakeredis and fake
+admin / NLP upstreams, and replays each scenario twice: once through the
+bulk endpoint, once as single messages (the messages of a session in
+order, sessions concurrently, as a client replaying history would).
+Reports messages/sec of both and their ratio, by default for many short
+sessions and for one long session. Results are written as JSON so runs
+can be compared.
+
+Needs the packages in benchmarks/requirements.txt; no Redis, MySQL or
+upstream services.
+
+Run from chat_service/:
+    python -m benchmarks.bulk_ingest --scenario 50x6 --scenario 1x300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+_db_path = os.path.join(tempfile.mkdtemp(prefix="chat_bench_"), "bench.db")
+os.environ.setdefault("CHAT_DB_URI", f"sqlite:///{_db_path}")
+os.environ.setdefault("CHAT_CONNECTION_BUS", "memory")
+os.environ.setdefault("CHAT_RATE_LIMIT", "off")
+os.environ.setdefault("CHAT_AUTO_MIGRATE", "on")
+
+from benchmarks.fakes import FakeUpstreams, install_fake_redis  # noqa: E402
+
+install_fake_redis()
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from configs.base_config import BaseConfig  # noqa: E402
+from main import app  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def scenario_items(sessions: int, per_session: int) -> list:
+    """
+    Bulk items for `sessions` fresh sessions of `per_session` messages,
+    interleaved the way a replayed export usually is.
+    """
+    prefix = f"bench-bulk-{uuid.uuid4().hex[:8]}"
+    return [
+        {"session_id": f"{prefix}-{session}", "text": f"hello {n}"}
+        for n in range(per_session)
+        for session in range(sessions)
+    ]
+
+
+def fresh_keys(items: list) -> list:
+    # Same traffic under new session keys, so both runs create their sessions
+    suffix = uuid.uuid4().hex[:8]
+    return [{**item, "session_id": f"{item['session_id']}-{suffix}"} for item in items]
+
+
+async def run_bulk(client: httpx.AsyncClient, items: list) -> int:
+    errors = 0
+    limit = BaseConfig.BULK_INGEST_MAX_ITEMS
+
+    for start in range(0, len(items), limit):
+        batch = items[start : start + limit]
+        res = await client.post("/chat/messages/bulk", json=batch)
+        if res.status_code != 200:
+            print(f"bulk failed: {res.status_code} {res.text}", file=sys.stderr)
+            errors += len(batch)
+            continue
+        errors += res.json()["failed"]
+
+    return errors
+
+
+async def run_single(client: httpx.AsyncClient, items: list) -> int:
+    by_session = {}
+    for item in items:
+        by_session.setdefault(item["session_id"], []).append(item)
+
+    errors = 0
+
+    async def _session(session_items):
+        nonlocal errors
+        for item in session_items:
+            try:
+                res = await client.post("/chat/message", json=item)
+                ok = res.status_code == 200 and "response" in res.json()
+            except Exception as e:
+                print(f"single {item['session_id']} failed: {e}", file=sys.stderr)
+                ok = False
+            if not ok:
+                errors += 1
+
+    await asyncio.gather(*[_session(group) for group in by_session.values()])
+    return errors
+
+
+async def measure(fn, client, items) -> dict:
+    started = time.perf_counter()
+    errors = await fn(client, items)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "messages_per_sec": round(len(items) / elapsed, 2) if elapsed else None,
+    }
+
+
+async def main(args):
+    upstreams = FakeUpstreams(
+        nlp_latency_ms=args.nlp_latency_ms,
+        admin_latency_ms=args.admin_latency_ms,
+        jitter=args.jitter,
+    )
+    upstreams.install()
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    results = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    client = httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits)
+    async with client:
+        # Warm-up: fills the config caches and the connection pools
+        await run_single(client, scenario_items(2, 2))
+        await run_bulk(client, scenario_items(2, 2))
+
+        for scenario in args.scenario:
+            sessions, per_session = (int(part) for part in scenario.split("x"))
+            items = scenario_items(sessions, per_session)
+
+            bulk = await measure(run_bulk, client, items)
+            single = await measure(run_single, client, fresh_keys(items))
+
+            results.append(
+                {
+                    "scenario": scenario,
+                    "sessions": sessions,
+                    "messages": len(items),
+                    "bulk": bulk,
+                    "single": single,
+                    "speedup": (
+                        round(bulk["messages_per_sec"] / single["messages_per_sec"], 2)
+                        if bulk["messages_per_sec"] and single["messages_per_sec"]
+                        else None
+                    ),
+                }
+            )
+
+    server.should_exit = True
+    await server_task
+
+    report = {
+        "benchmark": "bulk_ingest",
+        "started_at": datetime.utcnow().isoformat(),
+        "config": vars(args),
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bulk_ingest-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"saved to {output}")
+
+    failed = [
+        result
+        for result in results
+        if result["bulk"]["errors"] or result["single"]["errors"]
+    ]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        help="SESSIONSxMESSAGES_PER_SESSION, repeatable (default 50x6 and 1x300)",
+    )
+    parser.add_argument("--nlp-latency-ms", type=float, default=20.0)
+    parser.add_argument("--admin-latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--output", help="JSON file, default benchmarks/results/")
+    args = parser.parse_args()
+    args.scenario = args.scenario or ["50x6", "1x300"]
+    sys.exit(asyncio.run(main(args)))
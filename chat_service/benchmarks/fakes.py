@@ -0,0 +1,102 @@
+import asyncio
+import json
+import random
+
+import httpx
+
+# Messages containing this word are escalated by the fake NLP service
+ESCALATION_WORD = "human"
+
+
+def install_fake_redis():
+    """
+    Swaps the clients in configs.redis for fakeredis ones sharing a single
+    in-memory server. Must run before anything imports the app, since
+    modules bind the clients (and register Lua scripts) at import time.
+    Returns (redis_client, async_redis_client).
+    """
+    import fakeredis
+    from configs import redis as redis_config
+
+    server = fakeredis.FakeServer()
+    redis_config.redis_client = fakeredis.FakeRedis(
+        server=server, decode_responses=True
+    )
+    redis_config.async_redis_client = fakeredis.FakeAsyncRedis(
+        server=server, decode_responses=True
+    )
+    return redis_config.redis_client, redis_config.async_redis_client
+
+
+class FakeUpstreams:
+    """
+    In-process admin_service and nlp_service answering through
+    httpx.MockTransport after a configurable delay (latency +/- jitter).
+    """
+
+    def __init__(
+        self, nlp_latency_ms=20.0, admin_latency_ms=5.0, jitter=0.2, agents=3
+    ):
+        self.nlp_latency = nlp_latency_ms / 1000
+        self.admin_latency = admin_latency_ms / 1000
+        self.jitter = jitter
+        self.agents = [{"id": agent_id} for agent_id in range(1, agents + 1)]
+        self.calls = {"admin": 0, "nlp": 0}
+
+    def install(self):
+        from resources import http_clients
+
+        http_clients.override_transport("admin", httpx.MockTransport(self.admin))
+        http_clients.override_transport("nlp", httpx.MockTransport(self.nlp))
+
+    async def _delay(self, seconds: float):
+        spread = seconds * self.jitter
+        await asyncio.sleep(max(seconds + random.uniform(-spread, spread), 0))
+
+    async def admin(self, request: httpx.Request) -> httpx.Response:
+        self.calls["admin"] += 1
+        await self._delay(self.admin_latency)
+
+        path = request.url.path
+        if path.endswith("/ai-settings"):
+            return httpx.Response(200, json={"confidence_threshold": 60})
+        if path.endswith("/escalation-keywords"):
+            return httpx.Response(200, json={"keywords": [ESCALATION_WORD]})
+        if path.endswith("/nlp/export"):
+            return httpx.Response(
+                200,
+                json={"intents": [{"name": "greet", "phrases": ["hello", "hi"]}]},
+            )
+        if path.endswith("/agents/available"):
+            return httpx.Response(200, json={"agents": self.agents})
+        if request.method == "POST":
+            return httpx.Response(200, json={})
+        return httpx.Response(404, json={"detail": "Not Found"})
+
+    async def nlp(self, request: httpx.Request) -> httpx.Response:
+        self.calls["nlp"] += 1
+        await self._delay(self.nlp_latency)
+
+        text = json.loads(request.content).get("text", "")
+        if ESCALATION_WORD in text:
+            return httpx.Response(
+                200,
+                json={
+                    "intent": "human_handoff",
+                    "confidence": 0.95,
+                    "route": "ESCALATE",
+                    "handoff_detected": True,
+                    "entities": {},
+                },
+            )
+
+        return httpx.Response(
+            200,
+            json={
+                "intent": "greet",
+                "confidence": 0.9,
+                "route": "NORMAL",
+                "handoff_detected": False,
+                "entities": {},
+            },
+        )
@@ -0,0 +1,173 @@
+"""
+Load test: thousands of idle chat WebSockets against the 30-connection
+async DB pool (pool_size=10, max_overflow=20).
+
+Opens --sockets user WebSockets, keeps them idle, then has --active of
+them send --messages messages each while the rest stay connected. Fails
+(exit code 1) if any socket cannot connect or a message goes unanswered,
+and reports the peak number of pooled DB connections checked out.
+
+Runs against SQLite, fakeredis and the fake admin / NLP upstreams of
+benchmarks.fakes, so it needs only the packages in
+benchmarks/requirements.txt; no Redis, MySQL or upstream services. Raise
+`ulimit -n` above 2x --sockets.
+
+Run from chat_service/:
+    python -m benchmarks.idle_sockets --sockets 2000 --active 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(prefix="chat_bench_"), "bench.db")
+os.environ.setdefault("CHAT_DB_URI", f"sqlite:///{_db_path}")
+os.environ.setdefault("CHAT_CONNECTION_BUS", "memory")
+os.environ.setdefault("CHAT_RATE_LIMIT", "off")
+os.environ.setdefault("CHAT_AUTO_MIGRATE", "on")
+
+from benchmarks.fakes import FakeUpstreams, install_fake_redis  # noqa: E402
+
+install_fake_redis()
+
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+from main import app  # noqa: E402
+from models import async_engine  # noqa: E402
+
+CONNECT_CONCURRENCY = 200
+
+
+class PoolSampler:
+
+    def __init__(self, pool, interval=0.005):
+        self.pool = pool
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, self.pool.checkedout())
+            await asyncio.sleep(self.interval)
+
+    def stop(self):
+        self._task.cancel()
+
+
+async def open_sockets(url: str, count: int) -> tuple:
+    gate = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    sockets, failures = [], 0
+
+    async def _open(n):
+        nonlocal failures
+        async with gate:
+            try:
+                sockets.append(await websockets.connect(f"{url}/bench-idle-{n}"))
+            except Exception as e:
+                failures += 1
+                print(f"connect {n} failed: {e}", file=sys.stderr)
+
+    await asyncio.gather(*[_open(n) for n in range(count)])
+    return sockets, failures
+
+
+async def chat(ws, messages: int, latencies: list) -> int:
+    unanswered = 0
+    for n in range(messages):
+        started = time.perf_counter()
+        await ws.send(json.dumps({"text": f"hello {n}"}))
+        try:
+            reply = json.loads(await asyncio.wait_for(ws.recv(), 30))
+        except asyncio.TimeoutError:
+            unanswered += 1
+            continue
+        if "error" in reply:
+            unanswered += 1
+        latencies.append(time.perf_counter() - started)
+    return unanswered
+
+
+async def main(args):
+    upstreams = FakeUpstreams(
+        nlp_latency_ms=args.nlp_latency_ms,
+        admin_latency_ms=args.admin_latency_ms,
+        jitter=args.jitter,
+    )
+    upstreams.install()
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    pool = async_engine.sync_engine.pool
+    sampler = PoolSampler(pool)
+    sampler.start()
+
+    url = f"ws://127.0.0.1:{args.port}/chat/ws/chat"
+    sockets, connect_failures = await open_sockets(url, args.sockets)
+    await asyncio.sleep(1)
+    idle_checked_out = pool.checkedout()
+
+    latencies = []
+    unanswered = await asyncio.gather(
+        *[chat(ws, args.messages, latencies) for ws in sockets[: args.active]]
+    )
+
+    open_after = sum(1 for ws in sockets if ws.close_code is None)
+    latencies.sort()
+
+    report = {
+        "sockets_requested": args.sockets,
+        "sockets_open": open_after,
+        "connect_failures": connect_failures,
+        "pool_capacity": pool.size() + pool._max_overflow,
+        "checked_out_while_idle": idle_checked_out,
+        "peak_checked_out": sampler.peak,
+        "messages_sent": args.active * args.messages,
+        "unanswered": sum(unanswered),
+        "p50_ms": (
+            round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None
+        ),
+        "p99_ms": (
+            round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2)
+            if latencies
+            else None
+        ),
+    }
+    print(json.dumps(report, indent=2))
+
+    sampler.stop()
+    await asyncio.gather(*[ws.close() for ws in sockets], return_exceptions=True)
+    server.should_exit = True
+    await server_task
+
+    ok = (
+        connect_failures == 0
+        and open_after == args.sockets
+        and report["unanswered"] == 0
+        and sampler.peak <= report["pool_capacity"]
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sockets", type=int, default=2000)
+    parser.add_argument("--active", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--nlp-latency-ms", type=float, default=20.0)
+    parser.add_argument("--admin-latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8765)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,94 @@
+import inspect
+
+from sqlalchemy import event
+
+
+class RoundTripCounter:
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    @property
+    def total(self) -> int:
+        return self.statements + self.commits
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+
+class RedisCallCounter:
+    """
+    Counts Redis round trips made through the clients it is attached to:
+    one per command or script call, one per executed pipeline.
+    Pub/sub traffic is not counted.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def attach(self, client):
+        client.execute_command = self._counted(client.execute_command)
+
+        pipeline = client.pipeline
+
+        def counted_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            pipe.execute = self._counted(pipe.execute)
+            return pipe
+
+        client.pipeline = counted_pipeline
+
+    def _counted(self, fn):
+        if inspect.iscoroutinefunction(fn):
+
+            async def counted(*args, **kwargs):
+                self.calls += 1
+                return await fn(*args, **kwargs)
+
+        else:
+
+            def counted(*args, **kwargs):
+                self.calls += 1
+                return fn(*args, **kwargs)
+
+        return counted
+
+    def reset(self):
+        self.calls = 0
+
+
+def percentile(sorted_values: list, pct: float):
+    """
+    Nearest-rank percentile of an already sorted list, None when empty.
+    """
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def latency_summary(latencies: list) -> dict:
+    """
+    Seconds in, milliseconds out.
+    """
+    latencies = sorted(latencies)
+
+    def _ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "max_ms": _ms(latencies[-1] if latencies else None),
+    }
@@ -0,0 +1,160 @@
+"""
+Compares DB round trips and latency per chat message between the legacy
+per-row commit/refresh persistence and MessageUnitOfWork.
+
+Run from chat_service/:
+    python -m benchmarks.message_roundtrips --messages 500
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+_db_path = os.path.join(tempfile.mkdtemp(prefix="chat_bench_"), "bench.db")
+os.environ.setdefault("CHAT_DB_URI", f"sqlite:///{_db_path}")
+
+from benchmarks.instrumentation import RoundTripCounter  # noqa: E402
+from models import AsyncSessionLocal, async_engine  # noqa: E402
+from models.migrate import upgrade_database  # noqa: E402
+from models.models import Conversation, Escalation, Sessions  # noqa: E402
+from resources.unit_of_work import MessageUnitOfWork  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+ESCALATE_EVERY = 5
+
+
+async def _get_session(db, session_key: str):
+    session = await db.scalar(
+        select(Sessions).where(Sessions.session_key == session_key).limit(1)
+    )
+    if not session:
+        session = Sessions(session_key=session_key, platform="web", status="ACTIVE")
+        db.add(session)
+        await db.flush()
+    return session
+
+
+async def legacy_message(db, session_key: str, n: int):
+    session = await _get_session(db, session_key)
+    await db.commit()
+    await db.refresh(session)
+
+    user_message = Conversation(
+        session_id=session.id, sender="user", message_text=f"message {n}"
+    )
+    db.add(user_message)
+    await db.commit()
+    await db.refresh(user_message)
+
+    await db.scalar(
+        select(Escalation.id)
+        .where(Escalation.session_id == session.id, Escalation.status == "ASSIGNED")
+        .limit(1)
+    )
+
+    if n % ESCALATE_EVERY == 0:
+        db.add(
+            Escalation(
+                session_id=session.id,
+                conversation_id=user_message.id,
+                status="PENDING",
+            )
+        )
+        await db.commit()
+
+    bot_message = Conversation(
+        session_id=session.id,
+        sender="bot",
+        message_text="Handling intent: greet",
+        intent_detected="greet",
+        confidence_score=0.9,
+        is_fallback="NO",
+    )
+    db.add(bot_message)
+    await db.commit()
+    await db.refresh(bot_message)
+
+
+async def unit_of_work_message(db, session_key: str, n: int):
+    session = await _get_session(db, session_key)
+    uow = MessageUnitOfWork(db)
+
+    user_ref = uow.add_message(
+        session_id=session.id,
+        sender="user",
+        message_text=f"message {n}",
+        is_fallback=False,
+        created_at=datetime.utcnow(),
+    )
+
+    await db.scalar(
+        select(Escalation.id)
+        .where(Escalation.session_id == session.id, Escalation.status == "ASSIGNED")
+        .limit(1)
+    )
+
+    if n % ESCALATE_EVERY == 0:
+        uow.add_escalation(
+            user_ref,
+            session_id=session.id,
+            status="PENDING",
+            created_at=datetime.utcnow(),
+        )
+
+    uow.add_message(
+        session_id=session.id,
+        sender="bot",
+        message_text="Handling intent: greet",
+        intent_detected="greet",
+        confidence_score=0.9,
+        is_fallback="NO",
+        created_at=datetime.utcnow(),
+    )
+    await uow.commit()
+
+
+async def run(name: str, handler, messages: int, sessions: int, counter) -> dict:
+    counter.reset()
+    latencies = []
+
+    for n in range(messages):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await handler(db, f"bench-{name}-{n % sessions}", n)
+            latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "variant": name,
+        "messages": messages,
+        "round_trips_per_message": round(counter.total / messages, 2),
+        "statements_per_message": round(counter.statements / messages, 2),
+        "commits_per_message": round(counter.commits / messages, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+
+async def main(messages: int, sessions: int):
+    upgrade_database()
+    counter = RoundTripCounter(async_engine.sync_engine)
+
+    for name, handler in (
+        ("legacy", legacy_message),
+        ("unit_of_work", unit_of_work_message),
+    ):
+        print(await run(name, handler, messages, sessions, counter))
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.messages, args.sessions))
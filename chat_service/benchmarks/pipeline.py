@@ -0,0 +1,246 @@
+"""
+Throughput / latency benchmark for the chat message pipeline.
+
+Runs chat_service in-process (uvicorn) against SQLite, fakeredis and fake
+admin / NLP upstreams with configurable latency, drives REST
+(POST /chat/message) and WebSocket (/chat/ws/chat) traffic at a given
+concurrency, and reports p50/p95/p99 latency, messages/sec, DB
+statements and Redis calls per message. Results are written as JSON so
+runs can be compared.
+
+Needs the packages in benchmarks/requirements.txt; no Redis, MySQL or
+upstream services.
+
+Run from chat_service/:
+    python -m benchmarks.pipeline --mode both --messages 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+_db_path = os.path.join(tempfile.mkdtemp(prefix="chat_bench_"), "bench.db")
+os.environ.setdefault("CHAT_DB_URI", f"sqlite:///{_db_path}")
+os.environ.setdefault("CHAT_CONNECTION_BUS", "memory")
+os.environ.setdefault("CHAT_RATE_LIMIT", "off")
+os.environ.setdefault("CHAT_AUTO_MIGRATE", "on")
+
+from benchmarks.fakes import (  # noqa: E402
+    ESCALATION_WORD,
+    FakeUpstreams,
+    install_fake_redis,
+)
+from benchmarks.instrumentation import (  # noqa: E402
+    RedisCallCounter,
+    RoundTripCounter,
+    latency_summary,
+)
+
+sync_redis, async_redis = install_fake_redis()
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+from main import app  # noqa: E402
+from models import async_engine  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class Run:
+    """
+    Latencies and failures of one traffic mode.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.latencies = []
+        self.errors = 0
+
+    def record(self, started: float, ok: bool):
+        if ok:
+            self.latencies.append(time.perf_counter() - started)
+        else:
+            self.errors += 1
+
+
+def message_text(n: int, escalate_every: int) -> str:
+    if escalate_every and n % escalate_every == escalate_every - 1:
+        return f"please get me a {ESCALATION_WORD} ({n})"
+    return f"hello {n}"
+
+
+def session_for(base_key: str, text: str) -> str:
+    # An escalated session answers every later message with the AGENT
+    # shortcut, so escalations go to throwaway sessions
+    if ESCALATION_WORD in text:
+        return f"{base_key}-esc-{uuid.uuid4().hex[:12]}"
+    return base_key
+
+
+async def rest_worker(base_url: str, worker: int, count: int, args, run: Run):
+    base_key = f"bench-rest-{worker}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for n in range(count):
+            text = message_text(n, args.escalate_every)
+            payload = {"session_id": session_for(base_key, text), "text": text}
+
+            started = time.perf_counter()
+            try:
+                res = await client.post("/chat/message", json=payload)
+                ok = res.status_code == 200 and "response" in res.json()
+            except Exception as e:
+                print(f"rest {worker}/{n} failed: {e}", file=sys.stderr)
+                ok = False
+            run.record(started, ok)
+
+
+async def ws_worker(base_url: str, worker: int, count: int, args, run: Run):
+    base_key = f"bench-ws-{worker}"
+    sockets = {}
+
+    async def _socket(key):
+        if key not in sockets:
+            sockets[key] = await websockets.connect(f"{base_url}/chat/ws/chat/{key}")
+        return sockets[key]
+
+    try:
+        for n in range(count):
+            text = message_text(n, args.escalate_every)
+            key = session_for(base_key, text)
+
+            started = time.perf_counter()
+            try:
+                ws = await _socket(key)
+                await ws.send(json.dumps({"text": text}))
+                reply = json.loads(await asyncio.wait_for(ws.recv(), 30))
+                ok = "error" not in reply
+            except Exception as e:
+                print(f"ws {worker}/{n} failed: {e}", file=sys.stderr)
+                ok = False
+            run.record(started, ok)
+
+            if key != base_key:
+                await sockets.pop(key).close()
+    finally:
+        await asyncio.gather(
+            *[ws.close() for ws in sockets.values()], return_exceptions=True
+        )
+
+
+async def drive(mode: str, base_url: str, messages: int, args) -> Run:
+    run = Run(mode)
+    worker = rest_worker if mode == "rest" else ws_worker
+
+    per_worker, extra = divmod(messages, args.concurrency)
+    await asyncio.gather(
+        *[
+            worker(base_url, n, per_worker + (1 if n < extra else 0), args, run)
+            for n in range(args.concurrency)
+        ]
+    )
+    return run
+
+
+async def main(args):
+    upstreams = FakeUpstreams(
+        nlp_latency_ms=args.nlp_latency_ms,
+        admin_latency_ms=args.admin_latency_ms,
+        jitter=args.jitter,
+    )
+    upstreams.install()
+
+    db_counter = RoundTripCounter(async_engine.sync_engine)
+    redis_counter = RedisCallCounter()
+    redis_counter.attach(sync_redis)
+    redis_counter.attach(async_redis)
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    modes = ["rest", "ws"] if args.mode == "both" else [args.mode]
+    results = []
+
+    for mode in modes:
+        scheme = "http" if mode == "rest" else "ws"
+        base_url = f"{scheme}://127.0.0.1:{args.port}"
+
+        # Warm-up: creates the sessions and fills the config caches
+        await drive(mode, base_url, args.warmup, args)
+
+        db_counter.reset()
+        redis_counter.reset()
+        started = time.perf_counter()
+        run = await drive(mode, base_url, args.messages, args)
+        elapsed = time.perf_counter() - started
+
+        done = len(run.latencies)
+        results.append(
+            {
+                "mode": mode,
+                "messages": args.messages,
+                "errors": run.errors,
+                "duration_s": round(elapsed, 3),
+                "messages_per_sec": round(done / elapsed, 2) if elapsed else None,
+                **latency_summary(run.latencies),
+                "db_statements_per_message": round(
+                    db_counter.statements / args.messages, 2
+                ),
+                "db_commits_per_message": round(db_counter.commits / args.messages, 2),
+                "redis_calls_per_message": round(
+                    redis_counter.calls / args.messages, 2
+                ),
+            }
+        )
+
+    server.should_exit = True
+    await server_task
+
+    report = {
+        "benchmark": "pipeline",
+        "started_at": datetime.utcnow().isoformat(),
+        "config": vars(args),
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"saved to {output}")
+
+    return 0 if all(result["errors"] == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=["rest", "ws", "both"], default="both")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument(
+        "--escalate-every",
+        type=int,
+        default=10,
+        help="every Nth message asks for a human (0 disables escalations)",
+    )
+    parser.add_argument("--nlp-latency-ms", type=float, default=20.0)
+    parser.add_argument("--admin-latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="JSON file, default benchmarks/results/")
+    sys.exit(asyncio.run(main(parser.parse_args())))
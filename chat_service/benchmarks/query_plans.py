@@ -0,0 +1,106 @@
+"""
+Checks that the chat hot-path queries are served by the indexes added in
+migration 0002 (alembic upgrade head), using the database's own planner.
+
+Runs against a fresh SQLite database by default; set CHAT_DB_URI to check
+a MySQL database instead (use a populated one, since MySQL may prefer a
+table scan on near-empty tables). Exits 1 when a query does not use its
+index.
+
+Run from chat_service/:
+    python -m benchmarks.query_plans
+"""
+
+import os
+import sys
+import tempfile
+
+_db_path = os.path.join(tempfile.mkdtemp(prefix="chat_bench_"), "plans.db")
+os.environ.setdefault("CHAT_DB_URI", f"sqlite:///{_db_path}")
+
+from models import engine  # noqa: E402
+from models.migrate import upgrade_database  # noqa: E402
+from models.models import Conversation, Escalation  # noqa: E402
+from sqlalchemy import func, select, text  # noqa: E402
+
+# (name, statement, index expected in the plan)
+HOT_QUERIES = (
+    (
+        "open escalation for a session (every message)",
+        select(Escalation.id)
+        .where(Escalation.session_id == 1, Escalation.status == "ASSIGNED")
+        .limit(1),
+        "ix_escalations_session_id_status",
+    ),
+    (
+        "open escalations for a bulk batch",
+        select(Escalation.session_id)
+        .where(Escalation.session_id.in_([1, 2, 3]), Escalation.status == "ASSIGNED")
+        .distinct(),
+        "ix_escalations_session_id_status",
+    ),
+    (
+        "agent loads (assignment fallback)",
+        select(Escalation.assigned_to, func.count())
+        .where(
+            Escalation.assigned_to.in_([1, 2, 3]), Escalation.status == "ASSIGNED"
+        )
+        .group_by(Escalation.assigned_to),
+        "ix_escalations_assigned_to_status",
+    ),
+    (
+        "transcript page, newest first",
+        select(Conversation.id, Conversation.message_text)
+        .where(Conversation.session_id == 1, Conversation.id < 1000)
+        .order_by(Conversation.id.desc())
+        .limit(51),
+        "ix_conversations_session_id_id",
+    ),
+    (
+        "transcript page, oldest first",
+        select(Conversation.id, Conversation.message_text)
+        .where(Conversation.session_id == 1, Conversation.id > 1000)
+        .order_by(Conversation.id.asc())
+        .limit(51),
+        "ix_conversations_session_id_id",
+    ),
+)
+
+
+def explain(connection, statement) -> list:
+    """
+    Plan rows as text: EXPLAIN QUERY PLAN on SQLite, EXPLAIN on MySQL.
+    """
+    sql = str(
+        statement.compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+    )
+
+    if connection.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).mappings()
+        return [row["detail"] for row in rows]
+
+    rows = connection.execute(text(f"EXPLAIN {sql}")).mappings()
+    return [f"table={row['table']} key={row['key']} type={row['type']}" for row in rows]
+
+
+def main() -> int:
+    upgrade_database()
+
+    failures = 0
+    with engine.connect() as connection:
+        for name, statement, index in HOT_QUERIES:
+            plan = explain(connection, statement)
+            ok = any(index in line for line in plan)
+            failures += not ok
+
+            print(f"[{'ok' if ok else 'FAIL'}] {name} -> {index}")
+            for line in plan:
+                print(f"    {line}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
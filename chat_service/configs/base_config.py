@@ -1,3 +1,5 @@
+import os
+
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -8,6 +10,83 @@ class BaseConfig:
     ACCESS_TOKEN_EXPIRE_MINUTES = 3
     REFRESH_TOKEN_EXPIRE_MINUTES = 25
 
+    # Upper bound for loading ai_settings / escalation keywords / intent
+    # phrases per message; slower sources fall back to defaults
+    CONFIG_PREFETCH_TIMEOUT_SECONDS = 2.0
+
+    # "redis" routes WebSocket deliveries across workers, "memory" is
+    # enough for a single process
+    CONNECTION_BUS_BACKEND = os.getenv("CHAT_CONNECTION_BUS", "redis")
+
+    # Per-WebSocket outbound queue; overflow policy is "drop_oldest" or
+    # "disconnect"
+    WS_SEND_QUEUE_SIZE = 100
+    WS_OVERFLOW_POLICY = "drop_oldest"
+    WS_SEND_TIMEOUT_SECONDS = 10
+
+    # POST /chat/messages/bulk: sessions processed concurrently, NLP calls
+    # in flight, messages accepted per request, messages written per
+    # transaction
+    BULK_INGEST_CONCURRENCY = 32
+    BULK_NLP_CONCURRENCY = 64
+    BULK_INGEST_MAX_ITEMS = 10000
+    BULK_INSERT_BATCH_SIZE = 500
+
+    # Token buckets for /chat/message, the SSE stream and chat WebSocket
+    # messages: burst capacity and refill rate (tokens per second)
+    RATE_LIMIT_ENABLED = os.getenv("CHAT_RATE_LIMIT", "on") != "off"
+    RATE_LIMIT_SESSION_CAPACITY = 20
+    RATE_LIMIT_SESSION_PER_SECOND = 1.0
+    RATE_LIMIT_IP_CAPACITY = 100
+    RATE_LIMIT_IP_PER_SECOND = 10.0
+
+    # POST /chat/messages/bulk, charged per message and per IP: a full batch
+    # fits the bucket, sustained replay is capped at the refill rate
+    RATE_LIMIT_BULK_CAPACITY = BULK_INGEST_MAX_ITEMS
+    RATE_LIMIT_BULK_PER_SECOND = 200.0
+
+    # Client message ids: how long a processed result is replayed to
+    # retries, how long an in-progress claim lives, and how long a retry
+    # waits for the original to finish
+    IDEMPOTENCY_TTL_SECONDS = 3600
+    IDEMPOTENCY_PENDING_TTL_SECONDS = 60
+    IDEMPOTENCY_WAIT_SECONDS = 10
+
+    # GET /chat/sessions/{id}/messages page sizes
+    HISTORY_PAGE_SIZE = 50
+    HISTORY_MAX_PAGE_SIZE = 200
+
+    # Retention purger: deletes conversations / escalations / feedback older
+    # than the owner's data_retention_days, chunk by chunk in id order
+    RETENTION_ENABLED = os.getenv("CHAT_RETENTION", "off") == "on"
+    RETENTION_DEFAULT_DAYS = 90
+    RETENTION_CHUNK_SIZE = 500
+    RETENTION_CHUNK_PAUSE_SECONDS = 0.2
+    RETENTION_INTERVAL_SECONDS = 3600
+
+    # Cold storage for conversations older than ARCHIVE_AFTER_DAYS: gzip
+    # JSONL parts per tenant and day (see resources/archive.py), deleted by
+    # the retention purger once past the tenant's data_retention_days
+    ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", "./archive")
+    ARCHIVE_AFTER_DAYS = 30
+    ARCHIVE_CHUNK_SIZE = 1000
+    ARCHIVE_CHUNK_PAUSE_SECONDS = 0.2
+
+    # Analytics events: buffered in-process, flushed in batches to a Redis
+    # Stream ("redis"), rotating NDJSON files ("ndjson") or nowhere ("off")
+    ANALYTICS_SINK = os.getenv("CHAT_ANALYTICS_SINK", "redis")
+    ANALYTICS_QUEUE_SIZE = 10000
+    ANALYTICS_FLUSH_SIZE = 500
+    ANALYTICS_FLUSH_INTERVAL_SECONDS = 1.0
+    ANALYTICS_STREAM = "analytics:events"
+    ANALYTICS_STREAM_MAXLEN = 1_000_000
+    ANALYTICS_NDJSON_DIR = os.getenv("CHAT_ANALYTICS_DIR", "./analytics")
+    ANALYTICS_NDJSON_MAX_BYTES = 64 * 1024 * 1024
+    ANALYTICS_NDJSON_MAX_AGE_SECONDS = 300
+
+    # Per-intent hourly usage deltas are pushed to admin_service this often
+    INTENT_USAGE_FLUSH_INTERVAL_SECONDS = 10
+
 
 class Base(DeclarativeBase):
 
@@ -18,3 +97,23 @@ class ServiceURL:
 
     NLP_URL = "http://localhost:8001/nlp/parse"
     ADMIN_BASE_URL = "http://localhost:8002/admin"
+
+
+class HTTPPoolConfig:
+
+    # Per-upstream connection pool limits for the shared httpx clients.
+    UPSTREAMS = {
+        "admin": {
+            "max_connections": 50,
+            "max_keepalive_connections": 20,
+            "keepalive_expiry": 30,
+            "http2": False,
+        },
+        "nlp": {
+            "max_connections": 100,
+            "max_keepalive_connections": 50,
+            "keepalive_expiry": 30,
+            "http2": False,
+        },
+    }
+    DEFAULT_TIMEOUT = 5
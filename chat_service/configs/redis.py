@@ -1,3 +1,22 @@
 import redis
+import redis.asyncio as aioredis
 
-redis_client = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
+REDIS_HOST = "localhost"
+REDIS_PORT = 6379
+REDIS_DB = 0
+REDIS_MAX_CONNECTIONS = 100
+
+# Blocking client for scripts and sync routes
+redis_client = redis.Redis(
+    host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True
+)
+
+# Non-blocking client for async request handlers
+async_redis_pool = aioredis.ConnectionPool(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+)
+async_redis_client = aioredis.Redis(connection_pool=async_redis_pool)
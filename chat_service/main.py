@@ -1,8 +1,18 @@
+import asyncio
+
 from configs import Configuration
+from configs.redis import async_redis_client
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.routing import APIRoute
+from models import AsyncSessionLocal, async_engine
+from models.migrate import upgrade_database
+from resources import agent_load, cache, http_clients, retention
+from resources.analytics import event_buffer
+from resources.connection_bus import connection_bus
+from resources.intent_usage import intent_usage
+from resources.metrics import render_metrics
 from routes import router
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
@@ -25,8 +35,13 @@ app.add_middleware(SessionMiddleware, secret_key="some-random-string")
 def startup() -> None:
     """
     Application startup hook.
-    Verifies database connectivity.
+    Applies schema migrations (when AUTO_MIGRATE is on), verifies database
+    connectivity, opens the upstream HTTP clients and subscribes to cache
+    invalidations.
     """
+    if getattr(Configuration, "AUTO_MIGRATE", False):
+        upgrade_database()
+
     db = Configuration.SessionLocal()
     try:
         db.execute(text("SELECT 1"))  # Explicitly wrap the query in text()
@@ -36,6 +51,49 @@ def startup() -> None:
     finally:
         db.close()
 
+    http_clients.open_clients()
+    cache.start_invalidation_listener()
+
+
+background_tasks = []
+
+
+@app.on_event("startup")
+async def start_background_jobs() -> None:
+    """
+    Starts the WebSocket connection bus, the analytics flusher and periodic
+    jobs that need the event loop.
+    """
+    await connection_bus.start()
+    await event_buffer.start()
+    background_tasks.append(
+        asyncio.create_task(agent_load.reconcile_forever(AsyncSessionLocal))
+    )
+    background_tasks.append(asyncio.create_task(intent_usage.flush_forever()))
+    if Configuration.RETENTION_ENABLED:
+        background_tasks.append(
+            asyncio.create_task(retention.retention_forever(AsyncSessionLocal))
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    """
+    Application shutdown hook.
+    Stops background jobs, flushes queued analytics events and intent
+    usage counters, closes the pooled upstream HTTP clients, async Redis
+    and async DB connections.
+    """
+    for task in background_tasks:
+        task.cancel()
+    await event_buffer.stop()
+    await intent_usage.flush()
+    await connection_bus.stop()
+    cache.stop_invalidation_listener()
+    await http_clients.close_clients()
+    await async_redis_client.aclose()
+    await async_engine.dispose()
+
 
 @app.get("/")
 def root_api():
@@ -46,6 +104,16 @@ def root_api():
     return JSONResponse({"message": "Welcome to Chat Service"})
 
 
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint (pipeline stage histograms and counters).
+    Authentication not required.
+    """
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
 app.include_router(router)
 
 my_routers = app.router.routes
@@ -0,0 +1,49 @@
+from logging.config import fileConfig
+
+from alembic import context
+from configs.base_config import Base
+from models import SQLALCHEMY_DATABASE_URL, engine
+from models import models  # noqa: F401  (registers the tables on Base)
+
+config = context.config
+
+# models.migrate.upgrade_database() runs inside the app and keeps its logging
+if config.config_file_name is not None and config.attributes.get(
+    "configure_logger", True
+):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """
+    Emits the SQL instead of running it (alembic upgrade head --sql).
+    """
+    context.configure(
+        url=SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,93 @@
+"""initial schema
+
+The tables as models.models declared them when the service created its
+schema with Base.metadata.create_all() at import time. Tables that already
+exist are left alone, so databases created that way are adopted by simply
+running `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *columns):
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def upgrade() -> None:
+    _create_table(
+        "sessions",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("session_key", sa.String(255), nullable=False, unique=True),
+        sa.Column("user_id", sa.Integer, nullable=True),
+        sa.Column("platform", sa.String(50), nullable=False),
+        sa.Column("ip_address", sa.Text),
+        sa.Column("user_agent", sa.Text),
+        sa.Column("started_at", sa.DateTime),
+        sa.Column("ended_at", sa.DateTime, nullable=True),
+        sa.Column("status", sa.String(50)),
+        sa.Column("session_metadata", sa.JSON),
+    )
+
+    _create_table(
+        "conversations",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("session_id", sa.Integer, nullable=False),
+        sa.Column("user_id", sa.Integer, nullable=True),
+        sa.Column("sender", sa.String(100), nullable=False),
+        sa.Column("message_text", sa.Text, nullable=False),
+        sa.Column("message_type", sa.String(100)),
+        sa.Column("intent_detected", sa.String(100)),
+        sa.Column("confidence_score", sa.Float),
+        sa.Column("entities", sa.JSON),
+        sa.Column("sentiment", sa.String(100), nullable=True),
+        sa.Column("language", sa.String(10)),
+        sa.Column("response_time_ms", sa.Integer),
+        sa.Column("is_fallback", sa.String(100)),
+        sa.Column("session_metadata", sa.JSON),
+        sa.Column("created_at", sa.DateTime),
+    )
+
+    _create_table(
+        "escalations",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("session_id", sa.Integer, nullable=False),
+        sa.Column("conversation_id", sa.Integer, nullable=True),
+        sa.Column("reason", sa.String(255)),
+        sa.Column("priority", sa.String(100)),
+        sa.Column("status", sa.String(100), nullable=False),
+        sa.Column("assigned_to", sa.Integer, nullable=True),
+        sa.Column("assigned_at", sa.DateTime),
+        sa.Column("resolved_at", sa.DateTime),
+        sa.Column("resolution_notes", sa.Text),
+        sa.Column("created_at", sa.DateTime),
+    )
+
+    _create_table(
+        "feedback",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("session_id", sa.Integer, nullable=False),
+        sa.Column("conversation_id", sa.Integer, nullable=True),
+        sa.Column("rating", sa.Integer),
+        sa.Column("feedback_type", sa.String(100)),
+        sa.Column("comment", sa.Text),
+        sa.Column("sentiment", sa.String(100)),
+        sa.Column("created_at", sa.DateTime),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("feedback")
+    op.drop_table("escalations")
+    op.drop_table("conversations")
+    op.drop_table("sessions")
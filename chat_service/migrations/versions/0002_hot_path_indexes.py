@@ -0,0 +1,43 @@
+"""hot path indexes
+
+conversations (session_id, id): transcript pages (keyset pagination).
+escalations (session_id, status): the open-escalation check run on every
+message.
+escalations (assigned_to, status): per-agent load counts (agent
+assignment fallback and the load index rebuild).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_conversations_session_id_id", "conversations", ["session_id", "id"]),
+    ("ix_escalations_session_id_status", "escalations", ["session_id", "status"]),
+    ("ix_escalations_assigned_to_status", "escalations", ["assigned_to", "status"]),
+)
+
+
+def _existing_indexes(table: str) -> set:
+    inspector = sa.inspect(op.get_bind())
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        # Databases created after the models declared the index already have it
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,40 @@
+"""analytics events
+
+Table loaded in batches by the analytics consumer
+(python -m resources.analytics) from the Redis Stream or NDJSON files.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analytics_events",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("session_id", sa.Integer, nullable=True),
+        sa.Column("payload", sa.JSON),
+        sa.Column("created_at", sa.DateTime),
+    )
+    op.create_index(
+        "ix_analytics_events_event_type_created_at",
+        "analytics_events",
+        ["event_type", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_analytics_events_event_type_created_at", table_name="analytics_events"
+    )
+    op.drop_table("analytics_events")
@@ -1,20 +1,67 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from configs import Configuration
 
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+
+def to_async_url(uri: str) -> str:
+    """
+    Maps a sync DB URI to its asyncio driver,
+    e.g. mysql+pymysql:// -> mysql+aiomysql://, sqlite:// -> sqlite+aiosqlite://
+    """
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {backend}")
+    return url.set(drivername=f"{backend}+{driver}").render_as_string(
+        hide_password=False
+    )
+
+
+def _pool_options(uri: str) -> dict:
+    # In-memory SQLite uses a static pool that takes no sizing options
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {"pool_size": 10, "max_overflow": 20}
+
 
 SQLALCHEMY_DATABASE_URL = Configuration.DB_URI
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, pool_size=10, max_overflow=20
+    SQLALCHEMY_DATABASE_URL, **_pool_options(SQLALCHEMY_DATABASE_URL)
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+ASYNC_SQLALCHEMY_DATABASE_URL = getattr(
+    Configuration, "ASYNC_DB_URI", None
+) or to_async_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    pool_pre_ping=True,
+    **_pool_options(ASYNC_SQLALCHEMY_DATABASE_URL),
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
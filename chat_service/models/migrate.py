@@ -0,0 +1,25 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(SERVICE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(SERVICE_DIR, "migrations"))
+    # Leave the application's logging configuration alone
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_database(revision: str = "head"):
+    """
+    Same as `alembic upgrade head` from chat_service/.
+    """
+    command.upgrade(alembic_config(), revision)
+
+
+if __name__ == "__main__":
+    upgrade_database()
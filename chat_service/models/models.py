@@ -1,8 +1,7 @@
 from datetime import datetime
 
 from configs.base_config import Base
-from models import engine
-from sqlalchemy import JSON, Column, DateTime, Float, Integer, String, Text
+from sqlalchemy import JSON, Column, DateTime, Float, Index, Integer, String, Text
 
 
 class Sessions(Base):
@@ -25,6 +24,10 @@ class Sessions(Base):
 class Conversation(Base):
 
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Keyset pagination of a session's transcript
+        Index("ix_conversations_session_id_id", "session_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -47,6 +50,12 @@ class Conversation(Base):
 class Escalation(Base):
 
     __tablename__ = "escalations"
+    __table_args__ = (
+        # Open-escalation check per message
+        Index("ix_escalations_session_id_status", "session_id", "status"),
+        # Per-agent load counts
+        Index("ix_escalations_assigned_to_status", "assigned_to", "status"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -77,4 +86,16 @@ class Feedback(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
-Base.metadata.create_all(bind=engine)
+class AnalyticsEvent(Base):
+
+    __tablename__ = "analytics_events"
+    __table_args__ = (
+        Index("ix_analytics_events_event_type_created_at", "event_type", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    event_type = Column(String(100), nullable=False)
+    session_id = Column(Integer, nullable=True)
+    payload = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
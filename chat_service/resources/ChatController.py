@@ -1,8 +1,11 @@
+import asyncio
 import json
+import math
 import uuid
+from contextlib import nullcontext
 from datetime import datetime
+from typing import Optional
 
-import jwt
 from configs.base_config import BaseConfig
 from fastapi import (
     APIRouter,
@@ -13,8 +16,9 @@ from fastapi import (
     WebSocketDisconnect,
     status,
 )
-from jose import JWTError
-from models import SessionLocal, get_db
+from fastapi.responses import StreamingResponse
+from jose import JWTError, jwt
+from models import AsyncSessionLocal, get_async_db, get_db
 from models.models import Conversation, Escalation, Sessions
 from resources import context, nlp_client
 from resources.admin_client import (
@@ -25,15 +29,32 @@ from resources.admin_client import (
     mark_agent_available,
     mark_agent_busy,
 )
-from resources.cache import get_cache, set_cache
+from resources.agent_load import assign_least_loaded_agent, release_agent
+from resources.archive import iter_archived_messages
+from resources.cache import get_or_fetch_many
+from resources.connection_bus import connection_bus
+from resources.idempotency import (
+    MAX_CLIENT_MESSAGE_ID_LENGTH,
+    MessageInFlight,
+    run_once,
+)
+from resources.intent_usage import intent_usage
+from resources.metrics import StageTimer
+from resources.rate_limit import check_bulk_rate_limit, check_rate_limit
+from resources.session_cache import cache_session, evict_session, resolve_session
+from resources.unit_of_work import MessageUnitOfWork
 from resources.utils import (
-    allow_request,
+    allow_request_async,
     build_response,
     create_access_token,
     log_event,
-    record_failure,
-    record_success,
+    record_failure_async,
+    record_success_async,
 )
+from resources.ws_connection import ConnectionClosed, ManagedConnection
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -50,18 +71,252 @@ async def websocket_chat(websocket: WebSocket, session_key: str):
 
 
 @router.post("/message")
-async def chat(payload: dict):
+async def chat(
+    payload: dict, request: Request, db: AsyncSession = Depends(get_async_db)
+):
     session_key = payload.get("session_id")
     text = payload.get("text")
 
+    client_message_id = payload.get("client_message_id")
+
     if not session_key or not text:
         raise HTTPException(400, "session_id and text required")
+    if not valid_client_message_id(client_message_id):
+        raise HTTPException(400, "Invalid client_message_id")
+
+    await enforce_rate_limit(session_key, client_ip(request))
 
-    db: Session = SessionLocal()
     try:
-        return await process_message(db=db, session_id=session_key, text=text)
+        return await submit_message(
+            lambda: nullcontext(db), session_key, text, client_message_id
+        )
+    except MessageInFlight:
+        raise HTTPException(
+            status.HTTP_409_CONFLICT,
+            "Message is still being processed, retry shortly",
+        )
+
+
+async def submit_message(open_db, session_key: str, text: str, client_message_id):
+    """
+    process_message() deduplicated on client_message_id: a retry gets the
+    stored result (flagged "replayed") instead of a second run.
+    open_db() must return an async context manager yielding an AsyncSession;
+    it is only entered when the pipeline actually runs.
+    """
+
+    async def _run():
+        async with open_db() as db:
+            return await process_message(
+                db, session_key, text, message_id=client_message_id
+            )
+
+    result, replayed = await run_once(session_key, client_message_id, _run)
+    return {**result, "replayed": True} if replayed else result
+
+
+def valid_client_message_id(client_message_id) -> bool:
+    return client_message_id is None or (
+        isinstance(client_message_id, str)
+        and 0 < len(client_message_id) <= MAX_CLIENT_MESSAGE_ID_LENGTH
+    )
+
+
+def client_ip(connection) -> str:
+    """
+    Peer address of a Request / WebSocket (the proxy's address unless
+    uvicorn runs with --proxy-headers).
+    """
+    return connection.client.host if connection.client else None
+
+
+async def enforce_rate_limit(session_key: str, ip: str):
+    """
+    Raises 429 (with Retry-After) before any DB work is done.
+    """
+    allowed, retry_after = await check_rate_limit(session_key, ip)
+    if not allowed:
+        raise HTTPException(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            "Too many messages, slow down",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+# ------------------------------------------------------------------
+# Server-Sent Events
+# ------------------------------------------------------------------
+
+
+@router.post("/message/stream")
+async def chat_stream(payload: dict, request: Request):
+    """
+    Same pipeline as /message, streamed as SSE events per stage
+    """
+    return await sse_response(
+        payload.get("session_id"),
+        payload.get("text"),
+        payload.get("client_message_id"),
+        client_ip(request),
+    )
+
+
+@router.get("/message/stream")
+async def chat_stream_get(
+    request: Request,
+    session_id: str = None,
+    text: str = None,
+    client_message_id: str = None,
+):
+    """
+    EventSource-friendly variant of POST /message/stream
+    """
+    return await sse_response(session_id, text, client_message_id, client_ip(request))
+
+
+async def sse_response(session_key: str, text: str, client_message_id, ip: str):
+    if not session_key or not text:
+        raise HTTPException(400, "session_id and text required")
+    if not valid_client_message_id(client_message_id):
+        raise HTTPException(400, "Invalid client_message_id")
+
+    await enforce_rate_limit(session_key, ip)
+
+    return StreamingResponse(
+        stream_message_events(session_key, text, client_message_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_pipeline_tasks = set()
+
+
+async def stream_message_events(
+    session_key: str, text: str, client_message_id=None, platform="web"
+):
+    """
+    Runs the pipeline in its own task and relays its stages as SSE frames.
+    The task outlives a disconnecting client, so the message is still
+    persisted. A retried client_message_id gets a single replayed "done".
+    """
+    queue = asyncio.Queue()
+    task = asyncio.create_task(
+        _run_pipeline(queue, session_key, text, client_message_id, platform)
+    )
+    _pipeline_tasks.add(task)
+    task.add_done_callback(_pipeline_tasks.discard)
+
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        stage, data = item
+        yield f"event: {stage}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _run_pipeline(
+    queue: asyncio.Queue, session_key, text, client_message_id, platform
+):
+    async def _stream():
+        result = None
+        async with AsyncSessionLocal() as db:
+            async for stage, data in message_pipeline(
+                db, session_key, text, platform, message_id=client_message_id
+            ):
+                queue.put_nowait((stage, data))
+                if stage == "done":
+                    result = data
+        return result
+
+    try:
+        result, replayed = await run_once(session_key, client_message_id, _stream)
+        if replayed:
+            queue.put_nowait(("done", {**result, "replayed": True}))
+    except MessageInFlight:
+        queue.put_nowait(("error", {"error": "Message is still being processed"}))
+    except Exception as e:
+        print(e)
+        queue.put_nowait(("error", {"error": "Internal error"}))
     finally:
-        db.close()
+        queue.put_nowait(None)
+
+
+# ------------------------------------------------------------------
+# Bulk Ingestion
+# ------------------------------------------------------------------
+
+
+@router.post("/messages/bulk")
+async def ingest_bulk(request: Request):
+    """
+    Replays a batch of {session_id, text, platform} messages sent as a JSON
+    array or as NDJSON (application/x-ndjson). Returns one result per
+    message, in input order. Each message costs one bulk rate-limit token.
+    """
+    limit = BaseConfig.BULK_INGEST_MAX_ITEMS
+    content_type = request.headers.get("content-type", "")
+
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = []
+        async for item in read_ndjson(request):
+            items.append(item)
+            if len(items) > limit:
+                break
+    else:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(400, "Body must be a JSON array or NDJSON")
+        if isinstance(items, dict):
+            items = items.get("messages")
+        if not isinstance(items, list):
+            raise HTTPException(400, "Body must be a JSON array or NDJSON")
+
+    if len(items) > limit:
+        raise HTTPException(413, f"At most {limit} messages per request")
+
+    allowed, retry_after = await check_bulk_rate_limit(
+        client_ip(request), max(len(items), 1)
+    )
+    if not allowed:
+        raise HTTPException(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            "Too many messages, slow down",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    results = await ingest_messages(items)
+
+    return {
+        "count": len(results),
+        "failed": sum(1 for result in results if result["status"] != "ok"),
+        "results": results,
+    }
+
+
+async def read_ndjson(request: Request):
+    """
+    Parses the body line by line as it streams in. Lines that are not valid
+    JSON come out as None and are reported as failed items.
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_json_line(line)
+
+    if buffer.strip():
+        yield _parse_json_line(buffer)
+
+
+def _parse_json_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
 
 
 # ------------------------------------------------------------------
@@ -69,98 +324,246 @@ async def chat(payload: dict):
 # ------------------------------------------------------------------
 
 
-async def process_message(db: Session, session_id: str, text: str, platform="web"):
+async def get_or_create_session(db: AsyncSession, session_key: str, platform: str):
+    """
+    Resolves a session_key through the session cache, creating (and
+    committing) the session on first use. When a concurrent first message
+    created the same session first, its row is used instead.
+    """
+    session = await resolve_session(db, session_key)
+    if session:
+        # End the lookup's read transaction (on a cache miss) so the pooled
+        # connection is not held while the caller waits on admin / NLP
+        await db.rollback()
+        return session
+
+    new_session = Sessions(
+        session_key=session_key,
+        platform=platform,
+        started_at=datetime.utcnow(),
+        status="ACTIVE",
+    )
+    db.add(new_session)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        session = await resolve_session(db, session_key)
+        await db.rollback()
+        return session
+    return await cache_session(session_key, new_session)
+
+
+async def process_message(
+    db: AsyncSession, session_id: str, text: str, platform="web", message_id=None
+):
+    """
+    Runs message_pipeline() to completion and returns its final result.
+    """
+    result = None
+    async for stage, payload in message_pipeline(
+        db, session_id, text, platform, message_id
+    ):
+        if stage == "done":
+            result = payload
+    return result
+
+
+async def message_pipeline(
+    db: AsyncSession, session_id: str, text: str, platform="web", message_id=None
+):
     """
     Core chat processing pipeline.
-    All DB operations are INLINE as requested.
+    All writes for one message (user + bot messages, escalation) go through
+    a single MessageUnitOfWork transaction. No DB connection is held while
+    waiting on admin / NLP calls.
+
+    Yields (stage, payload) as each stage finishes:
+    ack -> nlp -> response -> agent (escalations only) -> done
+    message_id (the client's id when it sent one) is echoed in ack / done.
     """
 
     # ------------------------------------------------------------------
     # Get or Create Session
     # ------------------------------------------------------------------
-    session = db.query(Sessions).filter(Sessions.session_key == session_id).first()
+    timer = StageTimer()
 
-    if not session:
-        session = Sessions(
-            session_key=session_id,
-            platform=platform,
-            started_at=datetime.utcnow(),
-            status="ACTIVE",
-        )
-        db.add(session)
-        db.commit()
-        db.refresh(session)
+    session_key = session_id
+    with timer.stage("session_lookup"):
+        session = await get_or_create_session(db, session_key, platform)
+
+    session_id = session["id"]
+    user_id = session["user_id"]  # may be None
+
+    message_id = message_id or uuid.uuid4().hex
+    yield "ack", {"session_id": session_id, "message_id": message_id}
+
+    uow = MessageUnitOfWork(db)
 
-    session_id = session.id
-    user_id = session.user_id  # may be None
+    with timer.stage("config_load"):
+        config = await load_message_config(user_id)
 
     # ------------------------------------------------------------------
-    # ADMIN CONFIG (WITH REDIS CACHE)
+    # Queue USER message
     # ------------------------------------------------------------------
-    cache_key_ai = f"ai_settings:{user_id}"
-    cache_key_keywords = f"escalation_keywords:{user_id}"
-    cache_key_phrases = "intent_phrases"
+    user_ref = uow.add_message(**user_message_values(session_id, text))
+
+    with timer.stage("escalation_check"):
+        active_escalation = await db.scalar(
+            select(Escalation.id)
+            .where(
+                Escalation.session_id == session_id,
+                Escalation.status == "ASSIGNED",
+            )
+            .limit(1)
+        )
+        # End the read transaction so the pooled connection is not held
+        # across the NLP call; the unit of work checks one out again to persist
+        await db.rollback()
 
-    ai_settings = get_cache(cache_key_ai)
-    if not ai_settings:
-        try:
-            ai_settings = await fetch_ai_settings(user_id)
-            set_cache(cache_key_ai, ai_settings, ttl=600)
-        except Exception:
-            ai_settings = {"confidence_threshold": 60}
+    if active_escalation:
+        yield "response", AGENT_RESPONSE
 
-    escalation_keywords = get_cache(cache_key_keywords)
-    if not escalation_keywords:
-        try:
-            escalation_keywords = await fetch_escalation_keywords(user_id)
-            set_cache(cache_key_keywords, escalation_keywords, ttl=600)
-        except Exception:
-            escalation_keywords = []
+        with timer.stage("persist"):
+            ids = await uow.commit()
+        timer.finish("AGENT")
 
-    intent_phrases = get_cache(cache_key_phrases)
-    if not intent_phrases:
-        try:
-            intent_phrases = await fetch_intent_phrases()
-            set_cache(cache_key_phrases, intent_phrases, ttl=3600)
-        except Exception:
-            intent_phrases = {}
+        yield "done", {
+            "session_id": session_id,
+            "message_id": message_id,
+            "user_message_id": ids["message_ids"][user_ref],
+            "response": AGENT_RESPONSE,
+            "nlp": None,
+        }
+        return
+
+    with timer.stage("nlp"):
+        nlp_result, route = await classify_message(session_id, text, config)
+    nlp = {
+        "intent": nlp_result.get("intent"),
+        "confidence": nlp_result.get("confidence"),
+        "route": route,
+    }
+
+    yield "nlp", nlp
+
+    bot_response = build_response({**nlp_result, "route": route})
+
+    yield "response", bot_response
+
+    assigned_agent_id = None
+    if route in ESCALATION_ROUTES:
+        with timer.stage("escalation"):
+            escalation = await plan_escalation(db, session_id)
+        assigned_agent_id = escalation.get("assigned_to")
+        uow.add_escalation(user_ref, **escalation)
+
+        yield "agent", {
+            "status": escalation["status"],
+            "agent_id": assigned_agent_id,
+        }
 
     # ------------------------------------------------------------------
-    # Save USER message
+    # Save USER + BOT messages (+ escalation) in one transaction
     # ------------------------------------------------------------------
-    user_message = Conversation(
-        session_id=session_id,
-        sender="user",
-        message_text=text,
-        created_at=datetime.utcnow(),
-    )
-    db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
-
-    active_escalation = (
-        db.query(Escalation)
-        .filter(Escalation.session_id == session_id, Escalation.status == "ASSIGNED")
-        .first()
+    bot_ref = uow.add_message(
+        **bot_message_values(
+            session_id, bot_response, nlp_result, route, timer.elapsed_ms()
+        )
     )
+    try:
+        with timer.stage("persist"):
+            ids = await uow.commit()
+    except Exception:
+        if assigned_agent_id:
+            await release_agent(assigned_agent_id)
+        raise
+    timer.finish(route)
+    record_intent_usage(nlp)
 
-    if active_escalation:
-        return {
+    log_event(
+        "message_processed",
+        {
             "session_id": session_id,
-            "user_message_id": user_message.id,
-            "response": {
-                "type": "AGENT",
-                "message": "You are now connected to a human agent.",
-            },
-            "nlp": None,
-        }
+            "route": route,
+            "response_time_ms": timer.elapsed_ms(),
+            "stages_ms": timer.stage_ms(),
+        },
+    )
 
     # ------------------------------------------------------------------
-    # NLP SERVICE CALL
+    # Final Response
     # ------------------------------------------------------------------
+    yield "done", {
+        "session_id": session_id,
+        "message_id": message_id,
+        "user_message_id": ids["message_ids"][user_ref],
+        "bot_message_id": ids["message_ids"][bot_ref],
+        "response": bot_response,
+        "nlp": nlp,
+    }
+
+
+# ------------------------------------------------------------------
+# Pipeline Stages
+# ------------------------------------------------------------------
+
+ESCALATION_ROUTES = ("FALLBACK", "ESCALATE")
+
+AGENT_RESPONSE = {
+    "type": "AGENT",
+    "message": "You are now connected to a human agent.",
+}
+
+
+async def load_message_config(user_id) -> tuple:
+    """
+    (ai_settings, escalation_keywords, intent_phrases) for a user, from the
+    cache tiers with admin_service as the source.
+    """
+    cache_key_ai = f"ai_settings:{user_id}"
+    cache_key_keywords = f"escalation_keywords:{user_id}"
+    cache_key_phrases = "intent_phrases"
+
+    config = await get_or_fetch_many(
+        {
+            cache_key_ai: (
+                lambda: fetch_ai_settings(user_id),
+                600,
+                {"confidence_threshold": 60},
+            ),
+            cache_key_keywords: (
+                lambda: fetch_escalation_keywords(user_id),
+                600,
+                [],
+            ),
+            cache_key_phrases: (fetch_intent_phrases, 3600, {}),
+        },
+        timeout=BaseConfig.CONFIG_PREFETCH_TIMEOUT_SECONDS,
+    )
+
+    return config[cache_key_ai], config[cache_key_keywords], config[cache_key_phrases]
+
+
+async def classify_message(session_id: int, text: str, config: tuple) -> tuple:
+    """
+    NLP call behind the circuit breaker, plus the context / analytics
+    updates. Returns (nlp_result, route).
+    """
+    nlp_result = await analyze_message(text, config)
+    route = await apply_classification(session_id, nlp_result)
+    return nlp_result, route
+
+
+async def analyze_message(text: str, config: tuple) -> dict:
+    """
+    NLP call behind the circuit breaker; falls back to an escalating
+    result when the NLP service is down or failing.
+    """
+    ai_settings, escalation_keywords, intent_phrases = config
     service_name = "nlp_service"
 
-    if not allow_request(service_name):
+    if not await allow_request_async(service_name):
         nlp_result = {
             "intent": "system_unavailable",
             "confidence": 0.0,
@@ -175,9 +578,9 @@ async def process_message(db: Session, session_id: str, text: str, platform="web
                 escalation_keywords=escalation_keywords,
                 intent_phrases=intent_phrases,
             )
-            record_success(service_name)
+            await record_success_async(service_name)
         except Exception:
-            record_failure(service_name)
+            await record_failure_async(service_name)
             nlp_result = {
                 "intent": "system_error",
                 "confidence": 0.0,
@@ -185,22 +588,22 @@ async def process_message(db: Session, session_id: str, text: str, platform="web
                 "handoff_detected": True,
             }
 
+    return nlp_result
+
+
+async def apply_classification(session_id: int, nlp_result: dict) -> str:
+    """
+    Context / analytics updates for one NLP result. Returns the route.
+    """
     intent = nlp_result.get("intent")
     confidence = nlp_result.get("confidence")
     route = nlp_result.get("route")
-    entities = json.dumps(nlp_result.get("entities", {}))
-    handoff = nlp_result.get("handoff_detected", False)
 
-    # ------------------------------------------------------------------
-    # OVERRIDE ROUTE ON HANDOFF
-    # ------------------------------------------------------------------
-    if handoff:
+    # Override route on handoff
+    if nlp_result.get("handoff_detected", False):
         route = "ESCALATE"
 
-    # ------------------------------------------------------------------
-    # Context + Analytics
-    # ------------------------------------------------------------------
-    context.update_context(
+    await context.update_context_async(
         session_id, {"last_intent": intent, "confidence": confidence, "route": route}
     )
 
@@ -214,81 +617,337 @@ async def process_message(db: Session, session_id: str, text: str, platform="web
         },
     )
 
-    # ------------------------------------------------------------------
-    # Escalation + Agent Assignment
-    # ------------------------------------------------------------------
-    if route in ["FALLBACK", "ESCALATE"]:
-        escalation = Escalation(
-            session_id=session_id,
-            conversation_id=user_message.id,
-            reason="Low confidence or user requested human",
-            priority="medium",
-            status="PENDING",
-            created_at=datetime.utcnow(),
+    return route
+
+
+def record_intent_usage(nlp: dict):
+    intent_usage.record(
+        nlp["intent"],
+        nlp["confidence"],
+        fallback=nlp["route"] == "FALLBACK",
+        escalated=nlp["route"] in ESCALATION_ROUTES,
+    )
+
+
+async def plan_escalation(db: AsyncSession, session_id: int) -> dict:
+    """
+    Escalation row values, assigned to the least-loaded available agent
+    when there is one (status ASSIGNED, otherwise PENDING).
+    """
+    escalation = {
+        "session_id": session_id,
+        "reason": "Low confidence or user requested human",
+        "priority": "medium",
+        "status": "PENDING",
+        "created_at": datetime.utcnow(),
+    }
+
+    try:
+        agents = await fetch_available_agents()
+    except Exception:
+        agents = []
+
+    if agents:
+        assigned_agent_id = await assign_least_loaded_agent(
+            db, [agent["id"] for agent in agents]
         )
 
-        try:
-            agents = await fetch_available_agents()
-        except Exception:
-            agents = []
-
-        if agents:
-            assigned_agent_id = None
-            min_load = float("inf")
-
-            for agent in agents:
-                load = (
-                    db.query(Escalation)
-                    .filter(
-                        Escalation.assigned_to == agent["id"],
-                        Escalation.status == "ASSIGNED",
-                    )
-                    .count()
-                )
+        if assigned_agent_id:
+            escalation["assigned_to"] = assigned_agent_id
+            escalation["status"] = "ASSIGNED"
+
+    return escalation
+
+
+def user_message_values(session_id: int, text: str) -> dict:
+    return {
+        "session_id": session_id,
+        "sender": "user",
+        "message_text": text,
+        "is_fallback": False,
+        "created_at": datetime.utcnow(),
+    }
+
 
-                if load < min_load:
-                    min_load = load
-                    assigned_agent_id = agent["id"]
+def bot_message_values(
+    session_id: int,
+    bot_response: dict,
+    nlp_result: dict,
+    route: str,
+    response_time_ms: int = None,
+) -> dict:
+    return {
+        "session_id": session_id,
+        "sender": "bot",
+        "message_text": bot_response["message"],
+        "intent_detected": nlp_result.get("intent"),
+        "confidence_score": nlp_result.get("confidence"),
+        "entities": json.dumps(nlp_result.get("entities", {})),
+        "is_fallback": "YES" if route == "FALLBACK" else "NO",
+        "response_time_ms": response_time_ms,
+        "created_at": datetime.utcnow(),
+    }
+
+
+# ------------------------------------------------------------------
+# Bulk Ingestion Helper Functions
+# ------------------------------------------------------------------
+
+
+async def ingest_messages(
+    items: list, concurrency: int = BaseConfig.BULK_INGEST_CONCURRENCY
+) -> list:
+    """
+    Bulk variant of message_pipeline().
+    Up to `concurrency` sessions are processed at once. Within a session
+    the NLP calls run concurrently (BULK_NLP_CONCURRENCY in flight across
+    the batch), while context, escalation and persistence are applied
+    strictly in input order. Rows are written afterwards through
+    MessageUnitOfWork, BULK_INSERT_BATCH_SIZE messages per transaction,
+    instead of one transaction per message.
+    """
+    results = [None] * len(items)
+    by_session = {}
 
-            if assigned_agent_id:
-                escalation.assigned_to = assigned_agent_id
-                escalation.status = "ASSIGNED"
+    for index, item in enumerate(items):
+        error = _bulk_item_error(item)
+        if error:
+            results[index] = _bulk_error(index, error)
+            continue
+        by_session.setdefault(str(item["session_id"]), []).append(index)
 
-        db.add(escalation)
-        db.commit()
+    if not by_session:
+        return results
 
     # ------------------------------------------------------------------
-    # Build Bot Response
+    # Sessions + open escalations, resolved once per batch
     # ------------------------------------------------------------------
-    bot_response = build_response({**nlp_result, "route": route})
+    sessions = {}
+    async with AsyncSessionLocal() as db:
+        for session_key, indexes in list(by_session.items()):
+            platform = items[indexes[0]].get("platform") or "web"
+            try:
+                sessions[session_key] = await get_or_create_session(
+                    db, session_key, platform
+                )
+            except Exception as e:
+                print(e)
+                await db.rollback()
+                del by_session[session_key]
+                for index in indexes:
+                    results[index] = _bulk_error(index, "Could not create session")
+
+        if not sessions:
+            return results
+
+        escalated = set(
+            await db.scalars(
+                select(Escalation.session_id)
+                .where(
+                    Escalation.session_id.in_(
+                        [session["id"] for session in sessions.values()]
+                    ),
+                    Escalation.status == "ASSIGNED",
+                )
+                .distinct()
+            )
+        )
 
     # ------------------------------------------------------------------
-    # Save BOT message
+    # NLP concurrently, escalation planning per session in order
     # ------------------------------------------------------------------
-    bot_message = Conversation(
-        session_id=session_id,
-        sender="bot",
-        message_text=bot_response["message"],
-        intent_detected=intent,
-        confidence_score=confidence,
-        entities=entities,
-        is_fallback="YES" if route == "FALLBACK" else "NO",
-        created_at=datetime.utcnow(),
+    gate = asyncio.Semaphore(concurrency)
+    nlp_gate = asyncio.Semaphore(BaseConfig.BULK_NLP_CONCURRENCY)
+    planned = {}
+
+    async def _analyze(text, config):
+        async with nlp_gate:
+            timer = StageTimer()
+            with timer.stage("nlp"):
+                nlp_result = await analyze_message(text, config)
+            return timer, nlp_result
+
+    async def _run_session(session_key, indexes):
+        session = sessions[session_key]
+        session_id = session["id"]
+
+        async with gate:
+            config = await load_message_config(session["user_id"])
+
+            analyses = {}
+            if session_id not in escalated:
+                analyses = {
+                    index: asyncio.ensure_future(
+                        _analyze(items[index]["text"], config)
+                    )
+                    for index in indexes
+                }
+
+            try:
+                async with AsyncSessionLocal() as db:
+                    for index in indexes:
+                        try:
+                            analysis = None
+                            if session_id not in escalated:
+                                analysis = await analyses[index]
+                            record = await plan_bulk_message(
+                                db,
+                                session_id,
+                                items[index]["text"],
+                                analysis,
+                            )
+                        except Exception as e:
+                            print(e)
+                            results[index] = _bulk_error(index, "Processing failed")
+                            continue
+
+                        escalation = record["escalation"]
+                        if escalation and escalation["status"] == "ASSIGNED":
+                            escalated.add(session_id)
+                        planned[index] = record
+            finally:
+                # Classifications after an assignment are never used
+                for task in analyses.values():
+                    task.cancel()
+
+    await asyncio.gather(
+        *[_run_session(key, indexes) for key, indexes in by_session.items()]
     )
-    db.add(bot_message)
-    db.commit()
-    db.refresh(bot_message)
 
     # ------------------------------------------------------------------
-    # Final Response
+    # Batched writes, in input order so ids follow per-session order
     # ------------------------------------------------------------------
-    return {
+    ordered = sorted(planned)
+    batch_size = BaseConfig.BULK_INSERT_BATCH_SIZE
+
+    for start in range(0, len(ordered), batch_size):
+        batch = {index: planned[index] for index in ordered[start : start + batch_size]}
+        await persist_bulk_batch(batch, results)
+
+    return results
+
+
+async def plan_bulk_message(
+    db: AsyncSession, session_id: int, text: str, analysis: Optional[tuple]
+) -> dict:
+    """
+    message_pipeline() for one message without the writes: returns the rows
+    to insert and the response to report. `analysis` is the (StageTimer,
+    nlp_result) of the message's NLP call, None once a human has the session.
+    """
+    record = {
         "session_id": session_id,
-        "user_message_id": user_message.id,
-        "bot_message_id": bot_message.id,
-        "response": bot_response,
-        "nlp": {"intent": intent, "confidence": confidence, "route": route},
+        "user": user_message_values(session_id, text),
+        "bot": None,
+        "escalation": None,
+        "response": AGENT_RESPONSE,
+        "nlp": None,
+    }
+
+    if analysis is None:
+        return record
+
+    timer, nlp_result = analysis
+    route = await apply_classification(session_id, nlp_result)
+    bot_response = build_response({**nlp_result, "route": route})
+
+    record["response"] = bot_response
+    record["nlp"] = {
+        "intent": nlp_result.get("intent"),
+        "confidence": nlp_result.get("confidence"),
+        "route": route,
     }
+    if route in ESCALATION_ROUTES:
+        with timer.stage("escalation"):
+            record["escalation"] = await plan_escalation(db, session_id)
+            # Release the connection the DB fallback may have checked out
+            await db.rollback()
+
+    record["bot"] = bot_message_values(
+        session_id, bot_response, nlp_result, route, timer.elapsed_ms()
+    )
+    timer.finish(route)
+
+    return record
+
+
+async def persist_bulk_batch(records: dict, results: list):
+    """
+    Writes planned messages (index -> record) in one MessageUnitOfWork and
+    fills in their results. On failure the whole batch is reported failed
+    and its agent assignments are released.
+    """
+    refs = {}
+
+    async with AsyncSessionLocal() as db:
+        uow = MessageUnitOfWork(db)
+
+        for index, record in records.items():
+            user_ref = uow.add_message(**record["user"])
+            bot_ref = uow.add_message(**record["bot"]) if record["bot"] else None
+            if record["escalation"]:
+                uow.add_escalation(user_ref, **record["escalation"])
+            refs[index] = (user_ref, bot_ref)
+
+        try:
+            ids = await uow.commit()
+        except Exception as e:
+            print(e)
+            for index, record in records.items():
+                escalation = record["escalation"] or {}
+                if escalation.get("assigned_to"):
+                    await release_agent(escalation["assigned_to"])
+                results[index] = _bulk_error(index, "Could not save message")
+            return
+
+    message_ids = ids["message_ids"]
+    for index, (user_ref, bot_ref) in refs.items():
+        record = records[index]
+        if record["nlp"]:
+            record_intent_usage(record["nlp"])
+        results[index] = {
+            "index": index,
+            "status": "ok",
+            "session_id": record["session_id"],
+            "user_message_id": message_ids[user_ref],
+            "bot_message_id": message_ids[bot_ref] if bot_ref is not None else None,
+            "response": record["response"],
+            "nlp": record["nlp"],
+        }
+
+
+def _bulk_error(index: int, error: str) -> dict:
+    return {"index": index, "status": "error", "error": error}
+
+
+SESSION_KEY_MAX_LENGTH = Sessions.__table__.c.session_key.type.length
+PLATFORM_MAX_LENGTH = Sessions.__table__.c.platform.type.length
+
+
+def _bulk_item_error(item) -> str:
+    """
+    Why a bulk item cannot be ingested, None when it is valid. Checked up
+    front so one bad item never fails the batch it would be written in.
+    """
+    if not isinstance(item, dict) or not item.get("session_id") or not item.get("text"):
+        return "session_id and text required"
+
+    session_id = item["session_id"]
+    if isinstance(session_id, bool) or not isinstance(session_id, (str, int)):
+        return "session_id must be a string"
+    if len(str(session_id)) > SESSION_KEY_MAX_LENGTH:
+        return f"session_id longer than {SESSION_KEY_MAX_LENGTH} characters"
+
+    if not isinstance(item["text"], str):
+        return "text must be a string"
+
+    platform = item.get("platform") or "web"
+    if not isinstance(platform, str):
+        return "platform must be a string"
+    if len(platform) > PLATFORM_MAX_LENGTH:
+        return f"platform longer than {PLATFORM_MAX_LENGTH} characters"
+
+    return None
 
 
 # ------------------------------------------------------------------
@@ -296,9 +955,6 @@ async def process_message(db: Session, session_id: str, text: str, platform="web
 # ------------------------------------------------------------------
 
 
-active_connections = {}
-
-
 async def chat_ws(websocket: WebSocket, session_key: str):
     """
     User WebSocket:
@@ -306,68 +962,88 @@ async def chat_ws(websocket: WebSocket, session_key: str):
     - Receives user messages
     - Calls process_message()
     - Sends bot responses
-    - Receives agent messages (via active_connections)
+    - Receives agent messages (via connection_bus, from any worker)
+
+    A DB session is opened per message, so idle sockets hold no pooled
+    connection.
     """
 
     await websocket.accept()
 
-    db: Session = SessionLocal()
+    target = None
+    connection = None
+    ip = client_ip(websocket)
 
     try:
         print(websocket, session_key)
-        session = db.query(Sessions).filter(Sessions.session_key == session_key).first()
-
-        if not session:
-            session = Sessions(
-                session_key=session_key,
-                platform="web",
-                started_at=datetime.utcnow(),
-                status="ACTIVE",
-            )
-            db.add(session)
-            db.commit()
-            db.refresh(session)
+        async with AsyncSessionLocal() as db:
+            session = await get_or_create_session(db, session_key, "web")
 
-        session_id = session.id
+        session_id = session["id"]
 
-        active_connections[f"user:{session_id}"] = websocket
+        target = f"user:{session_id}"
+        connection = ManagedConnection(websocket, target)
+        await connection.start()
+        await connection_bus.register(target, connection)
 
         while True:
             data = await websocket.receive_json()
             text = data.get("text")
 
             if not text:
-                await websocket.send_json({"error": "Message text is required"})
+                await connection.send_json({"error": "Message text is required"})
                 continue
 
-            result = await process_message(
-                db=db,
-                session_id=session_key,
-                text=text,
-            )
+            allowed, retry_after = await check_rate_limit(session_key, ip)
+            if not allowed:
+                await connection.send_json(
+                    {
+                        "error": "Too many messages, slow down",
+                        "retry_after": math.ceil(retry_after),
+                    }
+                )
+                continue
 
-            await websocket.send_json(result)
+            client_message_id = data.get("client_message_id")
+            if not valid_client_message_id(client_message_id):
+                await connection.send_json({"error": "Invalid client_message_id"})
+                continue
 
-    except WebSocketDisconnect:
-        active_connections.pop(f"user:{session_id}", None)
+            try:
+                result = await submit_message(
+                    AsyncSessionLocal, session_key, text, client_message_id
+                )
+            except MessageInFlight:
+                result = {
+                    "error": "Message is still being processed",
+                    "client_message_id": client_message_id,
+                }
+
+            await connection.send_json(result)
+
+    except (WebSocketDisconnect, ConnectionClosed):
+        pass
 
     except Exception as e:
         print(e)
-        await websocket.send_json({"error": "Internal WebSocket error"})
-        active_connections.pop(f"user:{session_id}", None)
+        if connection and not connection.closed:
+            await connection.send_json({"error": "Internal WebSocket error"})
 
     finally:
-        db.close()
+        if connection:
+            await connection_bus.unregister(target, connection)
+            await connection.close()
 
 
 @router.websocket("/ws/agent/{agent_id}")
 async def agent_ws(websocket: WebSocket, agent_id: int):
     await websocket.accept()
     await mark_agent_busy(agent_id)
-    active_connections[f"agent:{agent_id}"] = websocket
 
-    db: Session = SessionLocal()
-    active_connections[f"agent:{agent_id}"] = websocket
+    target = f"agent:{agent_id}"
+    connection = ManagedConnection(websocket, target)
+    await connection.start()
+    await connection_bus.register(target, connection)
 
     try:
         while True:
@@ -383,41 +1059,230 @@ async def agent_ws(websocket: WebSocket, agent_id: int):
             if not session_id or not message:
                 continue
 
-            convo = Conversation(
-                session_id=session_id,
-                user_id=agent_id,
-                sender="agent",
-                message_text=message,
-                created_at=datetime.utcnow(),
-            )
-            db.add(convo)
-            db.commit()
-
-            user_ws = active_connections.get(f"user:{session_id}")
-            if user_ws:
-                await user_ws.send_json(
-                    {
-                        "sender": "agent",
-                        "message": message,
-                        "session_id": session_id,
-                    }
+            async with AsyncSessionLocal() as db:
+                db.add(
+                    Conversation(
+                        session_id=session_id,
+                        user_id=agent_id,
+                        sender="agent",
+                        message_text=message,
+                        created_at=datetime.utcnow(),
+                    )
                 )
+                await db.commit()
+
+            await connection_bus.publish(
+                f"user:{session_id}",
+                {
+                    "sender": "agent",
+                    "message": message,
+                    "session_id": session_id,
+                },
+            )
 
     except WebSocketDisconnect:
-        active_connections.pop(f"agent:{agent_id}", None)
+        pass
 
     except Exception as e:
         print(e)
-        active_connections.pop(f"agent:{agent_id}", None)
 
     finally:
-        await mark_agent_available(agent_id)
-        active_connections.pop(f"agent:{agent_id}", None)
-        db.close()
+        await connection_bus.unregister(target, connection)
+        await connection.close()
+        try:
+            await mark_agent_available(agent_id)
+        except Exception as e:
+            print(f"Could not mark agent {agent_id} available: {e}")
+
+
+@router.post("/escalations/{escalation_id}/resolve")
+async def resolve_escalation(
+    escalation_id: int,
+    payload: dict,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Closes an escalation and frees the assigned agent's load slot.
+    Needs the token of the assigned agent or of the session's tenant.
+    """
+    claims = decode_bearer_token(request)
+    escalation = await db.get(Escalation, escalation_id)
+
+    if not escalation:
+        raise HTTPException(404, "Escalation not found")
+
+    user_id = claims.get("user_id")
+    tenant_id = await db.scalar(
+        select(Sessions.user_id).where(Sessions.id == escalation.session_id)
+    )
+    if user_id is None or user_id not in (escalation.assigned_to, tenant_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to resolve this escalation",
+        )
+
+    if escalation.status == "RESOLVED":
+        return {"escalation_id": escalation.id, "status": escalation.status}
+
+    was_assigned = escalation.status == "ASSIGNED"
+
+    escalation.status = "RESOLVED"
+    escalation.resolved_at = datetime.utcnow()
+    escalation.resolution_notes = payload.get("resolution_notes")
+    await db.commit()
+
+    if was_assigned and escalation.assigned_to:
+        await release_agent(escalation.assigned_to)
+
+    return {"escalation_id": escalation.id, "status": escalation.status}
+
+
+def decode_bearer_token(request: Request) -> dict:
+    """
+    Claims of the Authorization: Bearer JWT. Session tokens come from
+    POST /session; admin / agent tokens from admin_service, which signs
+    with the same key.
+    """
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+        )
+
+    try:
+        return jwt.decode(
+            auth_header.split(" ", 1)[1],
+            BaseConfig.SECRET_KEY,
+            algorithms=[BaseConfig.ALGORITHM],
+        )
+    except JWTError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        ) from exc
+
+
+async def authorize_session_access(
+    request: Request, session_id: int, db: AsyncSession
+):
+    """
+    A transcript is readable with the session's own token, by its tenant
+    (the admin user owning the session) or by an agent assigned to one of
+    its escalations. Returns the session's (id, user_id).
+    """
+    payload = decode_bearer_token(request)
+
+    session = (
+        await db.execute(
+            select(Sessions.id, Sessions.user_id).where(Sessions.id == session_id)
+        )
+    ).first()
+    if not session:
+        raise HTTPException(404, "Session not found")
+
+    if payload.get("session_id") == session_id:
+        return session
+
+    user_id = payload.get("user_id")
+    if user_id is not None:
+        if session.user_id is not None and session.user_id == user_id:
+            return session
+
+        assigned = await db.scalar(
+            select(Escalation.id)
+            .where(
+                Escalation.session_id == session_id,
+                Escalation.assigned_to == user_id,
+            )
+            .limit(1)
+        )
+        if assigned:
+            return session
+
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Not allowed to read this session",
+    )
+
+
+@router.get("/sessions/{session_id}/messages")
+async def get_session_messages(
+    session_id: int,
+    request: Request,
+    cursor: int = None,
+    limit: int = BaseConfig.HISTORY_PAGE_SIZE,
+    order: str = "desc",
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Transcript of a session, one page at a time.
+    Keyset pagination on (session_id, id): pass the returned next_cursor to
+    get the following page. order is "desc" (newest first) or "asc".
+    """
+    await authorize_session_access(request, session_id, db)
+
+    if order not in ("asc", "desc"):
+        raise HTTPException(400, "order must be asc or desc")
+    if limit < 1:
+        raise HTTPException(400, "limit must be positive")
+    limit = min(limit, BaseConfig.HISTORY_MAX_PAGE_SIZE)
+
+    query = select(
+        Conversation.id,
+        Conversation.sender,
+        Conversation.message_text,
+        Conversation.message_type,
+        Conversation.intent_detected,
+        Conversation.confidence_score,
+        Conversation.created_at,
+    ).where(Conversation.session_id == session_id)
+
+    if order == "desc":
+        if cursor is not None:
+            query = query.where(Conversation.id < cursor)
+        query = query.order_by(Conversation.id.desc())
+    else:
+        if cursor is not None:
+            query = query.where(Conversation.id > cursor)
+        query = query.order_by(Conversation.id.asc())
+
+    # One extra row tells whether another page exists
+    rows = (await db.execute(query.limit(limit + 1))).mappings().all()
+    has_more = len(rows) > limit
+    messages = [dict(row) for row in rows[:limit]]
+
+    return {
+        "session_id": session_id,
+        "order": order,
+        "messages": messages,
+        "next_cursor": messages[-1]["id"] if has_more else None,
+    }
+
+
+@router.get("/sessions/{session_id}/archive")
+async def get_archived_messages(
+    session_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Streams a session's archived (cold storage) messages as NDJSON,
+    oldest first. Recent messages are served by /sessions/{id}/messages.
+    """
+    session = await authorize_session_access(request, session_id, db)
+    await db.rollback()
+
+    async def _lines():
+        async for row in iter_archived_messages(session.id, session.user_id):
+            yield json.dumps(row) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
 
 
 @router.post("/session")
-def create_chat_session(payload: dict, db: Session = Depends(get_db)):
+async def create_chat_session(
+    payload: dict, db: AsyncSession = Depends(get_async_db)
+):
     """
     Create chat session BEFORE conversation starts
     """
@@ -439,8 +1304,8 @@ def create_chat_session(payload: dict, db: Session = Depends(get_db)):
         session_metadata=json.dumps({"name": name, "email": email}),
     )
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await cache_session(session_key, session)
 
     payload = {"session_key": session.session_key, "session_id": session.id}
     token = create_access_token(payload)
@@ -448,6 +1313,30 @@ def create_chat_session(payload: dict, db: Session = Depends(get_db)):
     return {"session_key": token, "session_id": session.id}
 
 
+@router.post("/session/{session_key}/end")
+async def end_chat_session(
+    session_key: str, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Marks a session as ended and drops it from the session cache
+    """
+    session = await db.scalar(
+        select(Sessions).where(Sessions.session_key == session_key).limit(1)
+    )
+
+    if not session:
+        raise HTTPException(404, "Session not found")
+
+    session.status = "ENDED"
+    session.ended_at = datetime.utcnow()
+    await db.commit()
+
+    await evict_session(session_key)
+    await context.clear_context_async(session.id)
+
+    return {"session_id": session.id, "status": session.status}
+
+
 @router.get("/user_information")
 def get_user_information(request: Request, db: Session = Depends(get_db)):
 
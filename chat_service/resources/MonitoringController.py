@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from resources.cache import cache_stats
+from resources.http_clients import pool_stats
+from resources.ws_connection import connection_stats
+
+router = APIRouter()
+
+
+@router.get("/http-pools")
+def get_http_pool_stats():
+    """
+    Per-upstream connection pool metrics (in-use, idle, wait time).
+    """
+    return pool_stats()
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """
+    Hit / miss / eviction counters for the local and Redis cache tiers.
+    """
+    return cache_stats()
+
+
+@router.get("/websockets")
+def get_websocket_stats():
+    """
+    Per-connection outbound queue depth, drops and send latency.
+    """
+    return connection_stats()
@@ -1,31 +1,34 @@
-import httpx
+from datetime import timedelta
+
 from configs.base_config import ServiceURL
+from resources.http_clients import get_client
+from resources.utils import create_access_token
 
 
 async def fetch_ai_settings(user_id: int) -> dict:
-    async with httpx.AsyncClient(timeout=5) as client:
-        res = await client.get(
-            f"{ServiceURL.ADMIN_BASE_URL}/user/{user_id}/ai-settings"
-        )
-        res.raise_for_status()
-        return res.json()
+    client = get_client("admin")
+    res = await client.get(
+        f"{ServiceURL.ADMIN_BASE_URL}/user/{user_id}/ai-settings", timeout=5
+    )
+    res.raise_for_status()
+    return res.json()
 
 
 async def fetch_escalation_keywords(user_id: int) -> list:
-    async with httpx.AsyncClient(timeout=5) as client:
-        res = await client.get(
-            f"{ServiceURL.ADMIN_BASE_URL}/user/{user_id}/escalation-keywords"
-        )
-        res.raise_for_status()
-        data = res.json()
-        return data.get("keywords", [])
+    client = get_client("admin")
+    res = await client.get(
+        f"{ServiceURL.ADMIN_BASE_URL}/user/{user_id}/escalation-keywords", timeout=5
+    )
+    res.raise_for_status()
+    data = res.json()
+    return data.get("keywords", [])
 
 
 async def fetch_intent_phrases() -> dict:
-    async with httpx.AsyncClient(timeout=10) as client:
-        res = await client.get(f"{ServiceURL.ADMIN_BASE_URL}/nlp/export")
-        res.raise_for_status()
-        data = res.json()
+    client = get_client("admin")
+    res = await client.get(f"{ServiceURL.ADMIN_BASE_URL}/nlp/export", timeout=10)
+    res.raise_for_status()
+    data = res.json()
 
     intent_phrases = {}
 
@@ -36,19 +39,53 @@ async def fetch_intent_phrases() -> dict:
 
 
 async def fetch_available_agents():
-    async with httpx.AsyncClient(timeout=5) as client:
-        res = await client.get(f"{ServiceURL.ADMIN_BASE_URL}/admin/agents/available")
-        res.raise_for_status()
-        return res.json().get("agents", [])
+    client = get_client("admin")
+    res = await client.get(
+        f"{ServiceURL.ADMIN_BASE_URL}/admin/agents/available", timeout=5
+    )
+    res.raise_for_status()
+    return res.json().get("agents", [])
 
 
 async def mark_agent_busy(agent_id: int):
-    async with httpx.AsyncClient(timeout=5) as client:
-        await client.post(f"{ServiceURL.ADMIN_BASE_URL}/admin/agents/{agent_id}/busy")
+    client = get_client("admin")
+    await client.post(
+        f"{ServiceURL.ADMIN_BASE_URL}/admin/agents/{agent_id}/busy", timeout=5
+    )
 
 
 async def mark_agent_available(agent_id: int):
-    async with httpx.AsyncClient(timeout=5) as client:
-        await client.post(
-            f"{ServiceURL.ADMIN_BASE_URL}/admin/agents/{agent_id}/available"
-        )
+    client = get_client("admin")
+    await client.post(
+        f"{ServiceURL.ADMIN_BASE_URL}/admin/agents/{agent_id}/available", timeout=5
+    )
+
+
+async def fetch_retention_policies() -> dict:
+    """
+    user_id -> data_retention_days
+    """
+    client = get_client("admin")
+    res = await client.get(
+        f"{ServiceURL.ADMIN_BASE_URL}/nlp/retention-policies", timeout=10
+    )
+    res.raise_for_status()
+    return {
+        policy["user_id"]: policy["data_retention_days"]
+        for policy in res.json().get("policies", [])
+    }
+
+
+async def push_intent_usage(rows: list):
+    """
+    Hourly intent usage deltas, upserted by admin into intent_usage_hourly
+    """
+    client = get_client("admin")
+    token = create_access_token({"service": "chat_service"}, timedelta(minutes=5))
+    res = await client.post(
+        f"{ServiceURL.ADMIN_BASE_URL}/nlp/intent-usage",
+        json={"rows": rows},
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=10,
+    )
+    res.raise_for_status()
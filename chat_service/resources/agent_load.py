@@ -0,0 +1,192 @@
+import asyncio
+import logging
+
+from configs.redis import async_redis_client
+from models.models import Escalation
+from resources.singleflight import RedisLock
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("chat_agent_load")
+
+# Sorted set: agent_id -> open (ASSIGNED) escalations
+AGENT_LOAD_KEY = "agents:load"
+
+# Rebuild generation and the per-agent picks/releases made since it started
+AGENT_LOAD_GENERATION_KEY = f"{AGENT_LOAD_KEY}:generation"
+AGENT_LOAD_DELTA_KEY = f"{AGENT_LOAD_KEY}:delta"
+
+RECONCILE_INTERVAL_SECONDS = 300
+RECONCILE_LOCK_TTL_MS = 60000
+
+# Picks the least-loaded agent among ARGV and counts the new assignment in
+# the same atomic step, so concurrent escalations never pick on stale loads
+PICK_AGENT_SCRIPT = """
+local best_id, best_load = nil, nil
+for _, agent_id in ipairs(ARGV) do
+    local load = tonumber(redis.call("ZSCORE", KEYS[1], agent_id) or "0")
+    if best_load == nil or load < best_load then
+        best_id, best_load = agent_id, load
+    end
+end
+if best_id then
+    redis.call("ZINCRBY", KEYS[1], 1, best_id)
+    redis.call("HINCRBY", KEYS[2], best_id, 1)
+end
+return best_id
+"""
+
+RELEASE_AGENT_SCRIPT = """
+local load = tonumber(redis.call("ZINCRBY", KEYS[1], -1, ARGV[1]))
+redis.call("HINCRBY", KEYS[2], ARGV[1], -1)
+if load < 0 then
+    redis.call("ZADD", KEYS[1], 0, ARGV[1])
+end
+return load
+"""
+
+# Sets each agent to its DB count plus the picks/releases recorded since the
+# rebuild's generation started. Does nothing if a newer rebuild has begun.
+# ARGV: generation, then agent_id/count pairs
+APPLY_LOADS_SCRIPT = """
+if redis.call("GET", KEYS[3]) ~= ARGV[1] then
+    return -1
+end
+local counts = {}
+for _, agent_id in ipairs(redis.call("ZRANGE", KEYS[1], 0, -1)) do
+    counts[agent_id] = 0
+end
+for i = 2, #ARGV, 2 do
+    counts[ARGV[i]] = tonumber(ARGV[i + 1])
+end
+local applied = 0
+for agent_id, count in pairs(counts) do
+    local load = count + tonumber(redis.call("HGET", KEYS[2], agent_id) or "0")
+    if load < 0 then
+        load = 0
+    end
+    redis.call("ZADD", KEYS[1], load, agent_id)
+    applied = applied + 1
+end
+return applied
+"""
+
+_pick_agent = async_redis_client.register_script(PICK_AGENT_SCRIPT)
+_release_agent = async_redis_client.register_script(RELEASE_AGENT_SCRIPT)
+_apply_loads = async_redis_client.register_script(APPLY_LOADS_SCRIPT)
+
+
+async def assign_least_loaded_agent(db: AsyncSession, agent_ids: list):
+    """
+    Returns the available agent with the fewest open escalations and counts
+    the assignment against them. Falls back to one GROUP BY query on
+    escalations when Redis is unavailable.
+    """
+    if not agent_ids:
+        return None
+
+    try:
+        agent_id = await _pick_agent(
+            keys=[AGENT_LOAD_KEY, AGENT_LOAD_DELTA_KEY], args=agent_ids
+        )
+        return int(agent_id) if agent_id is not None else None
+    except Exception as e:
+        logger.warning(f"Agent load index unavailable, using DB counts: {e}")
+
+    rows = await db.execute(
+        select(Escalation.assigned_to, func.count())
+        .where(
+            Escalation.assigned_to.in_(agent_ids),
+            Escalation.status == "ASSIGNED",
+        )
+        .group_by(Escalation.assigned_to)
+    )
+    loads = dict(rows.all())
+    return min(agent_ids, key=lambda agent_id: loads.get(agent_id, 0))
+
+
+async def release_agent(agent_id: int):
+    """
+    Decrements an agent's open assignment count (escalation resolved or
+    the assignment was never persisted).
+    """
+    try:
+        await _release_agent(
+            keys=[AGENT_LOAD_KEY, AGENT_LOAD_DELTA_KEY], args=[agent_id]
+        )
+    except Exception as e:
+        logger.warning(f"Could not release agent {agent_id}: {e}")
+
+
+# ------------------------------------------------------------------
+# Reconciliation
+# ------------------------------------------------------------------
+
+
+async def start_generation() -> str:
+    """
+    Starts a rebuild generation: later picks and releases are recorded
+    as deltas on top of the snapshot the caller is about to read.
+    """
+    pipe = async_redis_client.pipeline(transaction=True)
+    pipe.incr(AGENT_LOAD_GENERATION_KEY)
+    pipe.delete(AGENT_LOAD_DELTA_KEY)
+    generation, _ = await pipe.execute()
+    return str(generation)
+
+
+async def rebuild_agent_load(db: AsyncSession) -> dict:
+    """
+    Rebuilds the index from the escalations table. Each agent is set to
+    its DB count plus the picks/releases made since the snapshot, so
+    assignments racing the query are not lost.
+    """
+    generation = await start_generation()
+    rows = await db.execute(
+        select(Escalation.assigned_to, func.count())
+        .where(
+            Escalation.assigned_to.isnot(None),
+            Escalation.status == "ASSIGNED",
+        )
+        .group_by(Escalation.assigned_to)
+    )
+    loads = {str(agent_id): count for agent_id, count in rows.all()}
+
+    args = [generation]
+    for agent_id, count in loads.items():
+        args.extend([agent_id, count])
+    applied = await _apply_loads(
+        keys=[AGENT_LOAD_KEY, AGENT_LOAD_DELTA_KEY, AGENT_LOAD_GENERATION_KEY],
+        args=args,
+    )
+    if applied < 0:
+        logger.info("Agent load rebuild superseded by a newer generation")
+
+    return loads
+
+
+async def reconcile_forever(session_factory, interval=RECONCILE_INTERVAL_SECONDS):
+    while True:
+        lock = RedisLock("agent_load:reconcile", ttl_ms=RECONCILE_LOCK_TTL_MS)
+        try:
+            if await lock.acquire():
+                try:
+                    async with session_factory() as db:
+                        loads = await rebuild_agent_load(db)
+                    logger.info(f"Agent load index rebuilt for {len(loads)} agents")
+                finally:
+                    await lock.release()
+        except Exception as e:
+            logger.warning(f"Agent load reconciliation failed: {e}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    from models import AsyncSessionLocal, async_engine
+
+    async def _main():
+        async with AsyncSessionLocal() as db:
+            print(await rebuild_agent_load(db))
+        await async_engine.dispose()
+
+    asyncio.run(_main())
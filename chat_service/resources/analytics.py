@@ -0,0 +1,401 @@
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+
+from configs.base_config import BaseConfig
+from configs.redis import async_redis_client
+from models.models import AnalyticsEvent
+from resources.metrics import (
+    ANALYTICS_DROPPED,
+    ANALYTICS_FLUSHED,
+    ANALYTICS_LOADED,
+    ANALYTICS_QUEUE_DEPTH,
+)
+from sqlalchemy import insert
+
+logger = logging.getLogger("chat_analytics")
+
+CONSUMER_GROUP = "analytics-loader"
+
+
+# ------------------------------------------------------------------
+# Sinks
+# ------------------------------------------------------------------
+
+
+class RedisStreamSink:
+    """
+    Appends a batch to a capped Redis Stream in one pipelined round trip.
+    """
+
+    def __init__(
+        self,
+        client,
+        stream: str = BaseConfig.ANALYTICS_STREAM,
+        maxlen: int = BaseConfig.ANALYTICS_STREAM_MAXLEN,
+    ):
+        self.client = client
+        self.stream = stream
+        self.maxlen = maxlen
+
+    async def write(self, events: list):
+        pipe = self.client.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(
+                self.stream,
+                {"data": json.dumps(event, default=str)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        await pipe.execute()
+
+    async def idle(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class NDJSONSink:
+    """
+    Appends batches to events-<timestamp>-<host>-<pid>.ndjson.open in
+    `directory` and rotates (renames to .ndjson) once a file reaches
+    max_bytes or is max_age seconds old, so loaders only ever pick up
+    complete files. Files a crashed process left open are claimed by
+    load_ndjson_files().
+    """
+
+    def __init__(
+        self,
+        directory: str = BaseConfig.ANALYTICS_NDJSON_DIR,
+        max_bytes: int = BaseConfig.ANALYTICS_NDJSON_MAX_BYTES,
+        max_age: float = BaseConfig.ANALYTICS_NDJSON_MAX_AGE_SECONDS,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._path = None
+        self._opened_at = None
+
+    async def write(self, events: list):
+        lines = "".join(json.dumps(event, default=str) + "\n" for event in events)
+        await asyncio.to_thread(self._append, lines)
+
+    async def idle(self):
+        await asyncio.to_thread(self._rotate_if_old)
+
+    def _append(self, lines: str):
+        if self._path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            name = (
+                f"events-{datetime.utcnow():%Y%m%dT%H%M%S%f}"
+                f"-{socket.gethostname()}-{os.getpid()}"
+            )
+            self._path = os.path.join(self.directory, f"{name}.ndjson.open")
+            self._opened_at = time.monotonic()
+
+        with open(self._path, "a") as f:
+            f.write(lines)
+            size = f.tell()
+
+        if size >= self.max_bytes:
+            self._rotate()
+        else:
+            self._rotate_if_old()
+
+    def _rotate_if_old(self):
+        if self._path and time.monotonic() - self._opened_at >= self.max_age:
+            self._rotate()
+
+    def _rotate(self):
+        if self._path and os.path.exists(self._path):
+            os.replace(self._path, self._path[: -len(".open")])
+        self._path = None
+
+    async def close(self):
+        await asyncio.to_thread(self._rotate)
+
+
+def create_sink(backend: str):
+    if backend == "redis":
+        return RedisStreamSink(async_redis_client)
+    if backend == "ndjson":
+        return NDJSONSink()
+    if backend == "off":
+        return None
+    raise ValueError(f"Unknown analytics sink: {backend}")
+
+
+# ------------------------------------------------------------------
+# In-process buffer
+# ------------------------------------------------------------------
+
+
+class EventBuffer:
+    """
+    Bounded queue between the request path and the sink.
+    emit() never blocks or awaits: when the queue is full (or the flusher
+    is not running) the event is dropped and counted. A background task
+    drains the queue in batches of flush_size, or whatever has arrived
+    after flush_interval seconds.
+    """
+
+    def __init__(
+        self,
+        sink,
+        max_size: int = BaseConfig.ANALYTICS_QUEUE_SIZE,
+        flush_size: int = BaseConfig.ANALYTICS_FLUSH_SIZE,
+        flush_interval: float = BaseConfig.ANALYTICS_FLUSH_INTERVAL_SECONDS,
+    ):
+        self.sink = sink
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue = None
+        self._flusher = None
+        # Events taken off the queue but not yet written, kept here so
+        # stop() can flush them when it cancels the flusher mid-batch
+        self._batch = []
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    def emit(self, event: dict):
+        if self.sink is None:
+            return
+        if not self.running:
+            ANALYTICS_DROPPED.labels("not_running").inc()
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            ANALYTICS_DROPPED.labels("queue_full").inc()
+
+    async def start(self):
+        if self.sink is None or self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_size)
+        self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def stop(self):
+        """
+        Stops the flusher and writes out what is still queued.
+        """
+        if self._flusher is None:
+            return
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self._flusher = None
+
+        await self._write(self._batch)
+        self._batch = []
+        while not self.queue.empty():
+            await self._write(self._take(self.flush_size))
+        await self.sink.close()
+
+    async def _flush_forever(self):
+        while True:
+            try:
+                event = await asyncio.wait_for(self.queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                # Nothing arrived this interval; lets the sink rotate files
+                await self.sink.idle()
+                continue
+            self._batch = [event]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(self._batch) < self.flush_size:
+                self._batch.extend(self._take(self.flush_size - len(self._batch)))
+                remaining = deadline - time.monotonic()
+                if len(self._batch) >= self.flush_size or remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._batch.append(event)
+
+            await self._write(self._batch)
+            self._batch = []
+
+    def _take(self, limit: int) -> list:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: list):
+        ANALYTICS_QUEUE_DEPTH.set(self.queue.qsize())
+        if not batch:
+            return
+        try:
+            await self.sink.write(batch)
+            ANALYTICS_FLUSHED.inc(len(batch))
+        except Exception as e:
+            logger.warning(f"Dropping {len(batch)} analytics events: {e}")
+            ANALYTICS_DROPPED.labels("sink_error").inc(len(batch))
+
+
+event_buffer = EventBuffer(create_sink(BaseConfig.ANALYTICS_SINK))
+
+
+# ------------------------------------------------------------------
+# Consumer: sink -> analytics_events table
+# ------------------------------------------------------------------
+
+
+def _event_row(event: dict) -> dict:
+    timestamp = event.get("timestamp")
+    return {
+        "event_type": event.get("event", "unknown"),
+        "session_id": event.get("session_id"),
+        "payload": event,
+        "created_at": (
+            datetime.fromisoformat(timestamp) if timestamp else datetime.utcnow()
+        ),
+    }
+
+
+async def load_events(db, events: list) -> int:
+    """
+    One multi-row INSERT for a batch of events.
+    """
+    if not events:
+        return 0
+    await db.execute(insert(AnalyticsEvent), [_event_row(e) for e in events])
+    await db.commit()
+    ANALYTICS_LOADED.inc(len(events))
+    return len(events)
+
+
+async def consume_stream(
+    session_factory,
+    consumer: str,
+    batch_size: int = BaseConfig.ANALYTICS_FLUSH_SIZE,
+    block_ms: int = 5000,
+    stream: str = BaseConfig.ANALYTICS_STREAM,
+    once: bool = False,
+):
+    """
+    Loads the Redis Stream into analytics_events through a consumer group.
+    Entries are acknowledged only after their batch is committed
+    (at-least-once); entries left pending by a crashed consumer are
+    re-read first.
+    """
+    try:
+        await async_redis_client.xgroup_create(
+            stream, CONSUMER_GROUP, id="0", mkstream=True
+        )
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+    # "0" replays this consumer's pending entries, ">" reads new ones
+    next_id = "0"
+    while True:
+        response = await async_redis_client.xreadgroup(
+            CONSUMER_GROUP,
+            consumer,
+            {stream: next_id},
+            count=batch_size,
+            block=None if next_id == "0" else block_ms,
+        )
+        entries = response[0][1] if response else []
+
+        if entries:
+            events = [json.loads(fields["data"]) for _, fields in entries]
+            async with session_factory() as db:
+                await load_events(db, events)
+            await async_redis_client.xack(
+                stream, CONSUMER_GROUP, *[entry_id for entry_id, _ in entries]
+            )
+        elif next_id == "0":
+            next_id = ">"
+        elif once:
+            return
+
+
+def _writer_is_dead(path: str) -> bool:
+    """
+    True when the file was opened by a process of this host that no longer
+    runs; files from other hosts are left to their own loader.
+    """
+    stem = os.path.basename(path)[: -len(".ndjson.open")]
+    _, _, host_pid = stem.partition("-")[2].partition("-")
+    host, _, pid = host_pid.rpartition("-")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+async def load_ndjson_files(
+    session_factory,
+    directory: str = BaseConfig.ANALYTICS_NDJSON_DIR,
+    batch_size: int = BaseConfig.ANALYTICS_FLUSH_SIZE,
+) -> int:
+    """
+    Loads rotated NDJSON files and moves each into loaded/ once committed.
+    Open files whose writer process on this host is gone are rotated first.
+    """
+    loaded = 0
+    done_dir = os.path.join(directory, "loaded")
+    os.makedirs(done_dir, exist_ok=True)
+
+    for path in glob.glob(os.path.join(directory, "events-*.ndjson.open")):
+        if _writer_is_dead(path):
+            os.replace(path, path[: -len(".open")])
+
+    for path in sorted(glob.glob(os.path.join(directory, "events-*.ndjson"))):
+        with open(path) as f:
+            events = [json.loads(line) for line in f if line.strip()]
+
+        async with session_factory() as db:
+            for start in range(0, len(events), batch_size):
+                await db.execute(
+                    insert(AnalyticsEvent),
+                    [_event_row(e) for e in events[start : start + batch_size]],
+                )
+            await db.commit()
+
+        ANALYTICS_LOADED.inc(len(events))
+        os.replace(path, os.path.join(done_dir, os.path.basename(path)))
+        loaded += len(events)
+
+    return loaded
+
+
+if __name__ == "__main__":
+    from models import AsyncSessionLocal, async_engine
+
+    parser = argparse.ArgumentParser(description="Load analytics events")
+    parser.add_argument("--source", choices=["redis", "ndjson"], default="redis")
+    parser.add_argument("--consumer", default=f"loader-{os.getpid()}")
+    parser.add_argument(
+        "--once", action="store_true", help="stop when the stream is drained"
+    )
+    args = parser.parse_args()
+
+    async def _main():
+        if args.source == "redis":
+            await consume_stream(AsyncSessionLocal, args.consumer, once=args.once)
+        else:
+            print(f"loaded {await load_ndjson_files(AsyncSessionLocal)} events")
+        await async_engine.dispose()
+
+    asyncio.run(_main())
@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from configs.base_config import BaseConfig
+from models.models import Conversation
+from resources.metrics import ARCHIVED_ROWS, RETENTION_DELETED
+from resources.session_cache import resolve_tenants
+from sqlalchemy import delete, select
+
+logger = logging.getLogger("chat_archive")
+
+MANIFEST_NAME = "manifest.jsonl"
+MANIFEST_LOCK_NAME = "manifest.lock"
+
+# Layout under ARCHIVE_DIR:
+#   tenant=<user_id|anonymous>/manifest.jsonl
+#   tenant=<user_id|anonymous>/day=<YYYY-MM-DD>/part-<uuid>.jsonl.gz
+# Each manifest line describes one part file: path, day, rows, id range,
+# the sessions it holds and its sha256. Writers hold manifest.lock while
+# appending to or rewriting the manifest.
+
+
+def tenant_dir(root: str, user_id) -> str:
+    tenant = "anonymous" if user_id is None else str(user_id)
+    return os.path.join(root, f"tenant={tenant}")
+
+
+@contextmanager
+def _manifest_lock(base: str):
+    with open(os.path.join(base, MANIFEST_LOCK_NAME), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _row_to_json(row) -> dict:
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row.items()
+    }
+
+
+def write_part(root: str, user_id, day: str, rows: list) -> dict:
+    """
+    Writes rows (dicts, sorted by id) to a new gzip JSONL part and appends
+    it to the tenant's manifest. Both are fsynced before returning, so the
+    rows can be deleted from the database afterwards.
+    """
+    base = tenant_dir(root, user_id)
+    relative = os.path.join(f"day={day}", f"part-{uuid.uuid4().hex}.jsonl.gz")
+    path = os.path.join(base, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    digest = hashlib.sha256()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for row in rows:
+                line = (json.dumps(row, default=str) + "\n").encode()
+                digest.update(line)
+                gz.write(line)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+    entry = {
+        "file": relative,
+        "day": day,
+        "rows": len(rows),
+        "min_id": rows[0]["id"],
+        "max_id": rows[-1]["id"],
+        "sessions": sorted({row["session_id"] for row in rows}),
+        "sha256": digest.hexdigest(),
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+    with _manifest_lock(base):
+        with open(os.path.join(base, MANIFEST_NAME), "a") as manifest:
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
+
+    return entry
+
+
+def _rewrite_manifest(base: str, entries: list):
+    path = os.path.join(base, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as manifest:
+        for entry in entries:
+            manifest.write(json.dumps(entry) + "\n")
+        manifest.flush()
+        os.fsync(manifest.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_manifest(root: str, user_id) -> list:
+    path = os.path.join(tenant_dir(root, user_id), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return []
+    with open(path) as manifest:
+        return [json.loads(line) for line in manifest if line.strip()]
+
+
+def read_part(root: str, user_id, entry: dict, session_id: int) -> list:
+    path = os.path.join(tenant_dir(root, user_id), entry["file"])
+    with gzip.open(path, "rt") as part:
+        rows = (json.loads(line) for line in part)
+        return [row for row in rows if row["session_id"] == session_id]
+
+
+def purge_expired_parts(root: str, cutoff, dry_run: bool = False) -> dict:
+    """
+    Deletes the day=* partitions of every tenant whose whole day lies
+    before that tenant's retention cutoff (cutoff(user_id) -> datetime, or
+    None to keep forever). Manifest entries are dropped before the files,
+    so the read path never lists a part that is gone; files left behind by
+    an interrupted run are removed on the next one.
+    """
+    report = {"days": 0, "parts": 0, "rows": 0, "by_tenant": {}}
+    if not os.path.isdir(root):
+        return report
+
+    for name in sorted(os.listdir(root)):
+        if not name.startswith("tenant="):
+            continue
+        tenant = name[len("tenant=") :]
+        user_id = None if tenant == "anonymous" else int(tenant)
+        limit = cutoff(user_id)
+        if limit is None:
+            continue
+
+        base = os.path.join(root, name)
+        expired_days = {
+            entry[len("day=") :]
+            for entry in os.listdir(base)
+            if entry.startswith("day=")
+            and entry[len("day=") :] < limit.date().isoformat()
+        }
+        if not expired_days:
+            continue
+
+        with _manifest_lock(base):
+            entries = read_manifest(root, user_id)
+            kept = [entry for entry in entries if entry["day"] not in expired_days]
+            rows = sum(entry["rows"] for entry in entries if entry not in kept)
+            parts = sum(
+                1
+                for day in expired_days
+                for part in os.listdir(os.path.join(base, f"day={day}"))
+                if part.endswith(".jsonl.gz")
+            )
+
+            if not dry_run:
+                _rewrite_manifest(base, kept)
+                for day in expired_days:
+                    shutil.rmtree(os.path.join(base, f"day={day}"))
+                RETENTION_DELETED.labels("archive").inc(rows)
+
+        report["days"] += len(expired_days)
+        report["parts"] += parts
+        report["rows"] += rows
+        report["by_tenant"][str(user_id)] = rows
+
+    return report
+
+
+class ConversationArchiver:
+    """
+    Moves conversations older than ARCHIVE_AFTER_DAYS from the hot table
+    into gzip JSONL parts partitioned by tenant and day.
+
+    Rows are taken in id order, ARCHIVE_CHUNK_SIZE at a time; each chunk's
+    parts are written and fsynced before its rows are deleted, so a crash
+    can at worst archive a chunk twice (the read path drops duplicate ids).
+    A run ends at the first row younger than the cutoff, since ids grow
+    with created_at. Rows without a created_at are left in place, logged
+    and counted as skipped.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        root: str = BaseConfig.ARCHIVE_DIR,
+        older_than_days: int = BaseConfig.ARCHIVE_AFTER_DAYS,
+        chunk_size: int = BaseConfig.ARCHIVE_CHUNK_SIZE,
+        pause: float = BaseConfig.ARCHIVE_CHUNK_PAUSE_SECONDS,
+        dry_run: bool = False,
+    ):
+        self.session_factory = session_factory
+        self.root = root
+        self.cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.dry_run = dry_run
+        self._tenants = {}
+
+    async def run(self, max_chunks: int = None) -> dict:
+        report = {
+            "dry_run": self.dry_run,
+            "cutoff": self.cutoff.isoformat(),
+            "archived": 0,
+            "chunks": 0,
+            "parts": 0,
+            "skipped": 0,
+            "by_tenant": {},
+            "complete": False,
+        }
+        watermark = 0
+
+        while max_chunks is None or report["chunks"] < max_chunks:
+            async with self.session_factory() as db:
+                rows = (
+                    (
+                        await db.execute(
+                            select(*Conversation.__table__.columns)
+                            .where(Conversation.id > watermark)
+                            .order_by(Conversation.id)
+                            .limit(self.chunk_size)
+                        )
+                    )
+                    .mappings()
+                    .all()
+                )
+
+                if not rows:
+                    report["complete"] = True
+                    break
+
+                undated = [row["id"] for row in rows if row["created_at"] is None]
+                if undated:
+                    logger.warning(
+                        f"Skipping {len(undated)} conversations without "
+                        f"created_at (ids {undated[0]}..{undated[-1]})"
+                    )
+                expired = [
+                    row
+                    for row in rows
+                    if row["created_at"] is not None and row["created_at"] < self.cutoff
+                ]
+
+                tenants = await resolve_tenants(
+                    db, {row["session_id"] for row in expired}, self._tenants
+                )
+                await db.rollback()
+
+                partitions = {}
+                for row in expired:
+                    key = (tenants[row["session_id"]], row["created_at"].date())
+                    partitions.setdefault(key, []).append(_row_to_json(row))
+
+                if expired and not self.dry_run:
+                    for (user_id, day), part_rows in partitions.items():
+                        await asyncio.to_thread(
+                            write_part, self.root, user_id, day.isoformat(), part_rows
+                        )
+
+                    await db.execute(
+                        delete(Conversation)
+                        .where(Conversation.id.in_([row["id"] for row in expired]))
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+                    ARCHIVED_ROWS.inc(len(expired))
+
+            for (user_id, _), part_rows in partitions.items():
+                tenant = str(user_id)
+                report["by_tenant"][tenant] = (
+                    report["by_tenant"].get(tenant, 0) + len(part_rows)
+                )
+            report["archived"] += len(expired)
+            report["parts"] += len(partitions)
+            report["skipped"] += len(undated)
+            report["chunks"] += 1
+            watermark = rows[-1]["id"]
+
+            if len(expired) + len(undated) < len(rows):
+                report["complete"] = True
+                break
+            await asyncio.sleep(self.pause)
+
+        return report
+
+
+async def iter_archived_messages(
+    session_id: int, user_id, root: str = BaseConfig.ARCHIVE_DIR
+):
+    """
+    Yields an archived session's messages oldest first, one part file at a
+    time (file reads run in a worker thread).
+    """
+    entries = await asyncio.to_thread(read_manifest, root, user_id)
+    entries = sorted(
+        (entry for entry in entries if session_id in entry["sessions"]),
+        key=lambda entry: entry["min_id"],
+    )
+
+    seen = set()
+    for entry in entries:
+        rows = await asyncio.to_thread(read_part, root, user_id, entry, session_id)
+        for row in rows:
+            if row["id"] not in seen:
+                seen.add(row["id"])
+                yield row
+
+
+if __name__ == "__main__":
+    from models import AsyncSessionLocal, async_engine
+
+    parser = argparse.ArgumentParser(description="Archive old conversations")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--root", default=BaseConfig.ARCHIVE_DIR)
+    parser.add_argument(
+        "--older-than-days", type=int, default=BaseConfig.ARCHIVE_AFTER_DAYS
+    )
+    parser.add_argument("--max-chunks", type=int)
+    args = parser.parse_args()
+
+    async def _main():
+        started = time.perf_counter()
+        archiver = ConversationArchiver(
+            AsyncSessionLocal,
+            root=args.root,
+            older_than_days=args.older_than_days,
+            dry_run=args.dry_run,
+        )
+        report = await archiver.run(args.max_chunks)
+        report["duration_s"] = round(time.perf_counter() - started, 3)
+        print(json.dumps(report, indent=2))
+        await async_engine.dispose()
+
+    asyncio.run(_main())
@@ -1,12 +1,496 @@
+import asyncio
 import json
+import logging
+import threading
+import time
+from collections import OrderedDict
 
-from configs.redis import redis_client
+from configs.redis import async_redis_client, redis_client
+from resources.singleflight import RedisLock, SingleFlight
+
+logger = logging.getLogger("chat_cache")
+
+# Admin service publishes changed keys here ("*" clears everything)
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+LOCAL_CACHE_MAX_ENTRIES = 1024
+LOCAL_CACHE_TTL_SECONDS = 60
+
+# get_or_fetch keeps values this long past their TTL and serves them while
+# one worker refreshes in the background
+STALE_TTL_SECONDS = 300
+FETCH_LOCK_TTL_MS = 10000
+FETCH_LOCK_POLL_SECONDS = 0.05
+
+# Backoff between reconnects of the invalidation listener
+LISTENER_RETRY_MIN_SECONDS = 0.5
+LISTENER_RETRY_MAX_SECONDS = 30
+
+
+# ------------------------------------------------------------------
+# In-process LRU tier
+# ------------------------------------------------------------------
+
+
+class LocalCache:
+    """
+    Bounded LRU of decoded values with a per-entry TTL.
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key):
+        """
+        Returns (found, value).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return True, value
+
+    def set(self, key, value, ttl: int = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalCache(LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_TTL_SECONDS)
+
+# Every in-process tier that must honour invalidations, by name
+local_tiers = {"local": local_cache}
+
+
+def register_local_tier(name: str, tier: LocalCache):
+    local_tiers[name] = tier
+
+
+redis_stats = {"hits": 0, "misses": 0, "errors": 0}
+
+fetch_stats = {
+    "lock_waits": 0,
+    "stale_served": 0,
+    "revalidations": 0,
+    "prefetch_timeouts": 0,
+    "prefetch_errors": 0,
+}
+
+single_flight = SingleFlight()
+
+_background_tasks = set()
+
+
+def _fresh_key(key) -> str:
+    return f"fresh:{key}"
+
+
+# ------------------------------------------------------------------
+# Two-tier get / set
+# ------------------------------------------------------------------
+
+
+def _remember(key, raw):
+    if raw is None:
+        redis_stats["misses"] += 1
+        return None
+
+    redis_stats["hits"] += 1
+    value = json.loads(raw)
+    local_cache.set(key, value)
+    return value
+
+
+def _queue_set(pipe, key, value, ttl, stale_ttl):
+    pipe.setex(key, ttl + stale_ttl, json.dumps(value))
+    pipe.setex(_fresh_key(key), ttl, 1)
 
 
 def get_cache(key):
-    value = redis_client.get(key)
-    return json.loads(value) if value else None
+    found, value = local_cache.get(key)
+    if found:
+        return value
+
+    try:
+        raw = redis_client.get(key)
+    except Exception as e:
+        redis_stats["errors"] += 1
+        logger.warning(f"Redis unavailable, cache miss for {key}: {e}")
+        return None
+
+    return _remember(key, raw)
+
+
+async def get_cache_async(key):
+    found, value = local_cache.get(key)
+    if found:
+        return value
+
+    try:
+        raw = await async_redis_client.get(key)
+    except Exception as e:
+        redis_stats["errors"] += 1
+        logger.warning(f"Redis unavailable, cache miss for {key}: {e}")
+        return None
+
+    return _remember(key, raw)
+
+
+def set_cache(key, value, ttl=300, stale_ttl=0):
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_set(pipe, key, value, ttl, stale_ttl)
+    pipe.execute()
+    local_cache.set(key, value, ttl)
+
+
+async def set_cache_async(key, value, ttl=300, stale_ttl=0):
+    pipe = async_redis_client.pipeline(transaction=False)
+    _queue_set(pipe, key, value, ttl, stale_ttl)
+    await pipe.execute()
+    local_cache.set(key, value, ttl)
+
+
+def invalidate_cache(*keys):
+    """
+    Drops keys from Redis and tells every worker to drop its local copy.
+    """
+    if not keys:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    _queue_invalidation(pipe, keys)
+    pipe.execute()
+
+
+async def invalidate_cache_async(*keys):
+    if not keys:
+        return
+    pipe = async_redis_client.pipeline(transaction=False)
+    _queue_invalidation(pipe, keys)
+    await pipe.execute()
+
+
+def _queue_invalidation(pipe, keys):
+    pipe.delete(*keys, *[_fresh_key(key) for key in keys])
+    for key in keys:
+        _drop_local(key)
+        pipe.publish(INVALIDATION_CHANNEL, key)
+
+
+def _drop_local(key):
+    for tier in local_tiers.values():
+        if key == "*":
+            tier.clear()
+        else:
+            tier.delete(key)
+
+
+def cache_stats() -> dict:
+    return {
+        **{
+            name: {**tier.stats, "size": len(tier)}
+            for name, tier in local_tiers.items()
+        },
+        "redis": dict(redis_stats),
+        "fetch": {
+            **fetch_stats,
+            **single_flight.stats,
+            "in_flight": single_flight.in_flight(),
+        },
+    }
+
+
+# ------------------------------------------------------------------
+# Read-through with request coalescing
+# ------------------------------------------------------------------
+
+
+async def get_or_fetch(key, fetch, ttl=300, stale_ttl=STALE_TTL_SECONDS):
+    """
+    Returns the cached value for key, calling `await fetch()` on a miss.
+
+    - concurrent misses in this process share one fetch (SingleFlight)
+    - across processes a Redis lock lets one worker fetch, the others wait
+      for its result
+    - values past their TTL but within stale_ttl are served as-is while a
+      single background refresh runs
+    """
+    found, value = local_cache.get(key)
+    if found:
+        return value
+
+    try:
+        raw, fresh = await async_redis_client.mget(key, _fresh_key(key))
+    except Exception as e:
+        redis_stats["errors"] += 1
+        logger.warning(f"Redis unavailable, fetching {key} upstream: {e}")
+        return await single_flight.do(key, fetch)
+
+    value = _remember(key, raw)
+    if raw is not None:
+        if fresh is None:
+            fetch_stats["stale_served"] += 1
+            _schedule_revalidation(key, fetch, ttl, stale_ttl)
+        return value
+
+    return await single_flight.do(
+        key, lambda: _fetch_and_store(key, fetch, ttl, stale_ttl)
+    )
+
+
+async def _fetch_and_store(key, fetch, ttl, stale_ttl):
+    lock = RedisLock(f"fetch:{key}", FETCH_LOCK_TTL_MS)
+
+    try:
+        acquired = await lock.acquire()
+    except Exception:
+        acquired = True  # no Redis, nothing to coordinate with
+
+    if acquired:
+        try:
+            value = await fetch()
+            await _store_quietly(key, value, ttl, stale_ttl)
+            return value
+        finally:
+            await _release_quietly(lock)
+
+    # Another worker is fetching: wait for its write, up to the lock TTL
+    fetch_stats["lock_waits"] += 1
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + FETCH_LOCK_TTL_MS / 1000
+    while loop.time() < deadline:
+        await asyncio.sleep(FETCH_LOCK_POLL_SECONDS)
+        raw = await async_redis_client.get(key)
+        if raw is not None:
+            value = json.loads(raw)
+            local_cache.set(key, value)
+            return value
+
+    value = await fetch()
+    await _store_quietly(key, value, ttl, stale_ttl)
+    return value
+
+
+async def get_or_fetch_many(requests: dict, timeout: float) -> dict:
+    """
+    Batched get_or_fetch for the per-message configuration.
+
+    requests maps key -> (fetch, ttl, default). Local hits are served
+    first, the rest are read with one MGET and all misses are fetched
+    concurrently. Keys not resolved within `timeout` seconds get their
+    default; their fetches keep running and fill the cache for later.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    results = {}
+
+    pending = []
+    for key in requests:
+        found, value = local_cache.get(key)
+        if found:
+            results[key] = value
+        else:
+            pending.append(key)
+
+    misses = []
+    if pending:
+        redis_keys = []
+        for key in pending:
+            redis_keys += [key, _fresh_key(key)]
+
+        try:
+            raw_values = await asyncio.wait_for(
+                async_redis_client.mget(redis_keys), timeout
+            )
+        except Exception as e:
+            redis_stats["errors"] += 1
+            logger.warning(f"Redis unavailable, fetching config upstream: {e}")
+            raw_values = None
+
+        for index, key in enumerate(pending):
+            if raw_values is None:
+                misses.append(key)
+                continue
+
+            raw, fresh = raw_values[2 * index], raw_values[2 * index + 1]
+            value = _remember(key, raw)
+            if raw is None:
+                misses.append(key)
+                continue
+
+            results[key] = value
+            if fresh is None:
+                fetch_stats["stale_served"] += 1
+                fetch, ttl, _ = requests[key]
+                _schedule_revalidation(key, fetch, ttl, STALE_TTL_SECONDS)
+
+    if misses:
+        tasks = {}
+        for key in misses:
+            fetch, ttl, _ = requests[key]
+            tasks[key] = asyncio.ensure_future(
+                single_flight.do(
+                    key,
+                    lambda key=key, fetch=fetch, ttl=ttl: _fetch_and_store(
+                        key, fetch, ttl, STALE_TTL_SECONDS
+                    ),
+                )
+            )
+
+        done, _ = await asyncio.wait(
+            tasks.values(), timeout=max(deadline - loop.time(), 0)
+        )
+
+        for key, task in tasks.items():
+            if task not in done:
+                fetch_stats["prefetch_timeouts"] += 1
+                _background_tasks.add(task)
+                task.add_done_callback(_discard_background)
+            elif task.exception() is not None:
+                fetch_stats["prefetch_errors"] += 1
+                logger.warning(f"Fetching {key} failed: {task.exception()}")
+            else:
+                results[key] = task.result()
+
+    for key, (_, _, default) in requests.items():
+        results.setdefault(key, default)
+
+    return results
+
+
+def _discard_background(task):
+    _background_tasks.discard(task)
+    if not task.cancelled():
+        task.exception()  # retrieved so a late failure is not reported as lost
+
+
+def _schedule_revalidation(key, fetch, ttl, stale_ttl):
+    task = asyncio.ensure_future(
+        single_flight.do(
+            f"revalidate:{key}", lambda: _revalidate(key, fetch, ttl, stale_ttl)
+        )
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _revalidate(key, fetch, ttl, stale_ttl):
+    lock = RedisLock(f"fetch:{key}", FETCH_LOCK_TTL_MS)
+    if not await lock.acquire():
+        return  # another worker is already refreshing
+
+    try:
+        fetch_stats["revalidations"] += 1
+        await set_cache_async(key, await fetch(), ttl, stale_ttl)
+    except Exception as e:
+        logger.warning(f"Background refresh of {key} failed: {e}")
+    finally:
+        await _release_quietly(lock)
+
+
+async def _store_quietly(key, value, ttl, stale_ttl):
+    try:
+        await set_cache_async(key, value, ttl, stale_ttl)
+    except Exception as e:
+        redis_stats["errors"] += 1
+        local_cache.set(key, value, ttl)
+        logger.warning(f"Redis unavailable, {key} cached locally only: {e}")
+
+
+async def _release_quietly(lock):
+    try:
+        await lock.release()
+    except Exception:
+        pass
+
+
+# ------------------------------------------------------------------
+# Pub/Sub invalidation listener
+# ------------------------------------------------------------------
+
+
+_listener = None
+_listener_retry = {"delay": 0.0, "failed_at": 0.0}
+
+
+def _handle_invalidation(message):
+    _drop_local(message["data"])
+
+
+def _handle_listener_error(error, pubsub, thread):
+    """
+    Keeps the listener thread alive through Redis errors. The next read
+    reconnects and resubscribes; invalidations published in between are
+    lost, so every local tier is dropped.
+    """
+    now = time.monotonic()
+    if now - _listener_retry["failed_at"] > 2 * LISTENER_RETRY_MAX_SECONDS:
+        delay = LISTENER_RETRY_MIN_SECONDS
+    else:
+        delay = min(_listener_retry["delay"] * 2, LISTENER_RETRY_MAX_SECONDS)
+    _listener_retry["delay"] = delay
+
+    logger.warning(
+        f"Cache invalidation listener failed, resubscribing in {delay}s: {error}"
+    )
+    _drop_local("*")
+    time.sleep(delay)
+    _listener_retry["failed_at"] = time.monotonic()
+
+
+def start_invalidation_listener():
+    """
+    Subscribes this worker to INVALIDATION_CHANNEL on a daemon thread that
+    backs off and resubscribes when Redis drops the connection.
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATION_CHANNEL: _handle_invalidation})
+        _listener = pubsub.run_in_thread(
+            sleep_time=1, daemon=True, exception_handler=_handle_listener_error
+        )
+    except Exception as e:
+        logger.warning(f"Cache invalidation listener not started: {e}")
+
 
+def stop_invalidation_listener():
+    global _listener
 
-def set_cache(key, value, ttl=300):
-    redis_client.setex(key, ttl, json.dumps(value))
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
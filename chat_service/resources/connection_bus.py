@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+
+from configs.base_config import BaseConfig
+from configs.redis import async_redis_client
+
+logger = logging.getLogger("chat_ws")
+
+CHANNEL_PREFIX = "ws:"
+
+
+class InMemoryBus:
+    """
+    Routes deliveries for targets such as "user:{session_id}" or
+    "agent:{agent_id}" to the sockets registered in this process.
+    Enough for a single worker; RedisBus extends it across workers.
+    """
+
+    def __init__(self):
+        self.local = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        self.local.clear()
+
+    async def register(self, target: str, connection):
+        self.local[target] = connection
+
+    async def unregister(self, target: str, connection=None):
+        # Only drop the entry if it still belongs to this connection
+        if connection is None or self.local.get(target) is connection:
+            self.local.pop(target, None)
+
+    def is_local(self, target: str) -> bool:
+        return target in self.local
+
+    async def publish(self, target: str, message: dict) -> bool:
+        """
+        Returns True when some connection received the message.
+        """
+        return await self._deliver_local(target, message)
+
+    async def _deliver_local(self, target: str, message: dict) -> bool:
+        connection = self.local.get(target)
+        if connection is None:
+            return False
+
+        try:
+            await connection.send_json(message)
+            return True
+        except Exception as e:
+            logger.warning(f"Dropping dead connection {target}: {e}")
+            await self.unregister(target, connection)
+            return False
+
+
+class RedisBus(InMemoryBus):
+    """
+    Each worker subscribes to ws:{target} for the sockets it holds, so a
+    message published from any worker reaches the one owning the socket.
+    """
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        self.pubsub = None
+        self._reader = None
+
+    async def start(self):
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._reader = asyncio.create_task(self._read_forever())
+
+    async def stop(self):
+        if self._reader:
+            self._reader.cancel()
+            self._reader = None
+        if self.pubsub:
+            await self.pubsub.aclose()
+            self.pubsub = None
+        await super().stop()
+
+    async def register(self, target: str, connection):
+        await super().register(target, connection)
+        await self.pubsub.subscribe(CHANNEL_PREFIX + target)
+
+    async def unregister(self, target: str, connection=None):
+        owned = self.local.get(target) is not None and (
+            connection is None or self.local.get(target) is connection
+        )
+        await super().unregister(target, connection)
+        if owned:
+            try:
+                await self.pubsub.unsubscribe(CHANNEL_PREFIX + target)
+            except Exception as e:
+                logger.warning(f"Unsubscribe failed for {target}: {e}")
+
+    async def publish(self, target: str, message: dict) -> bool:
+        if self.is_local(target):
+            return await self._deliver_local(target, message)
+
+        receivers = await self.client.publish(
+            CHANNEL_PREFIX + target, json.dumps(message, default=str)
+        )
+        return receivers > 0
+
+    async def _read_forever(self):
+        while True:
+            try:
+                if not self.pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+
+                message = await self.pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+
+                target = message["channel"][len(CHANNEL_PREFIX) :]
+                await self._deliver_local(target, json.loads(message["data"]))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Connection bus reader error: {e}")
+                await asyncio.sleep(1)
+
+
+def create_bus(backend: str):
+    if backend == "memory":
+        return InMemoryBus()
+    if backend == "redis":
+        return RedisBus(async_redis_client)
+    raise ValueError(f"Unknown connection bus backend: {backend}")
+
+
+connection_bus = create_bus(BaseConfig.CONNECTION_BUS_BACKEND)
@@ -1,20 +1,103 @@
 import json
 
-from configs.redis import redis_client
+from configs.redis import async_redis_client, redis_client
 
 TTL_SECONDS = 1800  # 30 minutes
 
+# One Redis hash per session, one field per context key. Values are stored
+# JSON-encoded; declared fields are also coerced to their type on read.
+FIELD_TYPES = {
+    "last_intent": str,
+    "confidence": float,
+    "route": str,
+}
 
-def get_context(session_id: int) -> dict:
-    data = redis_client.get(f"context:{session_id}")
-    return json.loads(data) if data else {}
+
+def _key(session_id: int) -> str:
+    # Hash keys live under a new prefix so they never collide with the
+    # JSON strings previously stored at context:{session_id}
+    return f"ctx:{session_id}"
+
+
+def _encode(updates: dict) -> dict:
+    return {field: json.dumps(value) for field, value in updates.items()}
+
+
+def _decode_value(field: str, raw):
+    if raw is None:
+        return None
+    value = json.loads(raw)
+    cast = FIELD_TYPES.get(field)
+    if cast is not None and value is not None and not isinstance(value, cast):
+        value = cast(value)
+    return value
+
+
+def _decode(raw: dict) -> dict:
+    return {field: _decode_value(field, value) for field, value in raw.items()}
+
+
+def get_context(session_id: int, fields: list = None) -> dict:
+    """
+    Whole context, or only `fields` (missing ones are left out).
+    """
+    if fields is None:
+        return _decode(redis_client.hgetall(_key(session_id)))
+
+    values = redis_client.hmget(_key(session_id), fields)
+    return _decode(
+        {field: raw for field, raw in zip(fields, values) if raw is not None}
+    )
+
+
+def get_context_field(session_id: int, field: str, default=None):
+    value = _decode_value(field, redis_client.hget(_key(session_id), field))
+    return default if value is None else value
 
 
 def update_context(session_id: int, updates: dict):
-    context = get_context(session_id)
-    context.update(updates)
-    redis_client.setex(f"context:{session_id}", TTL_SECONDS, json.dumps(context))
+    """
+    Merges `updates` into the context and refreshes its TTL in one
+    MULTI/EXEC round trip; concurrent writers never drop each other's fields.
+    """
+    if not updates:
+        return
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hset(_key(session_id), mapping=_encode(updates))
+    pipe.expire(_key(session_id), TTL_SECONDS)
+    pipe.execute()
 
 
 def clear_context(session_id: int):
-    redis_client.delete(f"context:{session_id}")
+    redis_client.delete(_key(session_id))
+
+
+# Async variants for request handlers
+
+
+async def get_context_async(session_id: int, fields: list = None) -> dict:
+    if fields is None:
+        return _decode(await async_redis_client.hgetall(_key(session_id)))
+
+    values = await async_redis_client.hmget(_key(session_id), fields)
+    return _decode(
+        {field: raw for field, raw in zip(fields, values) if raw is not None}
+    )
+
+
+async def get_context_field_async(session_id: int, field: str, default=None):
+    value = _decode_value(field, await async_redis_client.hget(_key(session_id), field))
+    return default if value is None else value
+
+
+async def update_context_async(session_id: int, updates: dict):
+    if not updates:
+        return
+    pipe = async_redis_client.pipeline(transaction=True)
+    pipe.hset(_key(session_id), mapping=_encode(updates))
+    pipe.expire(_key(session_id), TTL_SECONDS)
+    await pipe.execute()
+
+
+async def clear_context_async(session_id: int):
+    await async_redis_client.delete(_key(session_id))
@@ -0,0 +1,205 @@
+import asyncio
+import importlib.util
+import logging
+import time
+
+import httpx
+from configs.base_config import HTTPPoolConfig
+
+logger = logging.getLogger("chat_http")
+
+
+# ------------------------------------------------------------------
+# Pool Metrics
+# ------------------------------------------------------------------
+
+
+class PoolMetrics:
+    """
+    Counters for one upstream pool.
+    in_use / waiting are gauges, wait time is measured from the moment a
+    request asks for a connection slot until it gets one.
+    """
+
+    def __init__(self, upstream: str, max_connections: int):
+        self.upstream = upstream
+        self.max_connections = max_connections
+        self.in_use = 0
+        self.waiting = 0
+        self.requests = 0
+        self.errors = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.requests += 1
+        self.wait_time_total += seconds
+        self.wait_time_max = max(self.wait_time_max, seconds)
+
+    def snapshot(self, idle: int) -> dict:
+        return {
+            "upstream": self.upstream,
+            "max_connections": self.max_connections,
+            "in_use": self.in_use,
+            "idle": idle,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "errors": self.errors,
+            "wait_time_avg_ms": (
+                round(self.wait_time_total / self.requests * 1000, 3)
+                if self.requests
+                else 0.0
+            ),
+            "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+        }
+
+
+class _MeteredStream(httpx.AsyncByteStream):
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class MeteredTransport(httpx.AsyncHTTPTransport):
+    """
+    AsyncHTTPTransport that gates requests on a slot per pooled connection,
+    so that in-use / wait time can be observed from outside httpcore.
+    The slot is held until the response body is closed.
+    """
+
+    def __init__(self, metrics: PoolMetrics, limits: httpx.Limits, **kwargs):
+        super().__init__(limits=limits, **kwargs)
+        self.metrics = metrics
+        self._slots = asyncio.Semaphore(limits.max_connections)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        self.metrics.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.metrics.waiting -= 1
+
+        self.metrics.record_wait(time.perf_counter() - started)
+        self.metrics.in_use += 1
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.metrics.in_use -= 1
+                self._slots.release()
+
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self.metrics.errors += 1
+            release()
+            raise
+
+        response.stream = _MeteredStream(response.stream, release)
+        return response
+
+    def idle_connections(self) -> int:
+        connections = getattr(self._pool, "connections", [])
+        return sum(1 for conn in connections if conn.is_idle())
+
+
+# ------------------------------------------------------------------
+# Client Registry
+# ------------------------------------------------------------------
+
+
+_clients: dict = {}
+_transports: dict = {}
+
+# upstream -> transport used instead of the network (benchmarks, tests)
+_transport_overrides: dict = {}
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _build_client(upstream: str) -> httpx.AsyncClient:
+    override = _transport_overrides.get(upstream)
+    if override is not None:
+        return httpx.AsyncClient(
+            transport=override, timeout=HTTPPoolConfig.DEFAULT_TIMEOUT
+        )
+
+    settings = HTTPPoolConfig.UPSTREAMS[upstream]
+
+    limits = httpx.Limits(
+        max_connections=settings["max_connections"],
+        max_keepalive_connections=settings["max_keepalive_connections"],
+        keepalive_expiry=settings["keepalive_expiry"],
+    )
+
+    http2 = settings.get("http2", False)
+    if http2 and not _http2_available():
+        logger.warning(f"h2 not installed, using HTTP/1.1 for {upstream}")
+        http2 = False
+
+    metrics = PoolMetrics(upstream, settings["max_connections"])
+    transport = MeteredTransport(metrics, limits, http2=http2)
+    _transports[upstream] = transport
+
+    return httpx.AsyncClient(
+        transport=transport, timeout=HTTPPoolConfig.DEFAULT_TIMEOUT
+    )
+
+
+def get_client(upstream: str) -> httpx.AsyncClient:
+    """
+    Returns the shared keep-alive client for an upstream ("admin", "nlp").
+    Clients are created lazily so scripts work without the app lifespan.
+    """
+    client = _clients.get(upstream)
+    if client is None or client.is_closed:
+        client = _build_client(upstream)
+        _clients[upstream] = client
+    return client
+
+
+def override_transport(upstream: str, transport: httpx.AsyncBaseTransport):
+    """
+    Routes an upstream through `transport` (e.g. httpx.MockTransport) for
+    clients created from now on. Overridden upstreams are not metered.
+    """
+    _transport_overrides[upstream] = transport
+    _clients.pop(upstream, None)
+    _transports.pop(upstream, None)
+
+
+def open_clients():
+    for upstream in HTTPPoolConfig.UPSTREAMS:
+        get_client(upstream)
+
+
+async def close_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    _transports.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def pool_stats() -> dict:
+    return {
+        upstream: transport.metrics.snapshot(transport.idle_connections())
+        for upstream, transport in _transports.items()
+    }
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+import time
+
+from configs.base_config import BaseConfig
+from configs.redis import async_redis_client
+
+logger = logging.getLogger("chat_idempotency")
+
+PENDING = json.dumps({"status": "pending"})
+POLL_SECONDS = 0.05
+MAX_CLIENT_MESSAGE_ID_LENGTH = 128
+
+
+class MessageInFlight(Exception):
+    """
+    The original request for this client message id is still running.
+    """
+
+
+def _key(session_key: str, client_message_id: str) -> str:
+    return f"msg:{session_key}:{client_message_id}"
+
+
+async def run_once(session_key: str, client_message_id: str, run) -> tuple:
+    """
+    Runs `run()` (a coroutine function returning a JSON-serialisable
+    result) at most once per (session_key, client_message_id) within
+    IDEMPOTENCY_TTL_SECONDS. Returns (result, replayed).
+
+    The first caller claims the id with SET NX; a retry that arrives while
+    it runs waits for its result, one arriving later gets the stored
+    result. If the first call fails the claim is dropped so a retry can
+    run again. Without a client_message_id, or without Redis, `run()`
+    simply runs.
+    """
+    if not client_message_id:
+        return await run(), False
+
+    key = _key(session_key, client_message_id)
+    deadline = time.monotonic() + BaseConfig.IDEMPOTENCY_WAIT_SECONDS
+
+    while True:
+        try:
+            claimed = await async_redis_client.set(
+                key, PENDING, nx=True, ex=BaseConfig.IDEMPOTENCY_PENDING_TTL_SECONDS
+            )
+            stored = None if claimed else await async_redis_client.get(key)
+        except Exception as e:
+            logger.warning(f"Redis unavailable, not deduplicating {key}: {e}")
+            return await run(), False
+
+        if claimed:
+            break
+
+        if stored is not None:
+            entry = json.loads(stored)
+            if entry["status"] == "done":
+                return entry["result"], True
+
+        # Pending, or released by a failed attempt a moment ago
+        if time.monotonic() >= deadline:
+            raise MessageInFlight(client_message_id)
+        await asyncio.sleep(POLL_SECONDS)
+
+    try:
+        result = await run()
+    except BaseException:
+        await _forget(key)
+        raise
+
+    try:
+        await async_redis_client.set(
+            key,
+            json.dumps({"status": "done", "result": result}, default=str),
+            ex=BaseConfig.IDEMPOTENCY_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"Could not store result for {key}: {e}")
+
+    return result, False
+
+
+async def _forget(key: str):
+    try:
+        await async_redis_client.delete(key)
+    except Exception as e:
+        logger.warning(f"Could not release {key}: {e}")
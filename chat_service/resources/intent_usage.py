@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from configs.base_config import BaseConfig
+from resources.admin_client import push_intent_usage
+
+logger = logging.getLogger("chat_intent_usage")
+
+
+def hour_bucket(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+class IntentUsageRollup:
+    """
+    Per-intent, per-hour counters accumulated in memory and pushed to
+    admin_service as deltas, which it upserts into intent_usage_hourly.
+    Recording is a dict update on the request path; the rollup table sees
+    one row per (intent, hour) per flush however many messages arrived.
+    """
+
+    def __init__(self):
+        # (intent, bucket) -> [hits, fallbacks, escalations, confidence_sum]
+        self.pending = {}
+
+    def record(
+        self,
+        intent: str,
+        confidence,
+        fallback: bool,
+        escalated: bool,
+        at: datetime = None,
+    ):
+        if not intent:
+            return
+        key = (intent, hour_bucket(at or datetime.utcnow()))
+        counters = self.pending.setdefault(key, [0, 0, 0, 0.0])
+        counters[0] += 1
+        counters[1] += int(fallback)
+        counters[2] += int(escalated)
+        counters[3] += float(confidence or 0.0)
+
+    def drain(self) -> dict:
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def restore(self, pending: dict):
+        """
+        Merges deltas that could not be pushed back in for the next flush.
+        """
+        for key, (hits, fallbacks, escalations, confidence_sum) in pending.items():
+            counters = self.pending.setdefault(key, [0, 0, 0, 0.0])
+            counters[0] += hits
+            counters[1] += fallbacks
+            counters[2] += escalations
+            counters[3] += confidence_sum
+
+    async def flush(self) -> int:
+        pending = self.drain()
+        if not pending:
+            return 0
+
+        rows = [
+            {
+                "intent_name": intent,
+                "bucket_start": bucket.isoformat(),
+                "hits": hits,
+                "fallbacks": fallbacks,
+                "escalations": escalations,
+                "confidence_sum": confidence_sum,
+            }
+            for (intent, bucket), (
+                hits,
+                fallbacks,
+                escalations,
+                confidence_sum,
+            ) in pending.items()
+        ]
+        try:
+            await push_intent_usage(rows)
+        except Exception as e:
+            logger.warning(f"Intent usage push failed, retrying next flush: {e}")
+            self.restore(pending)
+            return 0
+        return len(rows)
+
+    async def flush_forever(
+        self, interval: float = BaseConfig.INTENT_USAGE_FLUSH_INTERVAL_SECONDS
+    ):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+
+intent_usage = IntentUsageRollup()
@@ -0,0 +1,151 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Pipeline stages, in the order message_pipeline() runs them
+STAGES = (
+    "session_lookup",
+    "config_load",
+    "escalation_check",
+    "nlp",
+    "escalation",
+    "persist",
+)
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "chat_stage_duration_seconds",
+    "Time spent in each chat pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+MESSAGE_SECONDS = Histogram(
+    "chat_message_duration_seconds",
+    "End-to-end chat message processing time",
+    buckets=LATENCY_BUCKETS,
+)
+MESSAGES = Counter(
+    "chat_messages_total", "Chat messages processed, by final route", ["route"]
+)
+STAGE_ERRORS = Counter(
+    "chat_stage_errors_total", "Chat pipeline stages that raised", ["stage"]
+)
+
+RATE_LIMITED = Counter(
+    "chat_rate_limited_total",
+    "Chat messages rejected by the rate limiter, by bucket store",
+    ["source"],
+)
+
+RETENTION_SCANNED = Counter(
+    "chat_retention_scanned_rows_total",
+    "Rows checked by the retention purger",
+    ["table"],
+)
+RETENTION_DELETED = Counter(
+    "chat_retention_deleted_rows_total",
+    "Rows deleted by the retention purger",
+    ["table"],
+)
+RETENTION_CHUNK_SECONDS = Histogram(
+    "chat_retention_chunk_duration_seconds",
+    "Time to scan and delete one retention chunk",
+    ["table"],
+    buckets=LATENCY_BUCKETS,
+)
+RETENTION_WATERMARK = Gauge(
+    "chat_retention_watermark", "Last id checked by the retention purger", ["table"]
+)
+
+ARCHIVED_ROWS = Counter(
+    "chat_archived_rows_total", "Conversation rows moved to cold storage"
+)
+
+ANALYTICS_DROPPED = Counter(
+    "chat_analytics_dropped_total",
+    "Analytics events dropped instead of delaying a reply, by reason",
+    ["reason"],
+)
+ANALYTICS_FLUSHED = Counter(
+    "chat_analytics_flushed_total", "Analytics events written to the sink"
+)
+ANALYTICS_QUEUE_DEPTH = Gauge(
+    "chat_analytics_queue_depth", "Analytics events waiting to be flushed"
+)
+ANALYTICS_LOADED = Counter(
+    "chat_analytics_loaded_total", "Analytics events loaded into analytics_events"
+)
+
+
+class StageTimer:
+    """
+    Times the stages of one message. Every stage is observed in
+    STAGE_SECONDS as it ends; finish() records the whole message.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.labels(name).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            STAGE_SECONDS.labels(name).observe(elapsed)
+
+    def elapsed_ms(self) -> int:
+        return int((time.perf_counter() - self.started) * 1000)
+
+    def stage_ms(self) -> dict:
+        return {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+
+    def finish(self, route: str):
+        MESSAGE_SECONDS.observe(time.perf_counter() - self.started)
+        MESSAGES.labels(route or "UNKNOWN").inc()
+
+
+def render_metrics() -> tuple:
+    """
+    (body, content_type) in the Prometheus text format. With several
+    workers, set PROMETHEUS_MULTIPROC_DIR so samples are merged across them.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,5 +1,5 @@
-import httpx
 from configs.base_config import ServiceURL
+from resources.http_clients import get_client
 
 
 async def analyze_text(
@@ -17,7 +17,7 @@ async def analyze_text(
         "intent_phrases": intent_phrases,
     }
 
-    async with httpx.AsyncClient(timeout=5) as client:
-        response = await client.post(ServiceURL.NLP_URL, json=payload)
-        response.raise_for_status()
-        return response.json()
+    client = get_client("nlp")
+    response = await client.post(ServiceURL.NLP_URL, json=payload, timeout=5)
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,158 @@
+import logging
+import time
+from collections import OrderedDict
+
+from configs.base_config import BaseConfig
+from configs.redis import async_redis_client
+from resources.metrics import RATE_LIMITED
+
+logger = logging.getLogger("chat_rate_limit")
+
+# Token buckets, one hash per key: {tokens, ts}. Every bucket must have a
+# token for the call to pass; then one is taken from each. Time comes from
+# the Redis server so workers never disagree on refill.
+# ARGV: cost, then (capacity, refill_per_second) for each key.
+# Returns {allowed, retry_after_ms}.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local levels = {}
+local retry_after = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call("HMGET", key, "tokens", "ts")
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - ts, 0) / 1000 * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        retry_after = math.max(retry_after, math.ceil((cost - tokens) / rate * 1000))
+    end
+end
+
+if retry_after > 0 then
+    return {0, retry_after}
+end
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    redis.call("HSET", key, "tokens", tostring(levels[i] - cost), "ts", now)
+    redis.call("PEXPIRE", key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return {1, 0}
+"""
+
+_take_tokens = async_redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+
+class LocalTokenBuckets:
+    """
+    Same buckets kept in process memory, used while Redis is unreachable.
+    Limits then apply per worker rather than globally.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def take(self, buckets: list, cost: int = 1) -> tuple:
+        now = time.monotonic()
+        levels = []
+        retry_after = 0.0
+
+        for key, capacity, rate in buckets:
+            tokens, ts = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+            levels.append(tokens)
+            if tokens < cost:
+                retry_after = max(retry_after, (cost - tokens) / rate)
+
+        if retry_after > 0:
+            return False, retry_after
+
+        for (key, _, _), tokens in zip(buckets, levels):
+            self._buckets[key] = (tokens - cost, now)
+            self._buckets.move_to_end(key)
+
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return True, 0.0
+
+
+local_buckets = LocalTokenBuckets()
+
+
+def _buckets_for(session_key: str, client_ip: str) -> list:
+    buckets = []
+    if session_key:
+        buckets.append(
+            (
+                f"rl:session:{session_key}",
+                BaseConfig.RATE_LIMIT_SESSION_CAPACITY,
+                BaseConfig.RATE_LIMIT_SESSION_PER_SECOND,
+            )
+        )
+    if client_ip:
+        buckets.append(
+            (
+                f"rl:ip:{client_ip}",
+                BaseConfig.RATE_LIMIT_IP_CAPACITY,
+                BaseConfig.RATE_LIMIT_IP_PER_SECOND,
+            )
+        )
+    return buckets
+
+
+async def check_rate_limit(session_key: str, client_ip: str, cost: int = 1) -> tuple:
+    """
+    Takes `cost` tokens from the session and the IP bucket in one Redis
+    round trip. Returns (allowed, retry_after_seconds).
+    """
+    return await _take(_buckets_for(session_key, client_ip), cost)
+
+
+async def check_bulk_rate_limit(client_ip: str, cost: int) -> tuple:
+    """
+    Takes one token per replayed message from the IP's bulk bucket, which
+    holds a full batch and refills at RATE_LIMIT_BULK_PER_SECOND.
+    Returns (allowed, retry_after_seconds).
+    """
+    buckets = []
+    if client_ip:
+        buckets.append(
+            (
+                f"rl:bulk:{client_ip}",
+                BaseConfig.RATE_LIMIT_BULK_CAPACITY,
+                BaseConfig.RATE_LIMIT_BULK_PER_SECOND,
+            )
+        )
+    return await _take(buckets, cost)
+
+
+async def _take(buckets: list, cost: int) -> tuple:
+    if not BaseConfig.RATE_LIMIT_ENABLED or not buckets:
+        return True, 0.0
+
+    args = [cost]
+    for _, capacity, rate in buckets:
+        args += [capacity, rate]
+
+    try:
+        allowed, retry_after_ms = await _take_tokens(
+            keys=[key for key, _, _ in buckets], args=args
+        )
+        source, retry_after = "redis", retry_after_ms / 1000
+    except Exception as e:
+        logger.warning(f"Redis unavailable, rate limiting in process: {e}")
+        allowed, retry_after = local_buckets.take(buckets, cost)
+        source = "local"
+
+    if not allowed:
+        RATE_LIMITED.labels(source).inc()
+
+    return bool(allowed), retry_after
@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+from configs.base_config import BaseConfig
+from configs.redis import async_redis_client
+from models.models import Conversation, Escalation, Feedback
+from resources.admin_client import fetch_retention_policies
+from resources.archive import purge_expired_parts
+from resources.metrics import (
+    RETENTION_CHUNK_SECONDS,
+    RETENTION_DELETED,
+    RETENTION_SCANNED,
+    RETENTION_WATERMARK,
+)
+from resources.session_cache import resolve_tenants
+from resources.singleflight import RedisLock
+from sqlalchemy import delete, select
+
+logger = logging.getLogger("chat_retention")
+
+RETENTION_TABLES = {
+    "conversations": Conversation,
+    "escalations": Escalation,
+    "feedback": Feedback,
+}
+
+# Escalations an agent may still act on are never purged
+OPEN_ESCALATION_STATUSES = ("PENDING", "ASSIGNED")
+
+# Low-water hash field for the first id the finished pass did not scan
+FRONTIER_FIELD = "*"
+
+
+def _watermark_key(table: str) -> str:
+    return f"retention:watermark:{table}"
+
+
+def _low_water_key(table: str, pending: bool = False) -> str:
+    key = f"retention:low_water:{table}"
+    return f"{key}:pending" if pending else key
+
+
+class RetentionPurger:
+    """
+    Deletes rows older than their tenant's data_retention_days, and the
+    archived days (resources/archive.py) that have fallen out of it.
+
+    Each table is walked in primary-key order, RETENTION_CHUNK_SIZE rows at
+    a time: read (id, session_id, created_at) past the watermark, map
+    sessions to tenants, delete the expired ids in one short transaction,
+    pause, repeat. The watermark is saved in Redis after every chunk, so an
+    interrupted pass resumes where it stopped. A pass ends once a chunk
+    holds only rows too young for any policy (ids grow with created_at).
+
+    Each pass also records every tenant's low-water mark, the oldest id it
+    kept. The next pass starts from the lowest mark among tenants whose
+    current policy can expire rows, or from where the last pass stopped
+    scanning if that is lower, instead of from the first row.
+
+    With dry_run=True nothing is deleted or saved; the report counts what
+    would be.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        policies: dict,
+        default_days: int = BaseConfig.RETENTION_DEFAULT_DAYS,
+        chunk_size: int = BaseConfig.RETENTION_CHUNK_SIZE,
+        pause: float = BaseConfig.RETENTION_CHUNK_PAUSE_SECONDS,
+        archive_root: str = BaseConfig.ARCHIVE_DIR,
+        dry_run: bool = False,
+    ):
+        self.session_factory = session_factory
+        self.policies = policies
+        self.default_days = default_days
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.archive_root = archive_root
+        self.dry_run = dry_run
+        self.now = datetime.utcnow()
+        self._tenants = {}
+
+        # Rows newer than this are kept under every policy
+        days = [d for d in [default_days, *policies.values()] if d and d > 0]
+        self.youngest_cutoff = self.now - timedelta(days=min(days)) if days else None
+
+    def cutoff(self, user_id):
+        """
+        Rows created before this are expired; None keeps them forever.
+        """
+        days = self.policies.get(user_id, self.default_days)
+        if not days or days <= 0:
+            return None
+        return self.now - timedelta(days=days)
+
+    async def run(self, tables=tuple(RETENTION_TABLES), max_chunks: int = None):
+        report = {
+            "dry_run": self.dry_run,
+            "now": self.now.isoformat(),
+            "tables": {},
+        }
+        for table in tables:
+            report["tables"][table] = await self.purge_table(table, max_chunks)
+        if self.archive_root:
+            report["archive"] = await asyncio.to_thread(
+                purge_expired_parts, self.archive_root, self.cutoff, self.dry_run
+            )
+        return report
+
+    async def purge_table(self, table: str, max_chunks: int = None) -> dict:
+        model = RETENTION_TABLES[table]
+        watermark = 0 if self.dry_run else await self._load_watermark(table)
+        report = {
+            "started_at_id": watermark,
+            "scanned": 0,
+            "expired": 0,
+            "deleted": 0,
+            "chunks": 0,
+            "by_tenant": {},
+            "complete": False,
+        }
+
+        if self.youngest_cutoff is None:
+            report["complete"] = True
+            return report
+
+        columns = [model.id, model.session_id, model.created_at]
+        if model is Escalation:
+            columns.append(Escalation.status)
+
+        # First id the pass leaves unscanned once it completes
+        frontier = None
+
+        while max_chunks is None or report["chunks"] < max_chunks:
+            started = time.perf_counter()
+
+            async with self.session_factory() as db:
+                rows = (
+                    await db.execute(
+                        select(*columns)
+                        .where(model.id > watermark)
+                        .order_by(model.id)
+                        .limit(self.chunk_size)
+                    )
+                ).all()
+
+                if not rows:
+                    report["complete"] = True
+                    break
+
+                tenants = await resolve_tenants(
+                    db, {row.session_id for row in rows}, self._tenants
+                )
+                expired = []
+                low_water = {}
+                for row in rows:
+                    user_id = tenants.get(row.session_id)
+                    tenant = str(user_id)
+                    if self._is_expired(row, user_id):
+                        expired.append(row.id)
+                        report["by_tenant"][tenant] = (
+                            report["by_tenant"].get(tenant, 0) + 1
+                        )
+                    elif row.created_at is not None:
+                        low_water.setdefault(tenant, row.id)
+
+                if expired and not self.dry_run:
+                    result = await db.execute(
+                        delete(model)
+                        .where(model.id.in_(expired))
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+                    report["deleted"] += result.rowcount
+                    RETENTION_DELETED.labels(table).inc(result.rowcount)
+                else:
+                    await db.rollback()
+
+            watermark = rows[-1].id
+            report["chunks"] += 1
+            report["scanned"] += len(rows)
+            report["expired"] += len(expired)
+            RETENTION_SCANNED.labels(table).inc(len(rows))
+            RETENTION_CHUNK_SECONDS.labels(table).observe(
+                time.perf_counter() - started
+            )
+
+            if not self.dry_run:
+                await self._save_low_water(table, low_water)
+
+            if all(
+                row.created_at is not None and row.created_at >= self.youngest_cutoff
+                for row in rows
+            ):
+                report["complete"] = True
+                frontier = rows[0].id
+                break
+
+            if not self.dry_run:
+                await self._save_watermark(table, watermark)
+            await asyncio.sleep(self.pause)
+
+        if report["complete"] and frontier is None and watermark:
+            # Table exhausted: anything newer was never scanned
+            frontier = watermark + 1
+
+        report["watermark"] = watermark
+        if report["complete"] and not self.dry_run:
+            await self._finish_pass(table, frontier)
+
+        return report
+
+    def _is_expired(self, row, user_id) -> bool:
+        cutoff = self.cutoff(user_id)
+        if cutoff is None or row.created_at is None or row.created_at >= cutoff:
+            return False
+        return getattr(row, "status", None) not in OPEN_ESCALATION_STATUSES
+
+    async def _load_watermark(self, table: str) -> int:
+        """
+        Resumes an interrupted pass, or starts a new one just below the
+        lowest low-water mark that can still expire rows.
+        """
+        try:
+            value = await async_redis_client.get(_watermark_key(table))
+            if value is not None:
+                watermark = int(value)
+            else:
+                watermark = await self._start_pass(table)
+        except Exception as e:
+            logger.warning(f"Redis unavailable, scanning {table} from the start: {e}")
+            return 0
+
+        RETENTION_WATERMARK.labels(table).set(watermark)
+        return watermark
+
+    async def _start_pass(self, table: str) -> int:
+        marks = await async_redis_client.hgetall(_low_water_key(table))
+        start = self._start_below(marks)
+
+        # Marks the pass will not reach (tenants that keep rows forever)
+        # carry over, in case their policy changes
+        kept = {
+            tenant: row_id
+            for tenant, row_id in marks.items()
+            if tenant != FRONTIER_FIELD and int(row_id) <= start
+        }
+        pipe = async_redis_client.pipeline(transaction=True)
+        pipe.delete(_low_water_key(table, pending=True))
+        if kept:
+            pipe.hset(_low_water_key(table, pending=True), mapping=kept)
+        await pipe.execute()
+        return start
+
+    def _start_below(self, marks: dict) -> int:
+        if FRONTIER_FIELD not in marks:
+            return 0
+
+        starts = [int(marks[FRONTIER_FIELD])]
+        for tenant, row_id in marks.items():
+            if tenant == FRONTIER_FIELD:
+                continue
+            user_id = None if tenant == "None" else int(tenant)
+            if self.cutoff(user_id) is not None:
+                starts.append(int(row_id))
+        return max(min(starts) - 1, 0)
+
+    async def _save_low_water(self, table: str, low_water: dict):
+        if not low_water:
+            return
+        try:
+            # Chunks come in id order, so the first id seen per tenant wins
+            pipe = async_redis_client.pipeline(transaction=False)
+            for tenant, row_id in low_water.items():
+                pipe.hsetnx(_low_water_key(table, pending=True), tenant, row_id)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not save retention low-water for {table}: {e}")
+
+    async def _finish_pass(self, table: str, frontier):
+        try:
+            pipe = async_redis_client.pipeline(transaction=True)
+            if frontier is not None:
+                pipe.hset(_low_water_key(table, pending=True), FRONTIER_FIELD, frontier)
+                pipe.rename(_low_water_key(table, pending=True), _low_water_key(table))
+            else:
+                # Nothing scanned (empty table): the next pass starts from 0
+                pipe.delete(_low_water_key(table, pending=True))
+                pipe.delete(_low_water_key(table))
+            pipe.delete(_watermark_key(table))
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not finish retention pass for {table}: {e}")
+
+    async def _save_watermark(self, table: str, watermark: int):
+        RETENTION_WATERMARK.labels(table).set(watermark)
+        try:
+            await async_redis_client.set(_watermark_key(table), watermark)
+        except Exception as e:
+            logger.warning(f"Could not save retention watermark for {table}: {e}")
+
+
+async def purge_expired(session_factory, dry_run: bool = False, **options) -> dict:
+    """
+    One retention pass with the policies currently set in admin_service.
+    Nothing is deleted when the policies cannot be loaded, since the
+    default could be shorter than what a tenant asked for.
+    """
+    tables = options.pop("tables", tuple(RETENTION_TABLES))
+    max_chunks = options.pop("max_chunks", None)
+
+    policies = await fetch_retention_policies()
+    purger = RetentionPurger(session_factory, policies, dry_run=dry_run, **options)
+    return await purger.run(tables, max_chunks)
+
+
+async def retention_forever(
+    session_factory, interval=BaseConfig.RETENTION_INTERVAL_SECONDS
+):
+    while True:
+        # The lock is left to expire, so one worker runs per interval
+        if await _claim_pass(interval):
+            try:
+                report = await purge_expired(session_factory)
+                deleted = {
+                    table: result["deleted"]
+                    for table, result in report["tables"].items()
+                }
+                if "archive" in report:
+                    deleted["archive"] = report["archive"]["rows"]
+                logger.info(f"Retention pass done, deleted {deleted}")
+            except Exception as e:
+                logger.warning(f"Retention pass failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def _claim_pass(interval: int) -> bool:
+    try:
+        return await RedisLock("retention", ttl_ms=int(interval * 1000)).acquire()
+    except Exception as e:
+        logger.warning(f"Retention lock unavailable, skipping pass: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    from models import AsyncSessionLocal, async_engine
+
+    parser = argparse.ArgumentParser(description="Purge expired chat data")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--table", action="append", choices=list(RETENTION_TABLES))
+    parser.add_argument("--max-chunks", type=int)
+    parser.add_argument(
+        "--chunk-size", type=int, default=BaseConfig.RETENTION_CHUNK_SIZE
+    )
+    parser.add_argument(
+        "--pause", type=float, default=BaseConfig.RETENTION_CHUNK_PAUSE_SECONDS
+    )
+    parser.add_argument(
+        "--archive-root",
+        default=BaseConfig.ARCHIVE_DIR,
+        help="archived parts to purge too; pass '' to skip",
+    )
+    args = parser.parse_args()
+
+    async def _main():
+        report = await purge_expired(
+            AsyncSessionLocal,
+            dry_run=args.dry_run,
+            tables=tuple(args.table or RETENTION_TABLES),
+            max_chunks=args.max_chunks,
+            chunk_size=args.chunk_size,
+            pause=args.pause,
+            archive_root=args.archive_root,
+        )
+        print(json.dumps(report, indent=2))
+        await async_engine.dispose()
+
+    asyncio.run(_main())
@@ -0,0 +1,116 @@
+import json
+import logging
+
+from configs.redis import async_redis_client
+from models.models import Sessions
+from resources.cache import LocalCache, invalidate_cache_async, register_local_tier
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("chat_cache")
+
+SESSION_CACHE_TTL_SECONDS = 86400
+SESSION_LOCAL_MAX_ENTRIES = 10000
+SESSION_LOCAL_TTL_SECONDS = 300
+
+session_local_cache = LocalCache(SESSION_LOCAL_MAX_ENTRIES, SESSION_LOCAL_TTL_SECONDS)
+register_local_tier("sessions", session_local_cache)
+
+
+def _key(session_key: str) -> str:
+    return f"session:{session_key}"
+
+
+async def get_cached_session(session_key: str):
+    """
+    session_key -> {"id", "user_id", "platform", "status"} from the local
+    tier or Redis, None when not cached.
+    """
+    key = _key(session_key)
+
+    found, info = session_local_cache.get(key)
+    if found:
+        return info
+
+    try:
+        raw = await async_redis_client.get(key)
+    except Exception as e:
+        logger.warning(f"Redis unavailable, session cache miss: {e}")
+        return None
+
+    if raw is None:
+        return None
+
+    info = json.loads(raw)
+    session_local_cache.set(key, info)
+    return info
+
+
+async def cache_session(session_key: str, session) -> dict:
+    """
+    Caches a committed Sessions row (or a row with the same attributes).
+    """
+    info = {
+        "id": session.id,
+        "user_id": session.user_id,
+        "platform": session.platform,
+        "status": session.status,
+    }
+
+    key = _key(session_key)
+    session_local_cache.set(key, info)
+    try:
+        await async_redis_client.setex(
+            key, SESSION_CACHE_TTL_SECONDS, json.dumps(info)
+        )
+    except Exception as e:
+        logger.warning(f"Redis unavailable, session not cached: {e}")
+
+    return info
+
+
+async def evict_session(session_key: str):
+    try:
+        await invalidate_cache_async(_key(session_key))
+    except Exception as e:
+        session_local_cache.delete(_key(session_key))
+        logger.warning(f"Redis unavailable, session evicted locally only: {e}")
+
+
+async def resolve_session(db: AsyncSession, session_key: str):
+    """
+    Cached session lookup, falls back to the sessions table on a miss.
+    Returns None for unknown keys (nothing is cached for them).
+    """
+    info = await get_cached_session(session_key)
+    if info is not None:
+        return info
+
+    row = (
+        await db.execute(
+            select(Sessions.id, Sessions.user_id, Sessions.platform, Sessions.status)
+            .where(Sessions.session_key == session_key)
+            .limit(1)
+        )
+    ).first()
+
+    if row is None:
+        return None
+
+    return await cache_session(session_key, row)
+
+
+async def resolve_tenants(db, session_ids: set, known: dict) -> dict:
+    """
+    session_id -> user_id (None for anonymous or deleted sessions).
+    `known` caches answers across chunks.
+    """
+    missing = [sid for sid in session_ids if sid not in known]
+    if missing:
+        rows = await db.execute(
+            select(Sessions.id, Sessions.user_id).where(Sessions.id.in_(missing))
+        )
+        found = dict(rows.all())
+        for session_id in missing:
+            known[session_id] = found.get(session_id)
+    return {sid: known[sid] for sid in session_ids}
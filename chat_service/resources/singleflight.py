@@ -0,0 +1,66 @@
+import asyncio
+import uuid
+
+from configs.redis import async_redis_client
+
+# Deletes the lock only if it is still held by the caller's token
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+_release_lock = async_redis_client.register_script(RELEASE_LOCK_SCRIPT)
+
+
+class SingleFlight:
+    """
+    Lets one call per key run at a time inside this process; concurrent
+    callers for the same key await the same result (or exception).
+    The call runs in its own task, so a cancelled caller does not cancel
+    the fetch the others are waiting on.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+
+        if task is None:
+            self.stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.stats["coalesced"] += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class RedisLock:
+    """
+    Non-blocking cross-process lock (SET NX PX + token-checked release).
+    """
+
+    def __init__(self, name: str, ttl_ms: int = 10000):
+        self.key = f"lock:{name}"
+        self.ttl_ms = ttl_ms
+        self.token = uuid.uuid4().hex
+
+    async def acquire(self) -> bool:
+        return bool(
+            await async_redis_client.set(self.key, self.token, nx=True, px=self.ttl_ms)
+        )
+
+    async def release(self):
+        await _release_lock(keys=[self.key], args=[self.token])
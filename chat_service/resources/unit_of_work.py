@@ -0,0 +1,88 @@
+from models.models import Conversation, Escalation
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Every conversation row carries the same keys so the rows of one message
+# (and of a batch of messages) go out as a single multi-row INSERT.
+CONVERSATION_FIELDS = (
+    "session_id",
+    "user_id",
+    "sender",
+    "message_text",
+    "intent_detected",
+    "confidence_score",
+    "entities",
+    "response_time_ms",
+    "is_fallback",
+    "created_at",
+)
+
+
+class MessageUnitOfWork:
+    """
+    Collects the rows produced by chat messages (user / bot messages and
+    escalations) and writes them in one transaction:
+    one multi-row INSERT into conversations, one INSERT per escalation,
+    one COMMIT. Generated IDs come back from the INSERT itself.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._messages = []
+        self._escalations = []
+
+    def add_message(self, **values) -> int:
+        """
+        Queues a conversation row, returns its position for add_escalation().
+        """
+        row = {field: values.get(field) for field in CONVERSATION_FIELDS}
+        self._messages.append(row)
+        return len(self._messages) - 1
+
+    def add_escalation(self, message_ref: int, **values):
+        self._escalations.append((message_ref, values))
+
+    async def commit(self) -> dict:
+        try:
+            message_ids = await self._insert_messages()
+
+            escalation_ids = []
+            for message_ref, values in self._escalations:
+                result = await self.db.execute(
+                    insert(Escalation).values(
+                        conversation_id=message_ids[message_ref], **values
+                    )
+                )
+                escalation_ids.append(result.inserted_primary_key[0])
+
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+
+        self._messages = []
+        self._escalations = []
+
+        return {"message_ids": message_ids, "escalation_ids": escalation_ids}
+
+    async def _insert_messages(self) -> list:
+        if not self._messages:
+            return []
+
+        dialect = self.db.bind.dialect
+
+        if dialect.insert_executemany_returning_sort_by_parameter_order:
+            result = await self.db.execute(
+                insert(Conversation).returning(
+                    Conversation.id, sort_by_parameter_order=True
+                ),
+                self._messages,
+            )
+            return list(result.scalars())
+
+        # MySQL has no RETURNING: send one multi-VALUES INSERT. InnoDB reserves
+        # consecutive ids for a simple insert, starting at LAST_INSERT_ID()
+        # (assumes auto_increment_increment = 1).
+        result = await self.db.execute(insert(Conversation).values(self._messages))
+        first_id = result.lastrowid
+        return [first_id + offset for offset in range(len(self._messages))]
@@ -5,7 +5,9 @@ from typing import Optional
 
 import jwt
 from configs.base_config import BaseConfig
-from configs.redis import redis_client
+from configs.redis import async_redis_client, redis_client
+from redis.exceptions import RedisError
+from resources.analytics import event_buffer
 
 logger = logging.getLogger("chat_analytics")
 
@@ -48,9 +50,12 @@ def should_escalate(nlp_result: dict) -> bool:
 
 
 def log_event(event_type: str, payload: dict):
+    """
+    Queues the event for the analytics flusher; never blocks the caller.
+    """
     payload["event"] = event_type
     payload["timestamp"] = datetime.utcnow().isoformat()
-    logger.info(payload)
+    event_buffer.emit(dict(payload))
 
 
 # Circuit Breaker
@@ -59,6 +64,10 @@ def log_event(event_type: str, payload: dict):
 FAILURE_LIMIT = 5
 COOLDOWN_SECONDS = 30
 
+# Per-process breaker state, used while Redis is unreachable
+_local_failures = {}
+_local_open_until = {}
+
 
 def _failures_key(service: str) -> str:
     return f"cb:{service}:failures"
@@ -72,28 +81,81 @@ def allow_request(service: str) -> bool:
     try:
         open_until = redis_client.get(_open_until_key(service))
     except Exception as e:
-        # log warning and allow request
-        logger.warning(f"Redis unavailable, allowing request: {e}")
-        return True
-
-    if open_until and int(open_until) > time.time():
-        return False
+        logger.warning(f"Redis unavailable, using the local breaker: {e}")
+        open_until = _local_open_until.get(service)
 
-    return True
+    return not _is_open(open_until)
 
 
 def record_failure(service: str):
-    failures = redis_client.incr(_failures_key(service))
+    try:
+        failures = redis_client.incr(_failures_key(service))
 
-    if failures >= FAILURE_LIMIT:
-        redis_client.set(
-            _open_until_key(service), time() + COOLDOWN_SECONDS, ex=COOLDOWN_SECONDS
-        )
+        if failures >= FAILURE_LIMIT:
+            redis_client.set(
+                _open_until_key(service), time() + COOLDOWN_SECONDS, ex=COOLDOWN_SECONDS
+            )
+    except RedisError as e:
+        logger.warning(f"Redis unavailable, counting {service} failure locally: {e}")
+        _record_failure_locally(service)
 
 
 def record_success(service: str):
-    redis_client.delete(_failures_key(service))
-    redis_client.delete(_open_until_key(service))
+    _local_failures.pop(service, None)
+    _local_open_until.pop(service, None)
+    try:
+        redis_client.delete(_failures_key(service), _open_until_key(service))
+    except RedisError as e:
+        logger.warning(f"Redis unavailable, {service} breaker reset locally: {e}")
+
+
+def _record_failure_locally(service: str):
+    failures = _local_failures.get(service, 0) + 1
+    _local_failures[service] = failures
+
+    if failures >= FAILURE_LIMIT:
+        _local_open_until[service] = time() + COOLDOWN_SECONDS
+
+
+def _is_open(open_until) -> bool:
+    return bool(open_until) and float(open_until) > time()
+
+
+# Async variants for request handlers
+
+
+async def allow_request_async(service: str) -> bool:
+    try:
+        open_until = await async_redis_client.get(_open_until_key(service))
+    except Exception as e:
+        logger.warning(f"Redis unavailable, using the local breaker: {e}")
+        open_until = _local_open_until.get(service)
+
+    return not _is_open(open_until)
+
+
+async def record_failure_async(service: str):
+    try:
+        failures = await async_redis_client.incr(_failures_key(service))
+
+        if failures >= FAILURE_LIMIT:
+            await async_redis_client.set(
+                _open_until_key(service), time() + COOLDOWN_SECONDS, ex=COOLDOWN_SECONDS
+            )
+    except RedisError as e:
+        logger.warning(f"Redis unavailable, counting {service} failure locally: {e}")
+        _record_failure_locally(service)
+
+
+async def record_success_async(service: str):
+    _local_failures.pop(service, None)
+    _local_open_until.pop(service, None)
+    try:
+        await async_redis_client.delete(
+            _failures_key(service), _open_until_key(service)
+        )
+    except RedisError as e:
+        logger.warning(f"Redis unavailable, {service} breaker reset locally: {e}")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
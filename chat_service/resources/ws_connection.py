@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+
+from configs.base_config import BaseConfig
+from fastapi import WebSocket
+
+logger = logging.getLogger("chat_ws")
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# Close code sent to consumers that cannot keep up ("Try Again Later")
+OVERFLOW_CLOSE_CODE = 1013
+
+
+class ConnectionClosed(Exception):
+    pass
+
+
+# name -> ManagedConnection, for /monitoring/websockets
+live_connections = {}
+
+
+class ManagedConnection:
+    """
+    Wraps a WebSocket with a bounded outbound queue drained by a dedicated
+    writer task. send_json() only enqueues, so a slow client never blocks
+    the coroutine that is pushing to it (e.g. an agent's loop).
+    When the queue is full the overflow policy either drops the oldest
+    pending message or disconnects the client.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        name: str,
+        max_queue: int = BaseConfig.WS_SEND_QUEUE_SIZE,
+        overflow_policy: str = BaseConfig.WS_OVERFLOW_POLICY,
+        send_timeout: float = BaseConfig.WS_SEND_TIMEOUT_SECONDS,
+    ):
+        self.websocket = websocket
+        self.name = name
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self._writer = None
+        self._closer = None
+
+        self.sent = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.send_time_total = 0.0
+        self.send_time_max = 0.0
+        self.queue_wait_total = 0.0
+
+    async def start(self):
+        self._writer = asyncio.create_task(self._write_forever())
+        live_connections[self.name] = self
+
+    async def send_json(self, message: dict):
+        if self.closed:
+            raise ConnectionClosed(self.name)
+
+        if self.queue.full():
+            if self.overflow_policy == DISCONNECT:
+                logger.warning(f"Send queue full, disconnecting {self.name}")
+                # The close handshake can stall on the same slow client, so
+                # it runs in its own task instead of the publisher's
+                if not self.closed:
+                    self._shutdown()
+                    self._discard_pending()
+                    self._closer = asyncio.create_task(
+                        self._close_socket(OVERFLOW_CLOSE_CODE)
+                    )
+                raise ConnectionClosed(self.name)
+
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+
+        self.queue.put_nowait((time.perf_counter(), message))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def _write_forever(self):
+        while True:
+            enqueued_at, message = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_json(message), self.send_timeout
+                )
+            except Exception as e:
+                logger.warning(f"Send to {self.name} failed, closing: {e}")
+                self.queue.task_done()
+                self.closed = True
+                self._discard_pending()
+                return
+
+            elapsed = time.perf_counter() - started
+            self.sent += 1
+            self.send_time_total += elapsed
+            self.send_time_max = max(self.send_time_max, elapsed)
+            self.queue_wait_total += started - enqueued_at
+            self.queue.task_done()
+
+    def _discard_pending(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+
+    async def close(self, code: int = 1000, drain: bool = True, drain_timeout=1.0):
+        """
+        Stops the writer, optionally giving queued messages drain_timeout
+        seconds to go out first.
+        """
+        if drain and not self.closed and self._writer and not self._writer.done():
+            try:
+                await asyncio.wait_for(self.queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        already_closed = self.closed
+        self._shutdown()
+
+        if code != 1000 and not already_closed:
+            await self._close_socket(code)
+
+    def _shutdown(self):
+        self.closed = True
+        if live_connections.get(self.name) is self:
+            del live_connections[self.name]
+
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    def snapshot(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "send_latency_avg_ms": (
+                round(self.send_time_total / self.sent * 1000, 3) if self.sent else 0.0
+            ),
+            "send_latency_max_ms": round(self.send_time_max * 1000, 3),
+            "queue_wait_avg_ms": (
+                round(self.queue_wait_total / self.sent * 1000, 3) if self.sent else 0.0
+            ),
+        }
+
+
+def connection_stats() -> dict:
+    return {name: conn.snapshot() for name, conn in list(live_connections.items())}
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from resources.ChatController import router as chatRoute
+from resources.MonitoringController import router as monitoringRoute
 
 router = APIRouter()
 
 router.include_router(chatRoute, prefix="/chat", tags=["Chat"])
+router.include_router(monitoringRoute, prefix="/monitoring", tags=["Monitoring"])
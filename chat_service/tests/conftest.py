@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The service imports its packages from chat_service/ and binds the DB
+# engine, Redis clients and archive directory at import time, so the test
+# doubles must be in place before anything from the app is imported.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp(prefix="chat_tests_")
+os.environ["CHAT_DB_URI"] = f"sqlite:///{_tmp}/test.db"
+os.environ["CHAT_ARCHIVE_DIR"] = os.path.join(_tmp, "archive")
+os.environ["CHAT_ANALYTICS_SINK"] = "off"
+os.environ["CHAT_CONNECTION_BUS"] = "memory"
+os.environ["CHAT_RATE_LIMIT"] = "off"
+os.environ["CHAT_AUTO_MIGRATE"] = "on"
+
+from benchmarks.fakes import FakeUpstreams, install_fake_redis  # noqa: E402
+
+install_fake_redis()
+
+import httpx  # noqa: E402
+from models.migrate import upgrade_database  # noqa: E402
+
+upgrade_database()
+
+from main import app  # noqa: E402
+from resources import http_clients  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def run():
+    """
+    Runs a coroutine on one loop shared by the whole session; the async
+    engine and Redis clients are bound to the loop that first uses them.
+    """
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def upstreams():
+    fakes = FakeUpstreams(nlp_latency_ms=1, admin_latency_ms=1, jitter=0)
+    fakes.install()
+    http_clients.open_clients()
+    return fakes
+
+
+@pytest.fixture
+def client(run, upstreams):
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    )
+    yield client
+    run(client.aclose())
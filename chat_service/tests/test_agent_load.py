@@ -0,0 +1,55 @@
+from configs.redis import async_redis_client
+from models import AsyncSessionLocal
+from resources import agent_load
+
+
+class _PickDuringQuery:
+    """Wraps a session so an agent is picked while the snapshot is read."""
+
+    def __init__(self, db, agent_ids):
+        self._db = db
+        self._agent_ids = agent_ids
+
+    async def execute(self, statement):
+        result = await self._db.execute(statement)
+        await agent_load.assign_least_loaded_agent(self._db, self._agent_ids)
+        return result
+
+
+def _loads(run):
+    rows = run(
+        async_redis_client.zrange(agent_load.AGENT_LOAD_KEY, 0, -1, withscores=True)
+    )
+    return {int(agent_id): int(score) for agent_id, score in rows}
+
+
+def test_rebuild_keeps_picks_made_since_the_snapshot(run):
+    async def _rebuild():
+        await async_redis_client.delete(agent_load.AGENT_LOAD_KEY)
+        await async_redis_client.zadd(
+            agent_load.AGENT_LOAD_KEY, {"9001": 5, "9002": 3}
+        )
+        async with AsyncSessionLocal() as db:
+            await agent_load.rebuild_agent_load(_PickDuringQuery(db, [9002]))
+
+    run(_rebuild())
+    loads = _loads(run)
+    assert loads[9001] == 0
+    assert loads[9002] == 1
+
+
+def test_superseded_rebuild_does_not_apply(run):
+    class _RebuildDuringQuery(_PickDuringQuery):
+        async def execute(self, statement):
+            result = await self._db.execute(statement)
+            await agent_load.start_generation()
+            return result
+
+    async def _rebuild():
+        await async_redis_client.delete(agent_load.AGENT_LOAD_KEY)
+        await async_redis_client.zadd(agent_load.AGENT_LOAD_KEY, {"9003": 4})
+        async with AsyncSessionLocal() as db:
+            await agent_load.rebuild_agent_load(_RebuildDuringQuery(db, []))
+
+    run(_rebuild())
+    assert _loads(run)[9003] == 4
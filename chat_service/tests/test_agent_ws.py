@@ -0,0 +1,33 @@
+from fastapi import WebSocketDisconnect
+from resources import ChatController
+from resources.connection_bus import connection_bus
+from resources.ws_connection import live_connections
+
+
+class _DisconnectingSocket:
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        raise WebSocketDisconnect()
+
+    async def send_json(self, message):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+
+def test_agent_socket_is_released_when_admin_is_down(run, monkeypatch):
+    async def _admin_down(agent_id):
+        raise RuntimeError("admin unavailable")
+
+    async def _busy(agent_id):
+        pass
+
+    monkeypatch.setattr(ChatController, "mark_agent_busy", _busy)
+    monkeypatch.setattr(ChatController, "mark_agent_available", _admin_down)
+    run(ChatController.agent_ws(_DisconnectingSocket(), 4242))
+
+    assert not connection_bus.is_local("agent:4242")
+    assert "agent:4242" not in live_connections
@@ -0,0 +1,66 @@
+import os
+import socket
+
+from models import AsyncSessionLocal
+from resources.analytics import EventBuffer, NDJSONSink, load_ndjson_files
+
+
+def _names(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith("events-"))
+
+
+def test_ndjson_sink_rotates_by_size(run, tmp_path):
+    sink = NDJSONSink(str(tmp_path), max_bytes=50, max_age=3600)
+    run(sink.write([{"event": "e", "n": n} for n in range(5)]))
+    run(sink.write([{"event": "e"}]))
+
+    names = _names(tmp_path)
+    assert [name.endswith(".ndjson") for name in names] == [True, False]
+    assert names[1].endswith(".ndjson.open")
+
+
+def test_ndjson_sink_rotates_by_age_when_idle(run, tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("resources.analytics.time.monotonic", lambda: now[0])
+    sink = NDJSONSink(str(tmp_path), max_age=60)
+
+    run(sink.write([{"event": "e"}]))
+    run(sink.idle())
+    assert _names(tmp_path)[0].endswith(".ndjson.open")
+
+    now[0] += 61
+    run(sink.idle())
+    assert _names(tmp_path)[0].endswith(".ndjson")
+
+
+def test_buffer_flushes_pending_batch_on_stop(run, tmp_path):
+    buffer = EventBuffer(NDJSONSink(str(tmp_path)), flush_size=100, flush_interval=60)
+
+    async def _emit_and_stop():
+        await buffer.start()
+        for n in range(3):
+            buffer.emit({"event": "e", "n": n})
+        await buffer.stop()
+
+    run(_emit_and_stop())
+
+    (name,) = _names(tmp_path)
+    with open(tmp_path / name) as f:
+        assert len(f.readlines()) == 3
+
+
+def test_loader_claims_files_of_dead_writers_only(run, tmp_path):
+    host = socket.gethostname()
+    line = '{"event": "e", "timestamp": "2026-10-17T00:00:00"}\n'
+    stranded = {
+        "dead": f"events-20261017T000000000000-{host}-999999.ndjson.open",
+        "alive": f"events-20261017T000000000000-{host}-{os.getpid()}.ndjson.open",
+        "foreign": "events-20261017T000000000000-elsewhere-1.ndjson.open",
+    }
+    for name in stranded.values():
+        (tmp_path / name).write_text(line)
+
+    loaded = run(load_ndjson_files(AsyncSessionLocal, str(tmp_path)))
+
+    assert loaded == 1
+    assert _names(tmp_path) == sorted([stranded["alive"], stranded["foreign"]])
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from configs.base_config import Base
+from models.models import Conversation, Sessions
+from resources.archive import ConversationArchiver
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+
+def test_undated_rows_do_not_halt_archiving(run, tmp_path):
+    # A database of its own, so rows can be laid out in any id order
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'archive.db'}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    old = datetime.utcnow() - timedelta(days=400)
+
+    async def _seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            session = Sessions(
+                session_key="arch-1", user_id=5, platform="web", status="ACTIVE"
+            )
+            db.add(session)
+            await db.flush()
+            messages = [
+                Conversation(
+                    session_id=session.id,
+                    sender="user",
+                    message_text="x",
+                    created_at=created_at,
+                )
+                for created_at in (old, old, old, datetime.utcnow())
+            ]
+            db.add_all(messages)
+            await db.flush()
+            # The column default fills in None on insert
+            await db.execute(
+                update(Conversation)
+                .where(Conversation.id == messages[1].id)
+                .values(created_at=None)
+            )
+            await db.commit()
+
+    async def _archive():
+        archiver = ConversationArchiver(
+            session_factory,
+            root=str(tmp_path / "parts"),
+            older_than_days=365,
+            chunk_size=2,
+            pause=0,
+        )
+        report = await archiver.run()
+        async with session_factory() as db:
+            left = (await db.scalars(select(Conversation.created_at))).all()
+        await engine.dispose()
+        return report, left
+
+    run(_seed())
+    report, left = run(_archive())
+
+    assert report["complete"]
+    assert report["archived"] == 2
+    assert report["skipped"] == 1
+    assert len(left) == 2 and None in left
@@ -0,0 +1,123 @@
+from models import AsyncSessionLocal
+from resources.ChatController import (
+    PLATFORM_MAX_LENGTH,
+    SESSION_KEY_MAX_LENGTH,
+    _bulk_item_error,
+    ingest_messages,
+    plan_bulk_message,
+)
+
+
+def test_bulk_item_error_accepts_valid_items():
+    assert _bulk_item_error({"session_id": "s", "text": "hello"}) is None
+    item = {"session_id": 7, "text": "hi", "platform": "api"}
+    assert _bulk_item_error(item) is None
+
+
+def test_bulk_item_error_rejects_malformed_items():
+    too_long_platform = "p" * (PLATFORM_MAX_LENGTH + 1)
+    cases = [
+        ("not a dict", "session_id and text required"),
+        ({"text": "x"}, "session_id and text required"),
+        ({"session_id": "s", "text": ""}, "session_id and text required"),
+        ({"session_id": True, "text": "x"}, "session_id must be a string"),
+        ({"session_id": {"a": 1}, "text": "x"}, "session_id must be a string"),
+        ({"session_id": "s", "text": {"x": 1}}, "text must be a string"),
+        ({"session_id": "s", "text": "x", "platform": {"a": 1}}, None),
+        ({"session_id": "s" * (SESSION_KEY_MAX_LENGTH + 1), "text": "x"}, None),
+        ({"session_id": "s", "text": "x", "platform": too_long_platform}, None),
+    ]
+    for item, expected in cases:
+        error = _bulk_item_error(item)
+        assert error, item
+        if expected:
+            assert error == expected
+
+
+def test_malformed_items_fail_alone(run, client):
+    response = run(
+        client.post(
+            "/chat/messages/bulk",
+            json=[
+                {"session_id": "bulk-1", "text": "hello"},
+                {"session_id": "bulk-1", "text": {"x": 1}},
+                {"session_id": "bulk-2", "text": "hi"},
+                {"session_id": "bulk-3", "text": "x", "platform": {"a": 1}},
+                {"session_id": "b" * 300, "text": "x"},
+            ],
+        )
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["ok", "error", "ok", "error", "error"]
+    assert response.json()["failed"] == 3
+
+
+def test_session_creation_failure_fails_only_its_items(run, client, monkeypatch):
+    from resources import ChatController
+
+    original = ChatController.get_or_create_session
+
+    async def _flaky(db, session_key, platform):
+        if session_key == "bulk-broken":
+            raise RuntimeError("insert failed")
+        return await original(db, session_key, platform)
+
+    monkeypatch.setattr(ChatController, "get_or_create_session", _flaky)
+    response = run(
+        client.post(
+            "/chat/messages/bulk",
+            json=[
+                {"session_id": "bulk-broken", "text": "x"},
+                {"session_id": "bulk-4", "text": "hi"},
+            ],
+        )
+    )
+
+    assert [r["status"] for r in response.json()["results"]] == ["error", "ok"]
+    assert response.json()["results"][0]["error"] == "Could not create session"
+
+
+def test_plan_bulk_message_skips_nlp_for_escalated_sessions(run, upstreams):
+    async def _plan():
+        async with AsyncSessionLocal() as db:
+            return await plan_bulk_message(db, 1, "hello", None)
+
+    calls = upstreams.calls["nlp"]
+    escalated = run(_plan())
+    assert escalated["response"]["type"] == "AGENT"
+    assert escalated["bot"] is None and escalated["nlp"] is None
+    assert upstreams.calls["nlp"] == calls
+
+
+def test_one_session_is_classified_concurrently_and_applied_in_order(
+    run, upstreams, monkeypatch
+):
+    from resources import ChatController
+
+    original = ChatController.analyze_message
+    in_flight = {"now": 0, "max": 0}
+
+    async def _counting(text, config):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            return await original(text, config)
+        finally:
+            in_flight["now"] -= 1
+
+    monkeypatch.setattr(ChatController, "analyze_message", _counting)
+    texts = ["hello"] * 10 + ["get me a human"] + ["hello"] * 5
+    items = [{"session_id": "bulk-ordered", "text": text} for text in texts]
+    results = run(ingest_messages(items))
+
+    assert in_flight["max"] > 1
+    assert all(result["status"] == "ok" for result in results)
+    intents = [(result["nlp"] or {}).get("intent") for result in results]
+    assert intents[:10] == ["greet"] * 10
+    assert intents[10] == "human_handoff"
+    assert intents[11:] == [None] * 5
+    assert all(r["response"]["type"] == "AGENT" for r in results[11:])
+    message_ids = [result["user_message_id"] for result in results]
+    assert message_ids == sorted(message_ids)
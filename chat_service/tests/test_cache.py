@@ -0,0 +1,86 @@
+import threading
+import time
+import types
+
+from resources.cache import LocalCache
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == (True, 1)
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, 3)
+    assert cache.stats["evictions"] == 1
+
+
+def test_local_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = LocalCache(max_entries=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+
+    now[0] += 10
+    assert cache.get("a") == (True, 1)
+    assert cache.get("b") == (False, None)
+    assert cache.stats["expirations"] == 1
+
+
+def test_local_cache_caps_ttl_at_tier_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = LocalCache(max_entries=10, ttl=60)
+    cache.set("a", 1, ttl=3600)
+
+    now[0] += 61
+    assert cache.get("a") == (False, None)
+
+
+def test_invalidation_listener_survives_redis_errors(monkeypatch):
+    from configs.redis import redis_client
+    from redis.exceptions import ConnectionError
+    from resources import cache
+
+    delays = []
+    pause = threading.Event()
+    clock = types.SimpleNamespace(monotonic=time.monotonic, sleep=delays.append)
+    monkeypatch.setattr(cache, "time", clock)
+    monkeypatch.setattr(cache, "_listener_retry", {"delay": 0.0, "failed_at": 0.0})
+
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{cache.INVALIDATION_CHANNEL: cache._handle_invalidation})
+    read = pubsub.get_message
+    failures = [ConnectionError("reset"), ConnectionError("reset")]
+
+    def _flaky_read(**kwargs):
+        if failures:
+            raise failures.pop()
+        return read(**kwargs)
+
+    monkeypatch.setattr(pubsub, "get_message", _flaky_read)
+    cache.local_cache.set("stale", 1)
+    cache.local_cache.set("fresh", 2)
+
+    thread = pubsub.run_in_thread(
+        sleep_time=0.01, daemon=True, exception_handler=cache._handle_listener_error
+    )
+    try:
+        deadline = time.monotonic() + 2
+        while failures and time.monotonic() < deadline:
+            pause.wait(0.01)
+        cache.local_cache.set("fresh", 2)
+        redis_client.publish(cache.INVALIDATION_CHANNEL, "fresh")
+        while cache.local_cache.get("fresh")[0] and time.monotonic() < deadline:
+            pause.wait(0.01)
+    finally:
+        thread.stop()
+        thread.join(1)
+
+    assert delays == [0.5, 1.0]
+    assert cache.local_cache.get("stale") == (False, None)
+    assert cache.local_cache.get("fresh") == (False, None)
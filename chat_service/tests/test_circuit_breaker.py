@@ -0,0 +1,26 @@
+from redis.exceptions import ConnectionError
+from resources import utils
+
+
+class _DownRedis:
+    def __getattr__(self, name):
+        async def _fail(*args, **kwargs):
+            raise ConnectionError("Redis is down")
+
+        return _fail
+
+
+def test_breaker_falls_back_to_local_state_without_redis(run, monkeypatch):
+    monkeypatch.setattr(utils, "async_redis_client", _DownRedis())
+    monkeypatch.setattr(utils, "_local_failures", {})
+    monkeypatch.setattr(utils, "_local_open_until", {})
+
+    for _ in range(utils.FAILURE_LIMIT - 1):
+        run(utils.record_failure_async("nlp_service"))
+    assert run(utils.allow_request_async("nlp_service"))
+
+    run(utils.record_failure_async("nlp_service"))
+    assert not run(utils.allow_request_async("nlp_service"))
+
+    run(utils.record_success_async("nlp_service"))
+    assert run(utils.allow_request_async("nlp_service"))
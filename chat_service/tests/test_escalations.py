@@ -0,0 +1,58 @@
+import uuid
+
+from models import AsyncSessionLocal
+from models.models import Escalation, Sessions
+from resources.utils import create_access_token
+
+
+def _auth(claims):
+    return {"Authorization": f"Bearer {create_access_token(claims)}"}
+
+
+def _escalation(run, tenant_id=42, agent_id=7):
+    async def _create():
+        async with AsyncSessionLocal() as db:
+            session = Sessions(
+                session_key=f"esc-{uuid.uuid4().hex}",
+                user_id=tenant_id,
+                platform="web",
+                status="ACTIVE",
+            )
+            db.add(session)
+            await db.flush()
+            escalation = Escalation(
+                session_id=session.id, status="ASSIGNED", assigned_to=agent_id
+            )
+            db.add(escalation)
+            await db.commit()
+            return escalation.id
+
+    return run(_create())
+
+
+def _resolve(run, client, escalation_id, headers=None):
+    return run(
+        client.post(
+            f"/chat/escalations/{escalation_id}/resolve", json={}, headers=headers
+        )
+    )
+
+
+def test_resolve_requires_a_token(run, client):
+    escalation_id = _escalation(run)
+    assert _resolve(run, client, escalation_id).status_code == 401
+
+
+def test_other_agents_and_tenants_cannot_resolve(run, client):
+    escalation_id = _escalation(run)
+    for claims in ({"user_id": 8}, {"user_id": 999}, {"session_id": 1}):
+        response = _resolve(run, client, escalation_id, _auth(claims))
+        assert response.status_code == 403, claims
+
+
+def test_assigned_agent_or_tenant_resolves(run, client):
+    for user_id in (7, 42):
+        escalation_id = _escalation(run)
+        response = _resolve(run, client, escalation_id, _auth({"user_id": user_id}))
+        assert response.status_code == 200
+        assert response.json()["status"] == "RESOLVED"
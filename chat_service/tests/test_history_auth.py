@@ -0,0 +1,85 @@
+import pytest
+from models import AsyncSessionLocal
+from models.models import Escalation, Sessions
+from resources.utils import create_access_token
+from sqlalchemy import update
+
+
+def _auth(claims):
+    return {"Authorization": f"Bearer {create_access_token(claims)}"}
+
+
+def _new_session(run, client, user_id=None):
+    body = run(client.post("/chat/session", json={"name": "a", "email": "a@b.c"}))
+    session = body.json()
+
+    async def _assign_tenant():
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Sessions)
+                .where(Sessions.id == session["session_id"])
+                .values(user_id=user_id)
+            )
+            await db.commit()
+
+    if user_id is not None:
+        run(_assign_tenant())
+    return session
+
+
+def _statuses(run, client, session_id, headers=None):
+    return [
+        run(client.get(f"/chat/sessions/{session_id}/{route}", headers=headers))
+        .status_code
+        for route in ("messages", "archive")
+    ]
+
+
+@pytest.mark.parametrize("headers", [None, {"Authorization": "Bearer not-a-jwt"}])
+def test_missing_or_invalid_token_is_rejected(run, client, headers):
+    session = _new_session(run, client)
+    assert _statuses(run, client, session["session_id"], headers) == [401, 401]
+
+
+def test_session_token_reads_only_its_session(run, client):
+    mine = _new_session(run, client)
+    other = _new_session(run, client)
+    headers = {"Authorization": f"Bearer {mine['session_key']}"}
+
+    assert _statuses(run, client, mine["session_id"], headers) == [200, 200]
+    assert _statuses(run, client, other["session_id"], headers) == [403, 403]
+
+
+def test_admin_token_reads_only_its_tenants_sessions(run, client):
+    session = _new_session(run, client, user_id=42)
+
+    owner = _auth({"user_id": 42, "user_role": 1})
+    other_tenant = _auth({"user_id": 999, "user_role": 1})
+
+    assert _statuses(run, client, session["session_id"], owner) == [200, 200]
+    assert _statuses(run, client, session["session_id"], other_tenant) == [403, 403]
+
+
+def test_assigned_agent_reads_the_escalated_session(run, client):
+    session = _new_session(run, client, user_id=42)
+
+    async def _escalate():
+        async with AsyncSessionLocal() as db:
+            db.add(
+                Escalation(
+                    session_id=session["session_id"], status="ASSIGNED", assigned_to=7
+                )
+            )
+            await db.commit()
+
+    run(_escalate())
+
+    agent = _auth({"user_id": 7, "user_role": 2})
+    stranger = _auth({"user_id": 8, "user_role": 2})
+    assert _statuses(run, client, session["session_id"], agent) == [200, 200]
+    assert _statuses(run, client, session["session_id"], stranger) == [403, 403]
+
+
+def test_unknown_session_is_404(run, client):
+    headers = _auth({"user_id": 42, "user_role": 1})
+    assert _statuses(run, client, 10_000_000, headers) == [404, 404]
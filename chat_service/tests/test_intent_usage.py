@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from resources.intent_usage import IntentUsageRollup, hour_bucket
+
+
+def test_hour_bucket_truncates_to_the_hour():
+    assert hour_bucket(datetime(2026, 10, 17, 4, 59, 59, 999)) == datetime(
+        2026, 10, 17, 4
+    )
+
+
+def test_rollup_counts_per_intent_and_hour():
+    rollup = IntentUsageRollup()
+    at = datetime(2026, 10, 17, 4, 30)
+    rollup.record("greet", 0.5, fallback=False, escalated=False, at=at)
+    rollup.record("greet", 0.25, fallback=True, escalated=True, at=at)
+    rollup.record("greet", 0.5, fallback=False, escalated=False, at=at.replace(hour=5))
+    rollup.record(None, 0.9, fallback=False, escalated=False, at=at)
+
+    assert rollup.pending == {
+        ("greet", datetime(2026, 10, 17, 4)): [2, 1, 1, 0.75],
+        ("greet", datetime(2026, 10, 17, 5)): [1, 0, 0, 0.5],
+    }
+
+
+def test_restore_merges_failed_push_back():
+    rollup = IntentUsageRollup()
+    at = datetime(2026, 10, 17, 4)
+    rollup.record("greet", 1.0, fallback=False, escalated=False, at=at)
+    drained = rollup.drain()
+    rollup.record("greet", 0.5, fallback=True, escalated=False, at=at)
+    rollup.restore(drained)
+
+    assert rollup.pending == {("greet", at): [2, 1, 0, 1.5]}
@@ -0,0 +1,62 @@
+from configs.base_config import BaseConfig
+from configs.redis import async_redis_client
+from resources.rate_limit import LocalTokenBuckets, check_rate_limit
+
+
+def test_token_bucket_script_allows_burst_then_refuses(run, monkeypatch):
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_SESSION_CAPACITY", 3)
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_SESSION_PER_SECOND", 1.0)
+
+    outcomes = [run(check_rate_limit("rl-burst", None)) for _ in range(4)]
+
+    assert [allowed for allowed, _ in outcomes] == [True, True, True, False]
+    assert 0 < outcomes[-1][1] <= 1.0
+
+
+def test_token_bucket_script_needs_every_bucket(run, monkeypatch):
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_SESSION_CAPACITY", 10)
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_IP_CAPACITY", 2)
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_IP_PER_SECOND", 1.0)
+
+    first = run(check_rate_limit("rl-a", "10.0.0.1"))
+    second = run(check_rate_limit("rl-b", "10.0.0.1"))
+    third = run(check_rate_limit("rl-c", "10.0.0.1"))
+
+    assert first[0] and second[0]
+    assert third[0] is False
+    # A refused call takes no tokens from the buckets that had some
+    tokens = run(async_redis_client.hget("rl:session:rl-c", "tokens"))
+    assert tokens is None
+
+
+def test_local_buckets_refill_over_time(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("resources.rate_limit.time.monotonic", lambda: now[0])
+    buckets = LocalTokenBuckets()
+    spec = [("k", 2, 1.0)]
+
+    assert buckets.take(spec) == (True, 0.0)
+    assert buckets.take(spec) == (True, 0.0)
+    allowed, retry_after = buckets.take(spec)
+    assert not allowed and retry_after == 1.0
+
+    now[0] += 1.0
+    assert buckets.take(spec) == (True, 0.0)
+
+
+def test_bulk_requests_are_charged_per_message(run, client, monkeypatch):
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_BULK_CAPACITY", 5)
+    monkeypatch.setattr(BaseConfig, "RATE_LIMIT_BULK_PER_SECOND", 1.0)
+
+    def _bulk(count):
+        items = [{"session_id": "rl-bulk", "text": "hi"} for _ in range(count)]
+        return run(client.post("/chat/messages/bulk", json=items))
+
+    assert _bulk(3).status_code == 200
+    refused = _bulk(3)
+    assert refused.status_code == 429
+    assert int(refused.headers["Retry-After"]) >= 1
+    assert _bulk(2).status_code == 200
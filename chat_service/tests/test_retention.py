@@ -0,0 +1,110 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from configs.redis import async_redis_client
+from models import AsyncSessionLocal
+from models.models import Conversation, Sessions
+from resources.retention import RetentionPurger
+
+_KEYS = (
+    "watermark:conversations",
+    "low_water:conversations",
+    "low_water:conversations:pending",
+)
+
+
+def _purger(policies, default_days=90):
+    return RetentionPurger(None, policies, default_days=default_days)
+
+
+def _row(days_old, purger, status=None):
+    return SimpleNamespace(
+        created_at=purger.now - timedelta(days=days_old), status=status
+    )
+
+
+def test_rows_expire_after_the_tenant_policy():
+    purger = _purger({1: 30})
+
+    assert purger._is_expired(_row(31, purger), 1)
+    assert not purger._is_expired(_row(29, purger), 1)
+    # Tenants without a policy fall back to the default
+    assert not purger._is_expired(_row(31, purger), 2)
+    assert purger._is_expired(_row(91, purger), 2)
+
+
+def test_zero_days_keeps_forever():
+    purger = _purger({1: 0})
+    assert not purger._is_expired(_row(10_000, purger), 1)
+
+
+def test_open_escalations_and_undated_rows_are_kept():
+    purger = _purger({1: 30})
+
+    assert not purger._is_expired(_row(60, purger, status="ASSIGNED"), 1)
+    assert not purger._is_expired(_row(60, purger, status="PENDING"), 1)
+    assert purger._is_expired(_row(60, purger, status="RESOLVED"), 1)
+    assert not purger._is_expired(SimpleNamespace(created_at=None), 1)
+
+
+def test_youngest_cutoff_uses_the_shortest_policy():
+    purger = _purger({1: 7, 2: 0}, default_days=90)
+    assert purger.youngest_cutoff == purger.now - timedelta(days=7)
+    assert isinstance(purger.youngest_cutoff, datetime)
+
+
+def _seed(run, rows):
+    """rows: (tenant_id, days_old); returns the conversation ids."""
+
+    async def _insert():
+        async with AsyncSessionLocal() as db:
+            ids = []
+            for tenant_id, days_old in rows:
+                session = Sessions(
+                    session_key=f"rt-{uuid.uuid4().hex}",
+                    user_id=tenant_id,
+                    platform="web",
+                    status="ACTIVE",
+                )
+                db.add(session)
+                await db.flush()
+                message = Conversation(
+                    session_id=session.id,
+                    sender="user",
+                    message_text="x",
+                    created_at=datetime.utcnow() - timedelta(days=days_old),
+                )
+                db.add(message)
+                await db.flush()
+                ids.append(message.id)
+            await db.commit()
+            return ids
+
+    return run(_insert())
+
+
+def _pass(run, policies):
+    purger = RetentionPurger(
+        AsyncSessionLocal, policies, default_days=0, pause=0, archive_root=""
+    )
+    return run(purger.purge_table("conversations"))
+
+
+def test_next_pass_starts_from_the_tenant_low_water_mark(run):
+    run(async_redis_client.delete(*[f"retention:{key}" for key in _KEYS]))
+    forever, _, kept = _seed(run, [(778, 400), (777, 40), (777, 10)])
+
+    first = _pass(run, {777: 30, 778: 0})
+    assert first["complete"] and first["started_at_id"] == 0
+    assert first["by_tenant"] == {"777": 1}
+
+    # Tenant 778 keeps rows forever, so only 777's oldest kept row counts
+    second = _pass(run, {777: 30, 778: 0})
+    assert second["started_at_id"] == kept - 1
+    assert second["deleted"] == 0
+
+    # Once 778's policy can expire rows, its carried-over mark applies
+    third = _pass(run, {777: 30, 778: 30})
+    assert third["started_at_id"] == forever - 1
+    assert third["by_tenant"] == {"778": 1}
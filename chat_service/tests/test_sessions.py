@@ -0,0 +1,48 @@
+import asyncio
+
+from models import AsyncSessionLocal
+from models.models import Sessions
+from resources.ChatController import get_or_create_session
+from sqlalchemy import func, select
+
+
+def test_concurrent_first_messages_share_one_session(run, client):
+    async def _send():
+        payload = {"session_id": "race-1", "text": "hi"}
+        return await asyncio.gather(
+            *[client.post("/chat/message", json=payload) for _ in range(5)]
+        )
+
+    responses = run(_send())
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len({r.json()["session_id"] for r in responses}) == 1
+
+
+def test_get_or_create_session_ends_its_transaction(run):
+    async def _lookup():
+        async with AsyncSessionLocal() as db:
+            created = await get_or_create_session(db, "tx-1", "web")
+
+        from resources import session_cache
+
+        session_cache.session_local_cache.clear()
+        await session_cache.async_redis_client.delete("session:tx-1")
+
+        async with AsyncSessionLocal() as db:
+            found = await get_or_create_session(db, "tx-1", "web")
+            # The cache missed, so this lookup went to the database
+            in_transaction = db.in_transaction()
+            count = await db.scalar(
+                select(func.count())
+                .select_from(Sessions)
+                .where(Sessions.session_key == "tx-1")
+            )
+            await db.rollback()
+            return created, found, in_transaction, count
+
+    created, found, in_transaction, count = run(_lookup())
+
+    assert created["id"] == found["id"]
+    assert not in_transaction
+    assert count == 1
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from resources.ws_connection import (
+    DISCONNECT,
+    OVERFLOW_CLOSE_CODE,
+    ConnectionClosed,
+    ManagedConnection,
+    live_connections,
+)
+
+
+class _StalledSocket:
+    """A client that never reads: sends and the close handshake hang."""
+
+    def __init__(self):
+        self.close_codes = []
+
+    async def send_json(self, message):
+        await asyncio.Event().wait()
+
+    async def close(self, code=1000):
+        self.close_codes.append(code)
+        await asyncio.Event().wait()
+
+
+def test_overflow_disconnect_does_not_block_the_publisher(run):
+    websocket = _StalledSocket()
+    connection = ManagedConnection(
+        websocket,
+        "ws-stalled",
+        max_queue=1,
+        overflow_policy=DISCONNECT,
+        send_timeout=0.05,
+    )
+
+    async def _publish():
+        await connection.start()
+        await connection.send_json({"n": 0})
+        await asyncio.sleep(0)
+        await connection.send_json({"n": 1})
+        with pytest.raises(ConnectionClosed):
+            await asyncio.wait_for(connection.send_json({"n": 2}), 0.01)
+        await connection._closer
+
+    run(_publish())
+
+    assert connection.closed
+    assert "ws-stalled" not in live_connections
+    assert websocket.close_codes == [OVERFLOW_CLOSE_CODE]